@@ -7,16 +7,22 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
 from core.configuration.configuration import get_app_version
+from core.database.database import RoutingSession
+from core.managers.compression_manager import CompressionManager
 from core.managers.config_manager import ConfigManager
 from core.managers.error_handler_manager import ErrorHandlerManager
 from core.managers.logging_manager import LoggingManager
+from core.managers.memory_manager import MemoryManager
+from core.managers.metrics_manager import MetricsManager
 from core.managers.module_manager import ModuleManager
+from core.managers.profiling_manager import ProfilingManager
+from core.managers.tracing_manager import TracingManager
 
 # Load environment variables
 load_dotenv()
 
 # Create the instances
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
@@ -89,6 +95,27 @@ def create_app(config_name="development"):
     error_handler_manager = ErrorHandlerManager(app)
     error_handler_manager.register_error_handlers()
 
+    # Response compression (br, zstd, gzip). Registered before the other after_request hooks so it
+    # runs after them, on the final body
+    compression_manager = CompressionManager(app)
+    compression_manager.register_compression()
+
+    # Prometheus instrumentation, exposed at /metrics
+    metrics_manager = MetricsManager(app)
+    metrics_manager.register_metrics()
+
+    # Per-request memory tracking, reported at /debug/memory (MEMORY_TRACKING_ENABLED)
+    memory_manager = MemoryManager(app)
+    memory_manager.register_memory_tracking()
+
+    # On-demand profiling of single requests (X-Profile header)
+    profiling_manager = ProfilingManager(app)
+    profiling_manager.register_profiling()
+
+    # Request tracing to logs/traces/traces.jsonl (TRACING_ENABLED)
+    tracing_manager = TracingManager(app)
+    tracing_manager.register_tracing()
+
     # Injecting environment variables into jinja context
     @app.context_processor
     def inject_vars_into_jinja():
@@ -102,4 +129,11 @@ def create_app(config_name="development"):
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # The default application ("app:app" for gunicorn, FLASK_APP=app for the flask CLI) is only built
+    # when first requested, so importing the package for `db`, models or CLI commands stays cheap
+    if name == "app":
+        application = create_app()
+        globals()["app"] = application
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
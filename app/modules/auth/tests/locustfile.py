@@ -10,6 +10,12 @@ from locust import HttpUser, TaskSet, between, task
 from core.environment.host import get_host_for_locust_testing
 from core.locust.common import fake, get_csrf_token
 
+# Objectives checked by `rosemary locust --gate`: latency percentiles in ms, error rate as a fraction
+SLOS = {
+    "POST /login": {"p95": 600, "p99": 1200, "error_rate": 0.01},
+    "/profile/summary": {"p50": 150, "p95": 600, "p99": 1200, "error_rate": 0.01},
+}
+
 
 class AuthenticatedUserBehavior(TaskSet):
     """
@@ -52,7 +58,7 @@ class AuthenticatedUserBehavior(TaskSet):
         """Search for datasets"""
         queries = ["test", "example", "data"]
         for query in queries:
-            self.client.get(f"/explore?query={query}")
+            self.client.get(f"/explore?query={query}", name="/explore?query=[q]")
 
     @task(1)
     def view_own_datasets(self):
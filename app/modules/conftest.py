@@ -13,6 +13,7 @@ from app.modules.dataset.models import (
     MaterialRecord,
     MaterialsDataset,
     PublicationType,
+    UploadSession,
 )
 from app.modules.profile.models import UserProfile
 
@@ -122,6 +123,7 @@ def integration_test_data(test_client):
 
     # Then delete material records (they reference datasets)
     db.session.query(MaterialRecord).delete(synchronize_session=False)
+    db.session.query(UploadSession).delete(synchronize_session=False)
 
     # Then delete authors (they reference ds_meta_data)
     db.session.query(Author).delete(synchronize_session=False)
@@ -1,12 +1,13 @@
-import os
-
-from flask import request
+from flask import current_app, request
+from flask_login import current_user
 from flask_restful import Resource
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm.exc import StaleDataError
 
 from app import db
+from app.modules.dataset.formulas import parse_element_symbols
 from app.modules.dataset.models import MaterialsDataset
 from app.modules.dataset.repositories import MaterialRecordRepository, MaterialsDatasetRepository
+from core.serialisers.compiled_serializer import CompiledSerializer, json_response
 from core.serialisers.serializer import Serializer
 
 # Existing serializers for UVL datasets
@@ -42,18 +43,32 @@ material_record_fields = {
     "description": "description",
 }
 
-material_record_serializer = Serializer(material_record_fields)
+material_record_serializer = CompiledSerializer(material_record_fields)
 
+# materials_count, unique_materials and unique_properties are added by serialize_materials_datasets()
 materials_dataset_fields = {
     "id": "id",
     "created_at": "created_at",
     "csv_file_path": "csv_file_path",
-    "materials_count": "get_materials_count",
-    "unique_materials": "get_unique_materials",
-    "unique_properties": "get_unique_properties",
+    "row_version": "row_version",
 }
 
-materials_dataset_serializer = Serializer(materials_dataset_fields)
+materials_dataset_serializer = CompiledSerializer(materials_dataset_fields)
+
+
+def serialize_materials_datasets(datasets):
+    """API payloads of datasets; their record counts and names take three queries for all of them"""
+    record_repository = MaterialRecordRepository()
+    stats = record_repository.get_listing_stats(d.id for d in datasets)
+    names = record_repository.get_unique_names_by_dataset(d.id for d in datasets)
+    items = []
+    for dataset in datasets:
+        item = materials_dataset_serializer.to_builtins(dataset)
+        item["materials_count"] = stats[dataset.id]["records"]
+        item["unique_materials"] = names[dataset.id]["materials"]
+        item["unique_properties"] = names[dataset.id]["properties"]
+        items.append(item)
+    return items
 
 
 class MaterialsDatasetResource(Resource):
@@ -88,6 +103,9 @@ class MaterialsDatasetResource(Resource):
                   format: date-time
                 csv_file_path:
                   type: string
+                row_version:
+                  type: integer
+                  description: Incremented on every change of the dataset or its records
                 materials_count:
                   type: integer
                 unique_materials:
@@ -105,10 +123,10 @@ class MaterialsDatasetResource(Resource):
             dataset = self.repository.get_by_id(id)
             if not dataset:
                 return {"message": "MaterialsDataset not found"}, 404
-            return materials_dataset_serializer.serialize(dataset), 200
+            return json_response(serialize_materials_datasets([dataset])[0])
         else:
             datasets = MaterialsDataset.query.all()
-            return {"items": [materials_dataset_serializer.serialize(d) for d in datasets]}, 200
+            return json_response({"items": serialize_materials_datasets(datasets)})
 
     def post(self):
         """Create a new MaterialsDataset
@@ -174,22 +192,35 @@ class MaterialsDatasetResource(Resource):
                 csv_file_path:
                   type: string
                   description: Path to CSV file
+                row_version:
+                  type: integer
+                  description: row_version the update is based on; 409 if the dataset has changed since
         responses:
           200:
             description: MaterialsDataset updated successfully
           404:
             description: MaterialsDataset not found
+          409:
+            description: The dataset changed since the given row_version
         """
         dataset = self.repository.get_by_id(id)
         if not dataset:
             return {"message": "MaterialsDataset not found"}, 404
 
         data = request.get_json()
+        expected_row_version = data.pop("row_version", None)
+        if expected_row_version is not None and expected_row_version != dataset.row_version:
+            return {"message": "The dataset was modified since it was read", "row_version": dataset.row_version}, 409
         for key, value in data.items():
             if hasattr(dataset, key):
                 setattr(dataset, key, value)
-        db.session.commit()
-        return materials_dataset_serializer.serialize(dataset), 200
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another request updated the row between our read and this write
+            db.session.rollback()
+            return {"message": "The dataset was modified since it was read"}, 409
+        return json_response(serialize_materials_datasets([dataset])[0])
 
     def delete(self, id):
         """Delete a MaterialsDataset
@@ -210,12 +241,13 @@ class MaterialsDatasetResource(Resource):
           404:
             description: MaterialsDataset not found
         """
+        from app.modules.dataset.services import MaterialsDatasetService
+
         dataset = self.repository.get_by_id(id)
         if not dataset:
             return {"message": "MaterialsDataset not found"}, 404
 
-        db.session.delete(dataset)
-        db.session.commit()
+        MaterialsDatasetService().delete_dataset(dataset)
         return {"message": "MaterialsDataset deleted successfully"}, 204
 
 
@@ -247,7 +279,14 @@ class MaterialsDatasetUploadResource(Resource):
             in: formData
             type: file
             required: true
-            description: CSV file with material records
+            description: CSV file with material records (.csv, or compressed .csv.gz, .csv.zst, .csv.br)
+          - name: Upload-Checksum
+            in: header
+            type: string
+            required: false
+            description: >
+              "sha256 <hex digest>" of the file. An identical earlier upload is reused without
+              re-parsing; a file that does not match is rejected.
         consumes:
           - multipart/form-data
         responses:
@@ -265,6 +304,15 @@ class MaterialsDatasetUploadResource(Resource):
                 dataset_id:
                   type: integer
                   example: 1
+                checksum:
+                  type: string
+                  description: SHA-256 of the uploaded file
+                size:
+                  type: integer
+                  description: Size of the uploaded file in bytes
+                deduplicated:
+                  type: boolean
+                  description: True when the records were cloned from an identical earlier upload
           400:
             description: Bad request (invalid file or parsing error)
             schema:
@@ -274,6 +322,8 @@ class MaterialsDatasetUploadResource(Resource):
                   type: string
                 error:
                   type: string
+          413:
+            description: The compressed CSV expands past MAX_DECOMPRESSED_CSV_SIZE or MAX_CSV_COMPRESSION_RATIO
           404:
             description: MaterialsDataset not found
             schema:
@@ -284,6 +334,8 @@ class MaterialsDatasetUploadResource(Resource):
                   example: MaterialsDataset not found
         """
         # Get the MaterialsDataset
+        from app.modules.dataset.services import get_csv_compression, is_csv_filename
+
         materials_dataset = self.repository.get_by_id(id)
         if not materials_dataset:
             return {"message": "MaterialsDataset not found"}, 404
@@ -296,38 +348,283 @@ class MaterialsDatasetUploadResource(Resource):
         if file.filename == "":
             return {"message": "No file selected"}, 400
 
-        if file and file.filename.endswith(".csv"):
-            # Save file temporarily
-            filename = secure_filename(file.filename)
-            working_dir = os.getenv("WORKING_DIR", "")
-            temp_dir = os.path.join(working_dir, "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-
-            temp_path = os.path.join(temp_dir, filename)
-            file.save(temp_path)
-
-            # Parse CSV and create records
-            result = self.service.create_material_records_from_csv(materials_dataset, temp_path)
+        if file and is_csv_filename(file.filename):
+            # Store, hash and parse the upload in a single pass over the request stream, sharing the file of
+            # an identical earlier upload; one declared in an Upload-Checksum header is cloned without parsing
+            result = self.service.ingest_csv_upload(
+                materials_dataset,
+                file.stream,
+                self.service.get_upload_key(materials_dataset, file.filename),
+                compression=get_csv_compression(file.filename),
+                expected_checksum=self.service.parse_sha256_header(request.headers.get("Upload-Checksum")),
+            )
 
             # Update csv_file_path if successful
             if result["success"]:
-                materials_dataset.csv_file_path = temp_path
+                materials_dataset.csv_file_path = result["csv_file_path"]
                 db.session.commit()
 
-            # Clean up temp file if parsing failed
-            if not result["success"] and os.path.exists(temp_path):
-                os.remove(temp_path)
-
             if result["success"]:
                 return {
                     "message": "CSV uploaded and parsed successfully",
                     "records_created": result["records_created"],
                     "dataset_id": materials_dataset.id,
+                    "checksum": result["checksum"],
+                    "size": result["size"],
+                    "deduplicated": result["deduplicated"],
                 }, 200
             else:
-                return {"message": "CSV parsing failed", "error": result["error"]}, 400
+                return {"message": "CSV parsing failed", "error": result["error"]}, result.get("status_code", 400)
         else:
-            return {"message": "File must be a CSV"}, 400
+            return {"message": "File must be a CSV (.csv, .csv.gz, .csv.zst or .csv.br)"}, 400
+
+
+class MaterialsDatasetUploadSessionResource(Resource):
+    """Endpoint for opening resumable (chunked) CSV uploads"""
+
+    def __init__(self):
+        # Importación diferida para evitar ciclos de importación
+        from app.modules.dataset.services import UploadSessionService
+
+        self.service = UploadSessionService()
+        self.repository = MaterialsDatasetRepository()
+
+    def post(self, id):
+        """Open a resumable upload session for a MaterialsDataset
+        ---
+        tags:
+          - MaterialsDataset
+        summary: Start a chunked CSV upload
+        description: >
+          Opens an upload session. Send the file with PUT /api/v1/uploads/{upload_id} in chunks
+          (Upload-Offset header, optional Upload-Checksum header) and finish with
+          POST /api/v1/uploads/{upload_id}/complete.
+        parameters:
+          - name: id
+            in: path
+            type: integer
+            required: true
+            description: ID of the MaterialsDataset
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              required:
+                - filename
+              properties:
+                filename:
+                  type: string
+                  example: materials.csv
+                size:
+                  type: integer
+                  description: Total size of the file in bytes
+        responses:
+          201:
+            description: Upload session created
+            schema:
+              type: object
+              properties:
+                upload_id:
+                  type: string
+                offset:
+                  type: integer
+                  example: 0
+                chunk_size:
+                  type: integer
+                  description: Largest chunk accepted per PUT
+          400:
+            description: Invalid request
+          404:
+            description: MaterialsDataset not found
+        """
+        materials_dataset = self.repository.get_by_id(id)
+        if not materials_dataset:
+            return {"message": "MaterialsDataset not found"}, 404
+
+        from app.modules.dataset.services import is_csv_filename
+
+        data = request.get_json(silent=True) or {}
+        filename = data.get("filename") or ""
+        if not is_csv_filename(filename):
+            return {"message": "File must be a CSV (.csv, .csv.gz, .csv.zst or .csv.br)"}, 400
+
+        total_size = data.get("size")
+        if total_size is not None and (not isinstance(total_size, int) or total_size < 0):
+            return {"message": "size must be a non-negative integer"}, 400
+
+        upload_session = self.service.create_session(materials_dataset, filename, total_size)
+
+        response = upload_session.to_dict()
+        response["chunk_size"] = current_app.config["UPLOAD_CHUNK_SIZE"]
+        return response, 201
+
+
+class UploadSessionResource(Resource):
+    """Endpoint for sending chunks of a resumable upload and querying its progress"""
+
+    def __init__(self):
+        # Importación diferida para evitar ciclos de importación
+        from app.modules.dataset.services import UploadSessionService
+
+        self.service = UploadSessionService()
+
+    def get(self, upload_id):
+        """Get the progress of an upload session
+        ---
+        tags:
+          - MaterialsDataset
+        summary: Get upload session status
+        description: Returns the number of bytes received so far, i.e. the offset to resume from
+        parameters:
+          - name: upload_id
+            in: path
+            type: string
+            required: true
+        responses:
+          200:
+            description: Upload session status
+            schema:
+              type: object
+              properties:
+                upload_id:
+                  type: string
+                offset:
+                  type: integer
+                size:
+                  type: integer
+                status:
+                  type: string
+                  example: active
+          404:
+            description: Upload session not found
+        """
+        upload_session = self.service.get_by_id(upload_id)
+        if not upload_session:
+            return {"message": "Upload session not found"}, 404
+
+        return upload_session.to_dict(), 200
+
+    def put(self, upload_id):
+        """Upload a chunk at a given offset
+        ---
+        tags:
+          - MaterialsDataset
+        summary: Upload a chunk
+        description: >
+          Writes the raw request body at Upload-Offset. Re-sending a chunk that was already
+          received is harmless; an offset beyond the bytes received returns 409 with the offset
+          to resume from.
+        consumes:
+          - application/octet-stream
+        parameters:
+          - name: upload_id
+            in: path
+            type: string
+            required: true
+          - name: Upload-Offset
+            in: header
+            type: integer
+            required: true
+            description: Byte offset of this chunk within the file
+          - name: Upload-Checksum
+            in: header
+            type: string
+            required: false
+            description: "Chunk checksum as '<algorithm> <hex digest>' (md5, sha1 or sha256)"
+        responses:
+          200:
+            description: Chunk stored
+            schema:
+              type: object
+              properties:
+                offset:
+                  type: integer
+          400:
+            description: Missing offset or checksum mismatch
+          404:
+            description: Upload session not found
+          409:
+            description: Offset mismatch or session no longer active
+          413:
+            description: Chunk too large
+        """
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return {"message": "Missing or invalid Upload-Offset header"}, 400
+
+        max_chunk_size = current_app.config["UPLOAD_CHUNK_SIZE"]
+        data = request.stream.read(max_chunk_size + 1)
+        if len(data) > max_chunk_size:
+            return {"message": f"Chunk larger than {max_chunk_size} bytes"}, 413
+
+        result = self.service.write_chunk(upload_id, offset, data, request.headers.get("Upload-Checksum"))
+
+        if not result["success"]:
+            return {"message": result["error"], "offset": result["offset"]}, result["status_code"]
+
+        return {"upload_id": upload_id, "offset": result["offset"]}, 200
+
+
+class UploadSessionCompleteResource(Resource):
+    """Endpoint for finishing a resumable upload"""
+
+    def __init__(self):
+        # Importación diferida para evitar ciclos de importación
+        from app.modules.dataset.services import UploadSessionService
+
+        self.service = UploadSessionService()
+
+    def post(self, upload_id):
+        """Assemble the uploaded chunks and parse the CSV
+        ---
+        tags:
+          - MaterialsDataset
+        summary: Complete a chunked upload
+        description: Hands the assembled file to the CSV ingestion pipeline and creates the material records
+        parameters:
+          - name: upload_id
+            in: path
+            type: string
+            required: true
+        responses:
+          200:
+            description: CSV uploaded and parsed successfully
+            schema:
+              type: object
+              properties:
+                message:
+                  type: string
+                records_created:
+                  type: integer
+                checksum:
+                  type: string
+                size:
+                  type: integer
+                deduplicated:
+                  type: boolean
+          400:
+            description: CSV parsing failed
+          413:
+            description: The compressed CSV expands past MAX_DECOMPRESSED_CSV_SIZE or MAX_CSV_COMPRESSION_RATIO
+          404:
+            description: Upload session not found
+          409:
+            description: Upload incomplete or session no longer active
+        """
+        result = self.service.complete(upload_id)
+
+        if not result["success"]:
+            return {"message": "CSV upload failed", "error": result["error"]}, result["status_code"]
+
+        return {
+            "message": "CSV uploaded and parsed successfully",
+            "records_created": result["records_created"],
+            "checksum": result["checksum"],
+            "size": result["size"],
+            "deduplicated": result["deduplicated"],
+        }, 200
 
 
 class MaterialRecordsResource(Resource):
@@ -411,13 +708,135 @@ class MaterialRecordsResource(Resource):
         end = start + per_page
         paginated_records = records[start:end]
 
-        return {
-            "records": [record.to_dict() for record in paginated_records],
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page,
-        }, 200
+        return json_response(
+            {
+                "records": [material_record_serializer.to_builtins(record) for record in paginated_records],
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "total_pages": (total + per_page - 1) // per_page,
+            }
+        )
+
+    def patch(self, dataset_id):
+        """Add, update and delete material records in one batch
+        ---
+        tags:
+          - MaterialRecords
+        summary: Bulk change material records
+        description: >
+          Applies all the changes in one transaction (one INSERT, one UPDATE ... FROM VALUES per
+          set of updated fields and one DELETE), then regenerates the CSV once and creates a single
+          new version of the dataset. Either every change is applied or none is.
+        parameters:
+          - name: dataset_id
+            in: path
+            type: integer
+            required: true
+            description: ID of the MaterialsDataset
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              properties:
+                add:
+                  type: array
+                  description: New records (material_name, property_name and property_value are required)
+                  items:
+                    type: object
+                update:
+                  type: array
+                  description: Records to change, each with its id and only the fields to set
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                delete:
+                  type: array
+                  description: IDs of the records to delete
+                  items:
+                    type: integer
+                row_version:
+                  type: integer
+                  description: >
+                    row_version of the dataset the changes are based on; the batch is rejected
+                    with 409 if the dataset has changed since
+        responses:
+          200:
+            description: Changes applied
+            schema:
+              type: object
+              properties:
+                dataset_id:
+                  type: integer
+                added:
+                  type: integer
+                updated:
+                  type: integer
+                deleted:
+                  type: integer
+                version:
+                  type: integer
+                  description: Number of the version created for the batch
+                row_version:
+                  type: integer
+                  description: row_version of the dataset after the batch
+          400:
+            description: Invalid changes
+          401:
+            description: Authentication required
+          403:
+            description: The dataset belongs to another user
+          404:
+            description: MaterialsDataset or some of the records not found
+          409:
+            description: The dataset changed since the given row_version
+        """
+        # Importación diferida para evitar ciclos de importación
+        from app.modules.dataset.routes import create_version_snapshot, regenerate_csv_for_dataset
+        from app.modules.dataset.services import MaterialsDatasetService, dataset_lock
+
+        if not current_user.is_authenticated:
+            return {"message": "Authentication required"}, 401
+
+        materials_dataset = MaterialsDatasetRepository().get_by_id(dataset_id)
+        if not materials_dataset:
+            return {"message": "MaterialsDataset not found"}, 404
+        if materials_dataset.user_id != current_user.id:
+            return {"message": "You don't have permission to modify this dataset"}, 403
+
+        changes = request.get_json(silent=True)
+        expected_row_version = changes.pop("row_version", None) if isinstance(changes, dict) else None
+
+        # The batch, its CSV and its version are one unit: other edits of the dataset wait for it
+        with dataset_lock(dataset_id):
+            db.session.refresh(materials_dataset)
+            if expected_row_version is not None and expected_row_version != materials_dataset.row_version:
+                return {
+                    "message": "The dataset was modified since it was read",
+                    "row_version": materials_dataset.row_version,
+                }, 409
+
+            result = MaterialsDatasetService().apply_record_changes(materials_dataset, changes)
+            if not result["success"]:
+                return {"message": result["error"]}, result["status_code"]
+
+            # One CSV and one version for the whole batch
+            if not regenerate_csv_for_dataset(dataset_id):
+                return {"message": "Records changed but the CSV file could not be regenerated"}, 500
+            summary = [f"{result[kind]} records {kind}" for kind in ("added", "updated", "deleted") if result[kind]]
+            version = create_version_snapshot(dataset_id, current_user.id, "Bulk record changes: " + ", ".join(summary))
+
+            return {
+                "dataset_id": dataset_id,
+                "added": result["added"],
+                "updated": result["updated"],
+                "deleted": result["deleted"],
+                "version": version.version_number,
+                "row_version": materials_dataset.row_version,
+            }, 200
 
 
 class MaterialRecordsSearchResource(Resource):
@@ -488,11 +907,190 @@ class MaterialRecordsSearchResource(Resource):
 
         records = self.repository.search_materials(dataset_id, search_term)
 
-        return {
-            "records": [record.to_dict() for record in records],
-            "total": len(records),
-            "search_term": search_term,
-        }, 200
+        return json_response(
+            {
+                "records": [material_record_serializer.to_builtins(record) for record in records],
+                "total": len(records),
+                "search_term": search_term,
+            }
+        )
+
+
+class MaterialRecordsSimilarResource(Resource):
+    """Endpoint for finding the formulas closest in composition to a given one"""
+
+    def get(self):
+        """Find materials similar to a chemical formula
+        ---
+        tags:
+          - MaterialRecords
+        summary: Similar materials by composition
+        description: >
+          Nearest neighbours of a formula among the distinct formulas of all datasets, comparing their
+          element fractions (Fe2O3 and Fe4O6 are the same point). Cosine scores are similarities (1 is
+          the same composition), Euclidean scores are distances (0 is the same composition).
+        parameters:
+          - name: formula
+            in: query
+            type: string
+            required: true
+            example: LiFePO4
+          - name: k
+            in: query
+            type: integer
+            default: 10
+            description: Number of formulas returned (at most 100)
+          - name: metric
+            in: query
+            type: string
+            enum: [cosine, euclidean]
+            default: cosine
+        responses:
+          200:
+            description: Closest formulas first
+            schema:
+              type: object
+              properties:
+                formula:
+                  type: string
+                metric:
+                  type: string
+                results:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      chemical_formula:
+                        type: string
+                        example: LiMnPO4
+                      score:
+                        type: number
+                        example: 0.947368
+                      composition:
+                        type: object
+                        example: {"Li": 1, "Mn": 1, "P": 1, "O": 4}
+                      records:
+                        type: integer
+                      dataset_ids:
+                        type: array
+                        items:
+                          type: integer
+          400:
+            description: Missing or unparseable formula, or unknown metric
+        """
+        from app.modules.dataset.services import CompositionSimilarityService
+
+        formula = request.args.get("formula", "", type=str).strip()
+        if not formula:
+            return {"message": "Query parameter 'formula' is required"}, 400
+        metric = request.args.get("metric", "cosine", type=str)
+        k = min(max(request.args.get("k", 10, type=int), 1), 100)
+
+        try:
+            results = CompositionSimilarityService().find_similar(formula, k, metric)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        return json_response({"formula": formula, "metric": metric, "results": results})
+
+
+class MaterialRecordsCompositionResource(Resource):
+    """Endpoint for finding MaterialRecords of every dataset by the elements of their formula"""
+
+    def __init__(self):
+        self.repository = MaterialRecordRepository()
+
+    def get(self):
+        """Search material records of all datasets by composition
+        ---
+        tags:
+          - MaterialRecords
+        summary: Search material records by elements
+        description: >
+          Records whose parsed chemical formula contains all the given elements and none of the
+          excluded ones, optionally with an exact number of distinct elements (binary oxides:
+          elements=O&element_count=2). Records with formulas that can't be parsed never match.
+        parameters:
+          - name: elements
+            in: query
+            type: string
+            description: Comma-separated element symbols the formula must contain
+            example: Fe,O
+          - name: exclude
+            in: query
+            type: string
+            description: Comma-separated element symbols the formula must not contain
+            example: Pb
+          - name: element_count
+            in: query
+            type: integer
+            description: Number of distinct elements of the formula
+          - name: page
+            in: query
+            type: integer
+            default: 1
+          - name: per_page
+            in: query
+            type: integer
+            default: 100
+        responses:
+          200:
+            description: One page of matching records
+            schema:
+              type: object
+              properties:
+                records:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      materials_dataset_id:
+                        type: integer
+                      chemical_formula:
+                        type: string
+                      composition:
+                        type: object
+                        example: {"Fe": 2, "O": 3}
+                total:
+                  type: integer
+                page:
+                  type: integer
+                per_page:
+                  type: integer
+                total_pages:
+                  type: integer
+          400:
+            description: Unknown element symbol, or no criteria
+        """
+        try:
+            elements = parse_element_symbols(request.args.get("elements", "", type=str))
+            exclude = parse_element_symbols(request.args.get("exclude", "", type=str))
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        element_count = request.args.get("element_count", None, type=int)
+        if not elements and element_count is None:
+            return {"message": "Query parameter 'elements' or 'element_count' is required"}, 400
+
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = min(max(request.args.get("per_page", 100, type=int), 1), 1000)
+        records, total = self.repository.search_by_composition(elements, exclude, element_count, page, per_page)
+
+        items = []
+        for record in records:
+            item = material_record_serializer.to_builtins(record)
+            item["materials_dataset_id"] = record.materials_dataset_id
+            item["composition"] = record.composition
+            items.append(item)
+        return json_response(
+            {
+                "records": items,
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "total_pages": (total + per_page - 1) // per_page,
+            }
+        )
 
 
 class MaterialsDatasetStatisticsResource(Resource):
@@ -564,15 +1162,20 @@ class MaterialsDatasetStatisticsResource(Resource):
         if not materials_dataset:
             return {"message": "MaterialsDataset not found"}, 404
 
-        return {
-            "dataset_id": materials_dataset.id,
-            "total_records": materials_dataset.get_materials_count(),
-            "unique_materials": materials_dataset.get_unique_materials(),
-            "unique_properties": materials_dataset.get_unique_properties(),
-            "materials_count": len(materials_dataset.get_unique_materials()),
-            "properties_count": len(materials_dataset.get_unique_properties()),
-            "csv_file_path": materials_dataset.csv_file_path,
-        }, 200
+        record_repository = MaterialRecordRepository()
+        stats = record_repository.get_listing_stats([id])[id]
+        names = record_repository.get_unique_names_by_dataset([id])[id]
+        return json_response(
+            {
+                "dataset_id": materials_dataset.id,
+                "total_records": stats["records"],
+                "unique_materials": names["materials"],
+                "unique_properties": names["properties"],
+                "materials_count": stats["materials"],
+                "properties_count": stats["properties"],
+                "csv_file_path": materials_dataset.csv_file_path,
+            }
+        )
 
 
 def init_blueprint_api(api_instance):
@@ -593,6 +1196,19 @@ def init_blueprint_api(api_instance):
         "/api/v1/materials-datasets/<int:id>/upload",
         endpoint="api_materials_dataset_upload",
     )
+    api_instance.add_resource(
+        MaterialsDatasetUploadSessionResource,
+        "/api/v1/materials-datasets/<int:id>/uploads",
+        endpoint="api_materials_dataset_upload_sessions",
+    )
+    api_instance.add_resource(
+        UploadSessionResource, "/api/v1/uploads/<string:upload_id>", endpoint="api_upload_session"
+    )
+    api_instance.add_resource(
+        UploadSessionCompleteResource,
+        "/api/v1/uploads/<string:upload_id>/complete",
+        endpoint="api_upload_session_complete",
+    )
     api_instance.add_resource(
         MaterialsDatasetStatisticsResource,
         "/api/v1/materials-datasets/<int:id>/statistics",
@@ -608,3 +1224,13 @@ def init_blueprint_api(api_instance):
         "/api/v1/materials-datasets/<int:dataset_id>/records/search",
         endpoint="api_material_records_search",
     )
+    api_instance.add_resource(
+        MaterialRecordsCompositionResource,
+        "/api/v1/material-records/composition",
+        endpoint="api_material_records_composition",
+    )
+    api_instance.add_resource(
+        MaterialRecordsSimilarResource,
+        "/api/v1/material-records/similar",
+        endpoint="api_material_records_similar",
+    )
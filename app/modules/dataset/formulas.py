@@ -0,0 +1,112 @@
+"""
+Chemical formula parsing: the element -> amount composition of formulas such as "Fe2O3", "Ca(OH)2",
+"CuSO4·5H2O", "LiNi0.8Co0.1Mn0.1O2", "Fe-C" or "(C2F4)n", and the atomic numbers the composition
+of a MaterialRecord is indexed by. Free of application imports so migrations can use it too.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ELEMENTS = (
+    "H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr "
+    "Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb "
+    "Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf "
+    "Db Sg Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og"
+).split()
+
+ATOMIC_NUMBERS = {symbol: number for number, symbol in enumerate(ELEMENTS, start=1)}
+
+# Between the parts of hydrates, adducts and alloys: "CuSO4·5H2O", "Fe-C", "NaCl + KCl"
+_PART_SEPARATOR = re.compile(r"\s*[·•∙*+\-\s]\s*")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?|\.\d+")
+_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+def _merge(counts: Dict[str, float], other: Dict[str, float], factor: float = 1):
+    for symbol, amount in other.items():
+        counts[symbol] = counts.get(symbol, 0) + amount * factor
+
+
+def _parse_group(formula: str, position: int, closing: Optional[str]) -> Tuple[Dict[str, float], int]:
+    """Composition of ``formula`` from ``position`` up to ``closing`` (or the end), and the position after it"""
+    counts = {}
+    while position < len(formula):
+        char = formula[position]
+        if char == closing:
+            return counts, position + 1
+        if char in _BRACKETS:
+            item, position = _parse_group(formula, position + 1, _BRACKETS[char])
+            is_group = True
+        elif formula[position : position + 2] in ATOMIC_NUMBERS:
+            item, position = {formula[position : position + 2]: 1}, position + 2
+            is_group = False
+        elif char in ATOMIC_NUMBERS:
+            item, position = {char: 1}, position + 1
+            is_group = False
+        else:
+            raise ValueError(f"Unexpected {char!r} at {position}")
+
+        number = _NUMBER.match(formula, position)
+        if number:
+            factor, position = float(number.group()), number.end()
+        elif is_group and formula[position : position + 1] == "n":
+            # Repeat unit of a polymer: the composition is the unit's
+            factor, position = 1, position + 1
+        else:
+            factor = 1
+        _merge(counts, item, factor)
+
+    if closing is not None:
+        raise ValueError(f"Missing {closing!r}")
+    return counts, position
+
+
+def parse_formula(formula: Optional[str]) -> Optional[Dict[str, float]]:
+    """
+    Element symbol -> amount of a chemical formula, in order of appearance, or None when the
+    formula is empty or not one this parser reads (unknown symbols, charges, variable indices).
+    Parts separated by "·", "*", "+", "-" or spaces add up, each multiplied by its leading number.
+    """
+    formula = (formula or "").strip()
+    if not formula:
+        return None
+    counts = {}
+    try:
+        for part in _PART_SEPARATOR.split(formula):
+            if not part:
+                continue
+            coefficient = _NUMBER.match(part)
+            start = coefficient.end() if coefficient else 0
+            part_counts, _ = _parse_group(part, start, None)
+            if not part_counts:
+                return None
+            _merge(counts, part_counts, float(coefficient.group()) if coefficient else 1)
+    except ValueError:
+        return None
+    if not counts or any(amount <= 0 for amount in counts.values()):
+        return None
+    return {symbol: int(amount) if amount == int(amount) else round(amount, 6) for symbol, amount in counts.items()}
+
+
+def atomic_numbers(symbols: Iterable[str]) -> List[int]:
+    """Sorted atomic numbers of element symbols, without repeats"""
+    return sorted({ATOMIC_NUMBERS[symbol] for symbol in symbols})
+
+
+def parse_element_symbols(symbols) -> List[str]:
+    """
+    Element symbols of a comma-separated string or a list, case-insensitive ("fe, O" -> ["Fe", "O"]).
+    Raises ValueError naming the first value that is not an element.
+    """
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    result = []
+    for value in symbols or []:
+        symbol = str(value).strip().capitalize()
+        if not symbol:
+            continue
+        if symbol not in ATOMIC_NUMBERS:
+            raise ValueError(f"Unknown element: {str(value).strip()}")
+        if symbol not in result:
+            result.append(symbol)
+    return result
@@ -1,10 +1,19 @@
+import hashlib
+import re
 from datetime import datetime
 from enum import Enum
+from typing import Dict, Iterable, List, Optional
 
+import unidecode
 from flask import request
 from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.orm import Session
 
 from app import db
+from app.modules.dataset.formulas import atomic_numbers, parse_formula
 
 
 class PublicationType(Enum):
@@ -37,11 +46,41 @@ class DataSource(Enum):
     OTHER = "other"
 
 
+ORCID_PATTERN = re.compile(r"\d{4}-\d{4}-\d{4}-\d{3}[\dX]")
+
+# Length of Author.identity_key. Transliterated names can be several times longer than the 120
+# characters of Author.name (a CJK character becomes 3-4 letters), so longer keys end in a hash
+AUTHOR_IDENTITY_KEY_LENGTH = 130
+
+
+def author_identity_key(name: Optional[str], orcid: Optional[str] = None) -> str:
+    """
+    Key identifying the person behind an author entry across datasets: "orcid:<iD>" when the entry
+    has a valid ORCID iD (bare or as a URL), otherwise "name:" and the name without accents,
+    punctuation or case, with its words sorted so "Smith, Jane" and "Jane Smith" are the same.
+    Name keys longer than AUTHOR_IDENTITY_KEY_LENGTH are cut short and end in the SHA-1 of the full key.
+    """
+    match = ORCID_PATTERN.search((orcid or "").upper())
+    if match:
+        return f"orcid:{match.group()}"
+    words = re.sub(r"[^0-9a-z]+", " ", unidecode.unidecode(name or "").lower()).split()
+    key = "name:" + " ".join(sorted(words))
+    if len(key) > AUTHOR_IDENTITY_KEY_LENGTH:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        key = key[: AUTHOR_IDENTITY_KEY_LENGTH - len(digest) - 1] + "#" + digest
+    return key
+
+
 class Author(db.Model):
+    # "Datasets of this person" lookups go through the identity key, then the metadata id
+    __table_args__ = (db.Index("ix_author_identity_key_ds_meta_data_id", "identity_key", "ds_meta_data_id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     affiliation = db.Column(db.String(120))
     orcid = db.Column(db.String(120))
+    # Derived from name and orcid on every insert and update, see author_identity_key()
+    identity_key = db.Column(db.String(AUTHOR_IDENTITY_KEY_LENGTH), nullable=False)
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"))
 
     def to_dict(self):
@@ -57,6 +96,34 @@ class DSMetrics(db.Model):
         return f"DSMetrics<models={self.number_of_models}, features={self.number_of_features}>"
 
 
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Normalised tag names of a comma-separated tags string: trimmed, lowercase, without repeats"""
+    names = (" ".join(tag.split()).lower() for tag in (tags or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class Tag(db.Model):
+    """One row per distinct tag name, normalised with ``parse_tags()``"""
+
+    __tablename__ = "tag"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"Tag<{self.id}: {self.name}>"
+
+
+# Tags of every dataset's metadata, kept in sync with DSMetaData.tags on flush (see _sync_dataset_tags).
+# The primary key serves "tags of a dataset"; the second index serves "datasets with a tag".
+dataset_tag = db.Table(
+    "dataset_tag",
+    db.Column("ds_meta_data_id", db.Integer, db.ForeignKey("ds_meta_data.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_dataset_tag_tag_id_ds_meta_data_id", "tag_id", "ds_meta_data_id"),
+)
+
+
 class DSMetaData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     deposition_id = db.Column(db.Integer)
@@ -69,6 +136,8 @@ class DSMetaData(db.Model):
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
     authors = db.relationship("Author", backref="ds_meta_data", lazy=True, cascade="all, delete")
+    # Normalised form of ``tags``, for indexed filtering and counts; written only by _sync_dataset_tags
+    tag_list = db.relationship("Tag", secondary=dataset_tag, lazy=True, passive_deletes=True)
 
 
 # Base abstract class for all dataset types
@@ -147,12 +216,34 @@ class BaseDataset(db.Model):
         return f"{self.__class__.__name__}<{self.id}>"
 
 
+def composition_columns(chemical_formula: Optional[str]) -> dict:
+    """
+    The composition and elements of a record with this formula (both None when it can't be parsed),
+    for the writes that bypass the ORM events: bulk inserts and updates, seeders
+    """
+    composition = parse_formula(chemical_formula)
+    return {"composition": composition, "elements": atomic_numbers(composition) if composition else None}
+
+
 # Material record model - represents a single row in the materials CSV
 class MaterialRecord(db.Model):
     __tablename__ = "material_record"
+    __table_args__ = (
+        # "Contains Fe and O" is elements @> '{26,8}': posting lists of the GIN index intersected as bitmaps
+        db.Index("ix_material_record_elements", "elements", postgresql_using="gin"),
+        # The distinct formulas and compositions the similarity index is built from, as an index-only scan
+        db.Index(
+            "ix_material_record_formula_composition",
+            "chemical_formula",
+            postgresql_include=["composition"],
+            postgresql_where=db.text("elements IS NOT NULL"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    materials_dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id"), nullable=False)
+    materials_dataset_id = db.Column(
+        db.Integer, db.ForeignKey("materials_dataset.id", ondelete="CASCADE"), nullable=False, index=True
+    )
 
     # CSV column fields
     material_name = db.Column(db.String(256), nullable=False)
@@ -168,6 +259,11 @@ class MaterialRecord(db.Model):
     uncertainty = db.Column(db.Float)  # Changed from Integer to support decimal uncertainty values
     description = db.Column(db.Text)
 
+    # Derived from chemical_formula on every write, see composition_columns(): element symbol -> amount,
+    # and the sorted atomic numbers of those elements. NULL when the formula can't be parsed
+    composition = db.Column(db.JSON)
+    elements = db.Column(ARRAY(db.SmallInteger))
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -195,17 +291,30 @@ class MaterialsDataset(BaseDataset):
 
     # Fields specific to materials datasets
     csv_file_path = db.Column(db.String(512))
+    # SHA-256 of the uploaded CSV as received; cleared once the file is regenerated from edited records
+    csv_checksum = db.Column(db.String(64), index=True)
+    # Optimistic concurrency: every UPDATE of the row checks and increments it, so a write based
+    # on a stale copy of the dataset fails with StaleDataError instead of overwriting a newer one
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": row_version}
 
     # Relationships specific to Materials datasets
     user = db.relationship("User", backref=db.backref("materials_datasets", lazy=True))
     ds_meta_data = db.relationship(
         "DSMetaData", backref=db.backref("materials_dataset", uselist=False), cascade="all, delete"
     )
-    material_records = db.relationship("MaterialRecord", backref="materials_dataset", lazy=True, cascade="all, delete")
+    # Children are removed by ON DELETE CASCADE foreign keys; passive_deletes keeps the ORM from loading
+    # them (one row at a time) just to delete them
+    material_records = db.relationship(
+        "MaterialRecord", backref="materials_dataset", lazy=True, cascade="all, delete", passive_deletes=True
+    )
     download_records = db.relationship(
-        "DSDownloadRecord", backref="materials_dataset", lazy=True, cascade="all, delete"
+        "DSDownloadRecord", backref="materials_dataset", lazy=True, cascade="all, delete", passive_deletes=True
+    )
+    view_records = db.relationship(
+        "DSViewRecord", backref="materials_dataset", lazy=True, cascade="all, delete", passive_deletes=True
     )
-    view_records = db.relationship("DSViewRecord", backref="materials_dataset", lazy=True, cascade="all, delete")
 
     def files(self):
         """Get CSV files for materials dataset"""
@@ -284,7 +393,7 @@ class MaterialsDataset(BaseDataset):
 class DSDownloadRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
-    dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id"))
+    dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id", ondelete="CASCADE"), index=True)
     download_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     download_cookie = db.Column(db.String(36), nullable=False)  # Assuming UUID4 strings
 
@@ -300,7 +409,7 @@ class DSDownloadRecord(db.Model):
 class DSViewRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
-    dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id"))
+    dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id", ondelete="CASCADE"), index=True)
     view_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     view_cookie = db.Column(db.String(36), nullable=False)  # Assuming UUID4 strings
 
@@ -318,9 +427,15 @@ class DatasetVersion(db.Model):
     """Model for storing dataset version snapshots"""
 
     __tablename__ = "dataset_version"
+    # Two writers can't both create "version N"; the unique index also serves the per-dataset lookups
+    __table_args__ = (
+        db.UniqueConstraint("materials_dataset_id", "version_number", name="uq_dataset_version_dataset_number"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    materials_dataset_id = db.Column(db.Integer, db.ForeignKey("materials_dataset.id"), nullable=False)
+    materials_dataset_id = db.Column(
+        db.Integer, db.ForeignKey("materials_dataset.id", ondelete="CASCADE"), nullable=False
+    )
     version_number = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     created_by_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
@@ -339,7 +454,11 @@ class DatasetVersion(db.Model):
     materials_dataset = db.relationship(
         "MaterialsDataset",
         backref=db.backref(
-            "versions", lazy=True, cascade="all, delete", order_by="DatasetVersion.version_number.desc()"
+            "versions",
+            lazy=True,
+            cascade="all, delete",
+            passive_deletes=True,
+            order_by="DatasetVersion.version_number.desc()",
         ),
     )
     created_by = db.relationship("User")
@@ -362,3 +481,120 @@ class DatasetVersion(db.Model):
 
     def __repr__(self):
         return f"DatasetVersion<{self.id}: v{self.version_number} of dataset {self.materials_dataset_id}>"
+
+
+class UploadSession(db.Model):
+    """Resumable chunked CSV upload in progress for a MaterialsDataset"""
+
+    __tablename__ = "upload_session"
+
+    STATUS_ACTIVE = "active"
+    STATUS_PROCESSING = "processing"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    id = db.Column(db.String(36), primary_key=True)
+    materials_dataset_id = db.Column(
+        db.Integer, db.ForeignKey("materials_dataset.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    filename = db.Column(db.String(255), nullable=False)
+
+    # Declared total size in bytes (optional) and number of contiguous bytes received so far
+    total_size = db.Column(db.BigInteger, nullable=True)
+    received_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+
+    status = db.Column(db.String(20), nullable=False, default=STATUS_ACTIVE)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    materials_dataset = db.relationship(
+        "MaterialsDataset",
+        backref=db.backref("upload_sessions", lazy=True, cascade="all, delete", passive_deletes=True),
+    )
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "dataset_id": self.materials_dataset_id,
+            "filename": self.filename,
+            "offset": self.received_bytes,
+            "size": self.total_size,
+            "status": self.status,
+        }
+
+    def __repr__(self):
+        return f"UploadSession<{self.id}: {self.received_bytes}/{self.total_size} bytes of {self.filename}>"
+
+
+class FileDeletion(db.Model):
+    """
+    Stored file (or every file under a prefix) waiting to be removed by the file reaper.
+
+    Rows are added in the same transaction as the database change that orphans the
+    files, so a crash between the commit and the removal never leaks them.
+    """
+
+    __tablename__ = "file_deletion"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(512), nullable=False)
+    is_prefix = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"FileDeletion<{self.id}: {self.key}{'/*' if self.is_prefix else ''}>"
+
+
+def ensure_tag_ids(executor, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Ids of the tags ``names`` (already normalised), creating the missing ones. ``executor`` is
+    a Session or a Connection; on PostgreSQL concurrent writers creating the same tag don't conflict.
+    """
+    names = sorted(set(names))
+    if not names:
+        return {}
+    table = Tag.__table__
+    dialect = executor.dialect if hasattr(executor, "dialect") else executor.get_bind().dialect
+    if dialect.name == "postgresql":
+        executor.execute(postgresql_insert(table).values([{"name": name} for name in names]).on_conflict_do_nothing())
+    else:
+        existing = set(executor.execute(select(table.c.name).where(table.c.name.in_(names))).scalars())
+        missing = [{"name": name} for name in names if name not in existing]
+        if missing:
+            executor.execute(table.insert(), missing)
+    return dict(executor.execute(select(table.c.name, table.c.id).where(table.c.name.in_(names))).all())
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_dataset_tags(session, flush_context, instances):
+    """Rewrites the dataset_tag rows of every DSMetaData whose ``tags`` string is new or changed"""
+    changed = [
+        meta_data
+        for meta_data in list(session.new) + list(session.dirty)
+        if isinstance(meta_data, DSMetaData)
+        and (meta_data in session.new or inspect(meta_data).attrs.tags.history.has_changes())
+    ]
+    changed = [meta_data for meta_data in changed if meta_data.tags or meta_data not in session.new]
+    if not changed:
+        return
+
+    with session.no_autoflush:
+        tag_ids = ensure_tag_ids(session, (name for meta_data in changed for name in parse_tags(meta_data.tags)))
+        tags = {tag.id: tag for tag in session.query(Tag).filter(Tag.id.in_(tag_ids.values()))} if tag_ids else {}
+        for meta_data in changed:
+            meta_data.tag_list = [tags[tag_ids[name]] for name in parse_tags(meta_data.tags)]
+
+
+@event.listens_for(Author, "before_insert")
+@event.listens_for(Author, "before_update")
+def _set_author_identity_key(mapper, connection, author):
+    author.identity_key = author_identity_key(author.name, author.orcid)
+
+
+@event.listens_for(MaterialRecord, "before_insert")
+@event.listens_for(MaterialRecord, "before_update")
+def _set_material_record_composition(mapper, connection, record):
+    for name, value in composition_columns(record.chemical_formula).items():
+        setattr(record, name, value)
@@ -1,10 +1,12 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 
 from flask_login import current_user
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, cast, column, delete, desc, func, insert, literal, select, update, values
+from sqlalchemy.orm import selectinload
 
+from app.modules.dataset.formulas import atomic_numbers, parse_formula
 from app.modules.dataset.models import (
     Author,
     DatasetVersion,
@@ -12,9 +14,15 @@ from app.modules.dataset.models import (
     DSDownloadRecord,
     DSMetaData,
     DSViewRecord,
+    FileDeletion,
     MaterialRecord,
     MaterialsDataset,
+    Tag,
+    UploadSession,
+    composition_columns,
+    dataset_tag,
 )
+from core.database.database import replica_reads
 from core.repositories.BaseRepository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -24,13 +32,25 @@ class AuthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Author)
 
+    def get_meta_data_ids_sharing_authors(self, ds_meta_data_id: int) -> set:
+        """Ids of the other metadata rows with an author of ``ds_meta_data_id`` (same identity key)"""
+        own_keys = select(Author.identity_key).where(Author.ds_meta_data_id == ds_meta_data_id)
+        statement = (
+            select(Author.ds_meta_data_id)
+            .where(Author.identity_key.in_(own_keys), Author.ds_meta_data_id != ds_meta_data_id)
+            .distinct()
+        )
+        with replica_reads():
+            return set(self.session.execute(statement).scalars())
+
 
 class DSDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSDownloadRecord)
 
     def total_dataset_downloads(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
+        with replica_reads():
+            max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
 
 
@@ -47,7 +67,8 @@ class DSViewRecordRepository(BaseRepository):
         super().__init__(DSViewRecord)
 
     def total_dataset_views(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
+        with replica_reads():
+            max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
 
     def the_record_exists(self, dataset: MaterialsDataset, user_cookie: str):
@@ -78,9 +99,19 @@ class MaterialsDatasetRepository(BaseRepository):
     def __init__(self):
         super().__init__(MaterialsDataset)
 
+    @staticmethod
+    def listing_options():
+        """Loader options for dataset cards: metadata and authors of the whole page in one query each"""
+        return (selectinload(MaterialsDataset.ds_meta_data).selectinload(DSMetaData.authors),)
+
     def get_by_user(self, user_id: int):
         """Get all materials datasets for a specific user"""
-        return self.model.query.filter_by(user_id=user_id).order_by(desc(self.model.created_at)).all()
+        return (
+            self.model.query.options(*self.listing_options())
+            .filter_by(user_id=user_id)
+            .order_by(desc(self.model.created_at))
+            .all()
+        )
 
     def get_synchronized(self, current_user_id: int):
         """Get synchronized materials datasets (with DOI)"""
@@ -100,32 +131,97 @@ class MaterialsDatasetRepository(BaseRepository):
             .all()
         )
 
+    def get_related_page(self, dataset: MaterialsDataset, filter_type: Optional[str], page: int, per_page: int):
+        """
+        One page of the other datasets related to ``dataset`` and the total count, newest first.
+
+        ``filter_type`` "authors", "tags" or "properties" keeps those sharing an author identity, a
+        tag or a measured property name (trimmed, case-insensitive), each as an EXISTS semi-join;
+        any other value keeps them all. Only the page is loaded, never the whole catalogue.
+        """
+        query = self.model.query.filter(self.model.id != dataset.id, self.model.ds_meta_data_id.isnot(None))
+
+        if filter_type == "authors":
+            own_authors = select(Author.identity_key).where(Author.ds_meta_data_id == dataset.ds_meta_data_id)
+            query = query.filter(
+                select(Author.id)
+                .where(Author.ds_meta_data_id == self.model.ds_meta_data_id, Author.identity_key.in_(own_authors))
+                .exists()
+            )
+        elif filter_type == "tags":
+            own_tags = select(dataset_tag.c.tag_id).where(dataset_tag.c.ds_meta_data_id == dataset.ds_meta_data_id)
+            query = query.filter(
+                select(dataset_tag.c.tag_id)
+                .where(dataset_tag.c.ds_meta_data_id == self.model.ds_meta_data_id, dataset_tag.c.tag_id.in_(own_tags))
+                .exists()
+            )
+        elif filter_type == "properties":
+            property_key = func.lower(func.trim(MaterialRecord.property_name))
+            own_properties = select(property_key).where(MaterialRecord.materials_dataset_id == dataset.id)
+            query = query.filter(
+                select(MaterialRecord.id)
+                .where(MaterialRecord.materials_dataset_id == self.model.id, property_key.in_(own_properties))
+                .exists()
+            )
+
+        with replica_reads():
+            total = query.order_by(None).count()
+            items = (
+                query.options(*self.listing_options())
+                .order_by(desc(self.model.created_at), desc(self.model.id))
+                .offset((page - 1) * per_page)
+                .limit(per_page)
+                .all()
+            )
+        return items, total
+
     def count_by_user(self, user_id: int) -> int:
         """Count materials datasets for a user"""
         return self.model.query.filter_by(user_id=user_id).count()
 
     def count_all(self) -> int:
         """Count all materials datasets"""
-        return self.model.query.count()
+        with replica_reads():
+            return self.model.query.count()
 
     def count_synchronized(self) -> int:
         """Count synchronized materials datasets (with DOI)"""
-        return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count()
+        with replica_reads():
+            return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count()
 
     def get_synchronized_latest(self, limit: int = 5):
         """Get latest synchronized materials datasets (with DOI)"""
-        return (
-            self.model.query.join(DSMetaData)
-            .filter(DSMetaData.dataset_doi.isnot(None))
-            .order_by(desc(self.model.created_at))
-            .limit(limit)
-            .all()
-        )
+        with replica_reads():
+            return (
+                self.model.query.options(*self.listing_options())
+                .join(DSMetaData)
+                .filter(DSMetaData.dataset_doi.isnot(None))
+                .order_by(desc(self.model.created_at))
+                .limit(limit)
+                .all()
+            )
 
     def get_all(self):
         """Get all materials datasets ordered by creation date (newest first)"""
         return self.model.query.order_by(desc(self.model.created_at)).all()
 
+    def get_by_csv_checksum(self, checksum: str):
+        """Get materials datasets whose uploaded CSV has the given SHA-256, oldest first"""
+        return (
+            self.model.query.filter(self.model.csv_checksum == checksum, self.model.csv_file_path.isnot(None))
+            .order_by(self.model.id)
+            .all()
+        )
+
+    def is_csv_file_shared(self, dataset: MaterialsDataset) -> bool:
+        """Whether another dataset points at the same stored CSV file (de-duplicated upload)"""
+        return (
+            self.model.query.filter(
+                self.model.csv_file_path == dataset.csv_file_path, self.model.id != dataset.id
+            ).count()
+            > 0
+        )
+
     def get_top_downloads_global(self, limit: int = 10, days: int = 30):
         """
         Top global por descargas en los últimos 'days' días para MaterialsDataset.
@@ -155,7 +251,8 @@ class MaterialsDatasetRepository(BaseRepository):
             .order_by(func.coalesce(func.count(DSDownloadRecord.id), 0).desc())
             .limit(limit)
         )
-        return q.all()
+        with replica_reads():
+            return q.all()
 
     def get_top_views_global(self, limit: int = 10, days: int = 30):
         """
@@ -186,7 +283,8 @@ class MaterialsDatasetRepository(BaseRepository):
             .order_by(func.coalesce(func.count(DSViewRecord.id), 0).desc())
             .limit(limit)
         )
-        return q.all()
+        with replica_reads():
+            return q.all()
 
 
 class MaterialRecordRepository(BaseRepository):
@@ -206,13 +304,89 @@ class MaterialRecordRepository(BaseRepository):
         return self.model.query.filter_by(materials_dataset_id=dataset_id, property_name=property_name).all()
 
     def search_materials(self, dataset_id: int, search_term: str):
-        """Search materials by name or chemical formula"""
+        """
+        Search materials by name or chemical formula. A term that parses as a formula matches the
+        formulas containing its elements ("Fe" finds FeO and Fe2O3, not "Fermium"); any other term
+        is a substring of the formula.
+        """
+        composition = parse_formula(search_term)
+        if composition:
+            formula_filter = self.model.elements.contains(atomic_numbers(composition))
+        else:
+            formula_filter = self.model.chemical_formula.ilike(f"%{search_term}%")
         return self.model.query.filter(
             self.model.materials_dataset_id == dataset_id,
-            (self.model.material_name.ilike(f"%{search_term}%"))
-            | (self.model.chemical_formula.ilike(f"%{search_term}%")),
+            (self.model.material_name.ilike(f"%{search_term}%")) | formula_filter,
         ).all()
 
+    def composition_filters(
+        self, elements: Iterable[str] = (), exclude: Iterable[str] = (), element_count: Optional[int] = None
+    ) -> list:
+        """
+        Filters on the parsed formula of records: containing every symbol of ``elements``, none of
+        ``exclude``, and exactly ``element_count`` distinct elements when given ("binary oxides" is
+        elements=["O"], element_count=2). Records whose formula couldn't be parsed never match.
+        """
+        filters = [self.model.elements.isnot(None)]
+        if elements:
+            filters.append(self.model.elements.contains(atomic_numbers(elements)))
+        if exclude:
+            filters.append(~self.model.elements.overlap(atomic_numbers(exclude)))
+        if element_count is not None:
+            filters.append(func.cardinality(self.model.elements) == element_count)
+        return filters
+
+    def search_by_composition(
+        self,
+        elements: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        element_count: Optional[int] = None,
+        page: int = 1,
+        per_page: int = 100,
+    ):
+        """One page of the records of every dataset with this composition (see composition_filters) and the total"""
+        query = self.model.query.filter(*self.composition_filters(elements, exclude, element_count))
+        with replica_reads():
+            total = query.count()
+            items = query.order_by(self.model.id).offset((page - 1) * per_page).limit(per_page).all()
+        return items, total
+
+    def get_max_id(self) -> Optional[int]:
+        """Highest record id, None without records: grows with every insert"""
+        with replica_reads():
+            return self.session.execute(select(func.max(self.model.id))).scalar()
+
+    def get_formula_compositions(self) -> List[tuple]:
+        """(formula, composition) of every distinct formula that could be parsed, across all datasets"""
+        statement = (
+            select(self.model.chemical_formula, self.model.composition)
+            .where(self.model.elements.isnot(None))
+            .distinct(self.model.chemical_formula)
+            .order_by(self.model.chemical_formula)
+        )
+        with replica_reads():
+            return self.session.execute(statement).all()
+
+    def get_formula_usage(self, formulas: Iterable[str]) -> Dict[str, dict]:
+        """Number of records and ids of the datasets using each formula, with one GROUP BY"""
+        formulas = list(formulas)
+        usage = {formula: {"records": 0, "dataset_ids": []} for formula in formulas}
+        if not formulas:
+            return usage
+        statement = (
+            select(
+                self.model.chemical_formula,
+                func.count(self.model.id),
+                func.array_agg(func.distinct(self.model.materials_dataset_id)),
+            )
+            .where(self.model.chemical_formula.in_(formulas))
+            .group_by(self.model.chemical_formula)
+        )
+        with replica_reads():
+            for formula, records, dataset_ids in self.session.execute(statement):
+                usage[formula] = {"records": records, "dataset_ids": sorted(dataset_ids)}
+        return usage
+
     def filter_by_temperature_range(self, dataset_id: int, min_temp: int = None, max_temp: int = None):
         """Filter records by temperature range"""
         query = self.model.query.filter_by(materials_dataset_id=dataset_id)
@@ -246,6 +420,121 @@ class MaterialRecordRepository(BaseRepository):
         """Count records in a dataset"""
         return self.model.query.filter_by(materials_dataset_id=dataset_id).count()
 
+    def get_listing_stats(self, dataset_ids: Iterable[int]) -> Dict[int, dict]:
+        """
+        Record, distinct material and distinct property counts of several datasets with a
+        single GROUP BY, keyed by dataset id. Datasets without records get zeros.
+        """
+        stats = {dataset_id: {"records": 0, "materials": 0, "properties": 0} for dataset_id in dataset_ids}
+        if not stats:
+            return stats
+        rows = (
+            self.model.query.with_entities(
+                self.model.materials_dataset_id,
+                func.count(self.model.id),
+                func.count(func.distinct(self.model.material_name)),
+                func.count(func.distinct(self.model.property_name)),
+            )
+            .filter(self.model.materials_dataset_id.in_(list(stats)))
+            .group_by(self.model.materials_dataset_id)
+        )
+        for dataset_id, records, materials, properties in rows:
+            stats[dataset_id] = {"records": records, "materials": materials, "properties": properties}
+        return stats
+
+    def get_unique_names_by_dataset(self, dataset_ids: Iterable[int]) -> Dict[int, dict]:
+        """Distinct material and property names of several datasets (one query each), keyed by dataset id"""
+        names = {dataset_id: {"materials": [], "properties": []} for dataset_id in dataset_ids}
+        if not names:
+            return names
+        for key, name_column in (("materials", self.model.material_name), ("properties", self.model.property_name)):
+            rows = (
+                self.model.query.with_entities(self.model.materials_dataset_id, name_column)
+                .filter(self.model.materials_dataset_id.in_(list(names)))
+                .distinct()
+            )
+            for dataset_id, name in rows:
+                names[dataset_id][key].append(name)
+        return names
+
+    def clone_records(self, source_dataset_id: int, target_dataset_id: int) -> int:
+        """
+        Copy every record of a dataset into another one with a single INSERT ... SELECT.
+        Does not commit. Returns the number of records copied.
+        """
+        columns = [c for c in self.model.__table__.columns if c.name not in ("id", "materials_dataset_id")]
+        source_rows = select(literal(target_dataset_id), *columns).where(
+            self.model.materials_dataset_id == source_dataset_id
+        )
+        statement = insert(self.model.__table__).from_select(
+            ["materials_dataset_id"] + [c.name for c in columns], source_rows
+        )
+        return self.session.execute(statement).rowcount
+
+    def get_existing_ids(self, dataset_id: int, record_ids: Iterable[int]) -> set:
+        """The ids among ``record_ids`` that belong to records of the dataset"""
+        record_ids = list(record_ids)
+        if not record_ids:
+            return set()
+        rows = self.session.execute(
+            select(self.model.id).where(self.model.materials_dataset_id == dataset_id, self.model.id.in_(record_ids))
+        )
+        return {record_id for (record_id,) in rows}
+
+    def insert_many(self, dataset_id: int, rows: List[dict]) -> int:
+        """Insert records of a dataset with one multi-row INSERT. Does not commit."""
+        if not rows:
+            return 0
+        rows = [{**row, **composition_columns(row.get("chemical_formula"))} for row in rows]
+        # Same keys in every row (on the table, so None is not dropped) keep it to one statement
+        names = sorted({name for row in rows for name in row})
+        self.session.execute(
+            insert(self.model.__table__),
+            [{"materials_dataset_id": dataset_id, **{name: row.get(name) for name in names}} for row in rows],
+        )
+        return len(rows)
+
+    def update_many(self, dataset_id: int, updates: List[dict]) -> int:
+        """
+        Update records of a dataset with ``UPDATE ... FROM (VALUES ...)``. Each update is a
+        dict with the record ``id`` and the fields to set; updates setting the same fields
+        share one statement. Does not commit. Returns the number of records updated.
+        """
+        table = self.model.__table__
+        groups = {}
+        for item in updates:
+            if "chemical_formula" in item:
+                item = {**item, **composition_columns(item["chemical_formula"])}
+            fields = tuple(sorted(name for name in item if name != "id"))
+            if fields:
+                groups.setdefault(fields, []).append(item)
+
+        updated = 0
+        for fields, items in groups.items():
+            changes = values(
+                column("id", table.c.id.type),
+                *(column(name, table.c[name].type) for name in fields),
+                name="changes",
+            ).data([(item["id"], *(item[name] for name in fields)) for item in items])
+            # Cast to the column types: VALUES would type NULL-only or enum columns as text
+            statement = (
+                update(table)
+                .where(table.c.id == changes.c.id, table.c.materials_dataset_id == dataset_id)
+                .values({name: cast(changes.c[name], table.c[name].type) for name in fields})
+            )
+            updated += self.session.execute(statement).rowcount
+        return updated
+
+    def delete_many(self, dataset_id: int, record_ids: Iterable[int]) -> int:
+        """Delete records of a dataset with one ``DELETE ... WHERE id IN``. Does not commit."""
+        record_ids = list(record_ids)
+        if not record_ids:
+            return 0
+        statement = delete(self.model).where(
+            self.model.materials_dataset_id == dataset_id, self.model.id.in_(record_ids)
+        )
+        return self.session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+
 
 class DatasetVersionRepository(BaseRepository):
     def __init__(self):
@@ -277,3 +566,58 @@ class DatasetVersionRepository(BaseRepository):
     def get_version_by_number(self, dataset_id: int, version_number: int) -> Optional[DatasetVersion]:
         """Get a specific version by dataset_id and version_number"""
         return self.model.query.filter_by(materials_dataset_id=dataset_id, version_number=version_number).first()
+
+
+class UploadSessionRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(UploadSession)
+
+    def get_for_update(self, upload_id: str) -> Optional[UploadSession]:
+        """Get an upload session locking its row until the end of the transaction"""
+        return self.model.query.filter_by(id=upload_id).with_for_update().first()
+
+    def get_stale(self, updated_before: datetime) -> List[UploadSession]:
+        """Sessions never completed and untouched since ``updated_before``"""
+        return self.model.query.filter(
+            self.model.status != UploadSession.STATUS_COMPLETED, self.model.updated_at < updated_before
+        ).all()
+
+
+class TagRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Tag, read_replica=True)
+
+    def count_shared_tags(self, ds_meta_data_id: int) -> Dict[int, int]:
+        """Number of tags shared with ``ds_meta_data_id`` per other metadata id, for those sharing any"""
+        own_tags = select(dataset_tag.c.tag_id).where(dataset_tag.c.ds_meta_data_id == ds_meta_data_id)
+        statement = (
+            select(dataset_tag.c.ds_meta_data_id, func.count())
+            .where(dataset_tag.c.tag_id.in_(own_tags), dataset_tag.c.ds_meta_data_id != ds_meta_data_id)
+            .group_by(dataset_tag.c.ds_meta_data_id)
+        )
+        with self.reading():
+            return dict(self.session.execute(statement).all())
+
+
+class FileDeletionRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(FileDeletion)
+
+    def claim_pending(self, limit: int, max_attempts: int) -> List[FileDeletion]:
+        """
+        Oldest pending deletions, locked until the end of the transaction. Rows locked by
+        another reaper are skipped, so concurrent reapers never process the same file.
+        """
+        return (
+            self.model.query.filter(self.model.attempts < max_attempts)
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def is_key_referenced(self, key: str) -> bool:
+        """Whether a dataset (its current CSV) or a version (its snapshot) still points at a stored file"""
+        datasets = select(MaterialsDataset.id).where(MaterialsDataset.csv_file_path == key)
+        versions = select(DatasetVersion.id).where(DatasetVersion.csv_snapshot_path == key)
+        return self.session.execute(select(datasets.exists() | versions.exists())).scalar()
@@ -1,4 +1,5 @@
 import csv
+import io
 import json
 import logging
 import os
@@ -7,9 +8,10 @@ import time
 import uuid
 from datetime import datetime, timezone
 
-from flask import abort, flash, jsonify, make_response, redirect, render_template, request, send_from_directory, url_for
+from flask import abort, flash, jsonify, make_response, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import flag_modified
 
 from app.modules.dataset import dataset_bp
 from app.modules.dataset.forms import DataSetForm, MaterialRecordForm
@@ -25,10 +27,17 @@ from app.modules.dataset.services import (
     DOIMappingService,
     DSMetaDataService,
     DSViewRecordService,
+    FileReaperService,
     MaterialsDatasetService,
+    dataset_lock,
+    get_csv_compression,
+    get_csv_suffix,
+    is_csv_filename,
+    open_csv_file,
 )
 from app.modules.fakenodo.services import FakenodoService
-from core.configuration.configuration import USE_FAKENODO
+from core.configuration.configuration import USE_FAKENODO, uploads_folder_name
+from core.storage.storage import get_storage, send_stored_file
 
 logger = logging.getLogger(__name__)
 author_service = AuthorService()
@@ -52,75 +61,92 @@ def regenerate_csv_for_dataset(dataset_id):
     """Regenerate CSV file for a MaterialsDataset with current records"""
     from app import db
 
-    # Expire all cached objects to ensure we read fresh data from database
-    db.session.expire_all()
+    # One writer per dataset at a time, so two requests can't write CSVs from different record sets
+    with dataset_lock(dataset_id):
+        # Expire all cached objects to ensure we read fresh data from database
+        db.session.expire_all()
 
-    dataset = materials_dataset_repository.get_by_id(dataset_id)
-    if not dataset:
-        return False
+        dataset = materials_dataset_repository.get_by_id(dataset_id)
+        if not dataset:
+            return False
+
+        # Get all records for this dataset, ordered by ID for consistency
+        records = material_record_repository.get_by_dataset(dataset_id)
+        # Sort by ID to ensure consistent order across regenerations
+        records = sorted(records, key=lambda r: r.id)
+
+        previous_path = dataset.csv_file_path
+        if not previous_path or materials_dataset_repository.is_csv_file_shared(dataset):
+            # Create new CSV file path if doesn't exist, or copy on write when the file
+            # is shared with another dataset through a de-duplicated upload
+            csv_path = f"{uploads_folder_name()}/materials_csv/materials_dataset_{dataset_id}.csv"
+        else:
+            csv_path = previous_path
 
-    # Get all records for this dataset, ordered by ID for consistency
-    records = material_record_repository.get_by_dataset(dataset_id)
-    # Sort by ID to ensure consistent order across regenerations
-    records = sorted(records, key=lambda r: r.id)
+            # A compressed original upload is replaced by a regenerated plain CSV next to it
+            csv_suffix = get_csv_suffix(csv_path)
+            if csv_suffix != ".csv":
+                csv_path = csv_path[: -len(csv_suffix)] + ".csv"
 
-    if not dataset.csv_file_path:
-        # Create new CSV file path if doesn't exist
-        csv_dir = "uploads/materials_csv"
-        os.makedirs(csv_dir, exist_ok=True)
-        csv_filename = f"materials_dataset_{dataset_id}.csv"
-        csv_path = os.path.join(csv_dir, csv_filename)
+        # Write CSV file; the dataset only points at it once it is fully written
+        try:
+            # The file only replaces the stored one once fully written; a failure leaves the old file in place
+            with get_storage().open_write(csv_path) as stored:
+                csvfile = io.TextIOWrapper(stored, encoding="utf-8", newline="", write_through=True)
+                fieldnames = [
+                    "record_id",  # Add ID as first column for tracking
+                    "material_name",
+                    "chemical_formula",
+                    "structure_type",
+                    "composition_method",
+                    "property_name",
+                    "property_value",
+                    "property_unit",
+                    "temperature",
+                    "pressure",
+                    "data_source",
+                    "uncertainty",
+                    "description",
+                ]
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+
+                for record in records:
+                    writer.writerow(
+                        {
+                            "record_id": record.id,  # Include record ID
+                            "material_name": record.material_name,
+                            "chemical_formula": record.chemical_formula or "",
+                            "structure_type": record.structure_type or "",
+                            "composition_method": record.composition_method or "",
+                            "property_name": record.property_name,
+                            "property_value": record.property_value,
+                            "property_unit": record.property_unit or "",
+                            "temperature": record.temperature if record.temperature is not None else "",
+                            "pressure": record.pressure if record.pressure is not None else "",
+                            "data_source": record.data_source.value if record.data_source else "",
+                            "uncertainty": record.uncertainty if record.uncertainty is not None else "",
+                            "description": record.description or "",
+                        }
+                    )
+        except Exception as e:
+            logger.exception(f"Error regenerating CSV file: {e}")
+            db.session.rollback()
+            return False
+
+        file_reaper = FileReaperService()
         dataset.csv_file_path = csv_path
+        if previous_path and previous_path != csv_path:
+            # The compressed original, or the shared upload (kept by the reaper while others use it)
+            file_reaper.schedule(previous_path)
+        # The regenerated file no longer matches the uploaded content, so it can't be de-duplicated against
+        dataset.csv_checksum = None
+        # Records changed: bump row_version even when no column of the dataset row did
+        flag_modified(dataset, "csv_checksum")
         db.session.commit()
-    else:
-        csv_path = dataset.csv_file_path
-        # Ensure absolute path
-        if not os.path.isabs(csv_path):
-            csv_path = os.path.abspath(csv_path)
-
-    # Write CSV file
-    try:
-        with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
-            fieldnames = [
-                "record_id",  # Add ID as first column for tracking
-                "material_name",
-                "chemical_formula",
-                "structure_type",
-                "composition_method",
-                "property_name",
-                "property_value",
-                "property_unit",
-                "temperature",
-                "pressure",
-                "data_source",
-                "uncertainty",
-                "description",
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for record in records:
-                writer.writerow(
-                    {
-                        "record_id": record.id,  # Include record ID
-                        "material_name": record.material_name,
-                        "chemical_formula": record.chemical_formula or "",
-                        "structure_type": record.structure_type or "",
-                        "composition_method": record.composition_method or "",
-                        "property_name": record.property_name,
-                        "property_value": record.property_value,
-                        "property_unit": record.property_unit or "",
-                        "temperature": record.temperature if record.temperature is not None else "",
-                        "pressure": record.pressure if record.pressure is not None else "",
-                        "data_source": record.data_source.value if record.data_source else "",
-                        "uncertainty": record.uncertainty if record.uncertainty is not None else "",
-                        "description": record.description or "",
-                    }
-                )
+        if previous_path and previous_path != csv_path:
+            file_reaper.reap_in_background()
         return True
-    except Exception as e:
-        logger.exception(f"Error regenerating CSV file: {e}")
-        return False
 
 
 def create_version_snapshot(dataset_id, user_id=None, change_description="Dataset modified"):
@@ -137,90 +163,85 @@ def create_version_snapshot(dataset_id, user_id=None, change_description="Datase
     """
     from app import db
 
-    try:
-        # Get fresh dataset from database
-        dataset = materials_dataset_repository.get_by_id(dataset_id)
-        if not dataset:
-            logger.error(f"Dataset {dataset_id} not found for versioning")
-            return None
-
-        # Refresh to ensure we have the latest data from database
-        db.session.refresh(dataset)
-        db.session.refresh(dataset.ds_meta_data)
-
-        # Get next version number
-        next_version = dataset_version_repository.get_next_version_number(dataset_id)
-
-        # Create versions directory if it doesn't exist
-        versions_dir = "uploads/materials_csv/versions"
-        os.makedirs(versions_dir, exist_ok=True)
-
-        # Copy current CSV to versioned path
-        if not dataset.csv_file_path:
-            raise Exception(f"Dataset {dataset_id} has no CSV file path")
-
-        if not os.path.exists(dataset.csv_file_path):
-            raise Exception(f"CSV file not found at path: {dataset.csv_file_path}")
-
-        csv_filename = f"materials_dataset_{dataset_id}_v{next_version}.csv"
-        csv_snapshot_path = os.path.join(versions_dir, csv_filename)
-
-        # Make path absolute if it's relative
-        if not os.path.isabs(csv_snapshot_path):
-            csv_snapshot_path = os.path.abspath(csv_snapshot_path)
-
-        shutil.copy2(dataset.csv_file_path, csv_snapshot_path)
-        logger.info(f"Copied CSV to snapshot: {csv_snapshot_path}")
-
-        # Create metadata snapshot
-        metadata_snapshot = {
-            "title": dataset.ds_meta_data.title,
-            "description": dataset.ds_meta_data.description,
-            "publication_type": dataset.ds_meta_data.publication_type.value,
-            "publication_doi": dataset.ds_meta_data.publication_doi,
-            "dataset_doi": dataset.ds_meta_data.dataset_doi,
-            "tags": dataset.ds_meta_data.tags,
-            "authors": [
-                {"name": author.name, "affiliation": author.affiliation, "orcid": author.orcid}
-                for author in dataset.ds_meta_data.authors
-            ],
-        }
-
-        desc_preview = metadata_snapshot["description"][:50] if metadata_snapshot.get("description") else ""
-        logger.info(
-            f"Creating version {next_version} snapshot with metadata: "
-            f"title='{metadata_snapshot['title']}', description='{desc_preview}...'"
-        )
+    # The next version number is read and used under the dataset lock, so versions never share a number
+    with dataset_lock(dataset_id):
+        try:
+            # Get fresh dataset from database
+            dataset = materials_dataset_repository.get_by_id(dataset_id)
+            if not dataset:
+                logger.error(f"Dataset {dataset_id} not found for versioning")
+                return None
+
+            # Refresh to ensure we have the latest data from database
+            db.session.refresh(dataset)
+            db.session.refresh(dataset.ds_meta_data)
+
+            # Get next version number
+            next_version = dataset_version_repository.get_next_version_number(dataset_id)
+
+            # Copy current CSV to versioned path
+            if not dataset.csv_file_path:
+                raise Exception(f"Dataset {dataset_id} has no CSV file path")
+
+            storage = get_storage()
+            if not storage.exists(dataset.csv_file_path):
+                raise Exception(f"CSV file not found at path: {dataset.csv_file_path}")
+
+            csv_filename = f"materials_dataset_{dataset_id}_v{next_version}{get_csv_suffix(dataset.csv_file_path)}"
+            csv_snapshot_path = f"{uploads_folder_name()}/materials_csv/versions/{csv_filename}"
+
+            storage.copy(dataset.csv_file_path, csv_snapshot_path)
+            logger.info(f"Copied CSV to snapshot: {csv_snapshot_path}")
+
+            # Create metadata snapshot
+            metadata_snapshot = {
+                "title": dataset.ds_meta_data.title,
+                "description": dataset.ds_meta_data.description,
+                "publication_type": dataset.ds_meta_data.publication_type.value,
+                "publication_doi": dataset.ds_meta_data.publication_doi,
+                "dataset_doi": dataset.ds_meta_data.dataset_doi,
+                "tags": dataset.ds_meta_data.tags,
+                "authors": [
+                    {"name": author.name, "affiliation": author.affiliation, "orcid": author.orcid}
+                    for author in dataset.ds_meta_data.authors
+                ],
+            }
 
-        # Get current records count
-        records_count = material_record_repository.count_by_dataset(dataset_id)
-
-        # Create changelog
-        changelog = {
-            "action": change_description,
-            "timestamp": datetime.utcnow().isoformat(),
-            "records_count": records_count,
-        }
-
-        # Create version record
-        version = dataset_version_repository.create(
-            materials_dataset_id=dataset_id,
-            version_number=next_version,
-            created_by_user_id=user_id,
-            csv_snapshot_path=csv_snapshot_path,
-            metadata_snapshot=metadata_snapshot,
-            changelog=changelog,
-            records_count=records_count,
-        )
+            desc_preview = metadata_snapshot["description"][:50] if metadata_snapshot.get("description") else ""
+            logger.info(
+                f"Creating version {next_version} snapshot with metadata: "
+                f"title='{metadata_snapshot['title']}', description='{desc_preview}...'"
+            )
 
-        logger.info(f"Created version {next_version} for dataset {dataset_id}")
-        return version
+            # Get current records count
+            records_count = material_record_repository.count_by_dataset(dataset_id)
 
-    except Exception as e:
-        logger.exception(f"Error creating version snapshot for dataset {dataset_id}: {e}")
-        db.session.rollback()
-        # Re-raise the exception so caller can handle it
-        raise Exception(f"Failed to create version snapshot: {str(e)}")
+            # Create changelog
+            changelog = {
+                "action": change_description,
+                "timestamp": datetime.utcnow().isoformat(),
+                "records_count": records_count,
+            }
+
+            # Create version record
+            version = dataset_version_repository.create(
+                materials_dataset_id=dataset_id,
+                version_number=next_version,
+                created_by_user_id=user_id,
+                csv_snapshot_path=csv_snapshot_path,
+                metadata_snapshot=metadata_snapshot,
+                changelog=changelog,
+                records_count=records_count,
+            )
+
+            logger.info(f"Created version {next_version} for dataset {dataset_id}")
+            return version
+
+        except Exception as e:
+            logger.exception(f"Error creating version snapshot for dataset {dataset_id}: {e}")
+            db.session.rollback()
+            # Re-raise the exception so caller can handle it
+            raise Exception(f"Failed to create version snapshot: {str(e)}")
 
 
 # ==============================
@@ -330,7 +351,8 @@ def list_dataset():
     # Only show datasets that have CSV files uploaded (complete datasets)
     all_datasets = materials_dataset_repository.get_by_user(current_user.id)
     datasets = [d for d in all_datasets if d.csv_file_path]
-    return render_template("dataset/list_materials_datasets.html", datasets=datasets)
+    listing_stats = material_record_repository.get_listing_stats(d.id for d in datasets)
+    return render_template("dataset/list_materials_datasets.html", datasets=datasets, listing_stats=listing_stats)
 
 
 @dataset_bp.route("/dataset/file/upload", methods=["POST"])
@@ -403,19 +425,12 @@ def download_dataset(dataset_id):
         logger.error(f"Dataset {dataset_id} has no CSV file path")
         abort(404, description="No CSV file associated with this dataset")
 
-    # Convert to absolute path if relative
     csv_path = dataset.csv_file_path
-    if not os.path.isabs(csv_path):
-        csv_path = os.path.abspath(csv_path)
-        logger.info(f"Converted to absolute path: {csv_path}")
-
-    if not os.path.exists(csv_path):
+    if not get_storage().exists(csv_path):
         logger.error(f"CSV file not found at path: {csv_path}")
         abort(404, description="CSV file not found at expected location")
 
-    csv_dir = os.path.dirname(csv_path)
-    csv_filename = os.path.basename(csv_path)
-    logger.info(f"Sending file: {csv_filename} from directory: {csv_dir}")
+    logger.info(f"Sending file: {csv_path}")
 
     # Record download
     cookie = request.cookies.get("download_cookie")
@@ -436,7 +451,7 @@ def download_dataset(dataset_id):
     db.session.add(download_record)
     db.session.commit()
 
-    response = make_response(send_from_directory(csv_dir, csv_filename, as_attachment=True))
+    response = make_response(send_stored_file(csv_path))
     response.set_cookie("download_cookie", cookie, max_age=60 * 60 * 24 * 365 * 2)  # 2 years
 
     return response
@@ -600,35 +615,27 @@ def upload_materials_csv(dataset_id):
         if file.filename == "":
             return jsonify({"message": "No file selected"}), 400
 
-        if file and file.filename.endswith(".csv"):
-            # Save file temporarily
-            from werkzeug.utils import secure_filename
-
-            filename = secure_filename(file.filename)
-            working_dir = os.getenv("WORKING_DIR", "")
-            temp_dir = os.path.join(working_dir, "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-
-            temp_path = os.path.join(temp_dir, filename)
-            file.save(temp_path)
-
-            # Parse CSV and create records
-            result = materials_dataset_service.create_material_records_from_csv(dataset, temp_path)
+        if file and is_csv_filename(file.filename):
+            # Store, hash and parse the upload in a single pass over the request stream, sharing the file of
+            # an identical earlier upload; one declared in an Upload-Checksum header is cloned without parsing
+            result = materials_dataset_service.ingest_csv_upload(
+                dataset,
+                file.stream,
+                materials_dataset_service.get_upload_key(dataset, file.filename),
+                compression=get_csv_compression(file.filename),
+                expected_checksum=materials_dataset_service.parse_sha256_header(request.headers.get("Upload-Checksum")),
+            )
 
             # Update csv_file_path if successful
             if result["success"]:
                 from app import db
 
-                dataset.csv_file_path = temp_path
+                dataset.csv_file_path = result["csv_file_path"]
                 db.session.commit()
 
                 # Create initial version snapshot
                 create_version_snapshot(dataset_id, current_user.id, "Initial version - CSV uploaded")
 
-            # Clean up temp file if parsing failed
-            if not result["success"] and os.path.exists(temp_path):
-                os.remove(temp_path)
-
             if result["success"]:
                 return (
                     jsonify(
@@ -636,14 +643,19 @@ def upload_materials_csv(dataset_id):
                             "message": "CSV uploaded and parsed successfully",
                             "records_created": result["records_created"],
                             "dataset_id": dataset.id,
+                            "checksum": result["checksum"],
+                            "size": result["size"],
+                            "deduplicated": result["deduplicated"],
                         }
                     ),
                     200,
                 )
             else:
-                return jsonify({"message": "CSV parsing failed", "error": result["error"]}), 400
+                return jsonify({"message": "CSV parsing failed", "error": result["error"]}), result.get(
+                    "status_code", 400
+                )
         else:
-            return jsonify({"message": "File must be a CSV"}), 400
+            return jsonify({"message": "File must be a CSV (.csv, .csv.gz, .csv.zst or .csv.br)"}), 400
 
     return render_template("dataset/upload_materials_csv.html", dataset=dataset)
 
@@ -695,24 +707,16 @@ def materials_dataset_recommendations(dataset_id):
     if not current_dataset:
         abort(404)
 
-    query = materials_dataset_service.get_all_except(dataset_id)
-
-    # Apply filters using service methods
-    if filter_type == "authors":
-        query = materials_dataset_service.filter_by_authors(query, current_dataset)
-    elif filter_type == "tags":
-        query = materials_dataset_service.filter_by_tags(query, current_dataset)
-    elif filter_type == "properties":
-        query = materials_dataset_service.filter_by_properties(query, current_dataset)
-
-    # Pagination
+    # Filtering and pagination happen in the database: one count and one page query
     per_page = 5
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated = query[start:end]
-    total_pages = (len(query) + per_page - 1) // per_page
+    page = max(page, 1)
+    paginated, total = materials_dataset_repository.get_related_page(current_dataset, filter_type, page, per_page)
+    total_pages = (total + per_page - 1) // per_page
 
-    html = render_template("dataset/materials_recommendations_table.html", recommended_datasets=paginated)
+    listing_stats = material_record_repository.get_listing_stats(d.id for d in paginated)
+    html = render_template(
+        "dataset/materials_recommendations_table.html", recommended_datasets=paginated, listing_stats=listing_stats
+    )
 
     return jsonify({"html": html, "page": page, "total_pages": total_pages})
 
@@ -725,11 +729,11 @@ def view_materials_csv(dataset_id):
     if not dataset:
         abort(404)
 
-    if not dataset.csv_file_path or not os.path.exists(dataset.csv_file_path):
+    if not dataset.csv_file_path or not get_storage().exists(dataset.csv_file_path):
         return jsonify({"error": "CSV file not found"}), 404
 
     try:
-        with open(dataset.csv_file_path, "r", encoding="utf-8") as f:
+        with open_csv_file(dataset.csv_file_path) as f:
             csv_reader = csv.DictReader(f)
             headers = csv_reader.fieldnames
             rows = [row for row in csv_reader]
@@ -1057,15 +1061,9 @@ def edit_materials_dataset(dataset_id):
                 records_to_delete_list = json.loads(records_to_delete)
 
                 if records_to_delete_list:
-                    for record_id in records_to_delete_list:
-                        record = (
-                            db.session.query(MaterialRecord)
-                            .filter_by(id=record_id, materials_dataset_id=dataset_id)
-                            .first()
-                        )
-                        if record:
-                            db.session.delete(record)
-                            records_changed = True
+                    # One DELETE ... WHERE id IN for all of them, restricted to this dataset's records
+                    if material_record_repository.delete_many(dataset_id, records_to_delete_list):
+                        records_changed = True
                     changes_made.append(f"{len(records_to_delete_list)} records deleted")
             except json.JSONDecodeError:
                 logger.warning("Invalid records_to_delete JSON")
@@ -1182,20 +1180,10 @@ def delete_materials_dataset(dataset_id):
         abort(403, description="You don't have permission to delete this dataset")
 
     try:
-        # Delete CSV file from filesystem if it exists
-        if dataset.csv_file_path:
-            csv_path = dataset.csv_file_path
-            if not os.path.isabs(csv_path):
-                csv_path = os.path.abspath(csv_path)
-
-            if os.path.exists(csv_path):
-                os.remove(csv_path)
-                logger.info(f"Deleted CSV file: {csv_path}")
-
-        # Delete dataset (cascade will delete material_records, download_records, view_records)
+        # The database cascades the delete to records, versions, views and downloads; the CSV and
+        # version snapshots are removed by the file reaper in the background
         dataset_title = dataset.ds_meta_data.title
-        db.session.delete(dataset)
-        db.session.commit()
+        materials_dataset_service.delete_dataset(dataset)
 
         flash(f'Dataset "{dataset_title}" has been deleted successfully!', "success")
         logger.info(f"Deleted MaterialsDataset {dataset_id}")
@@ -1302,16 +1290,11 @@ def download_version(dataset_id, version_id):
     if not version:
         abort(404, description="Version not found")
 
-    if not version.csv_snapshot_path or not os.path.exists(version.csv_snapshot_path):
+    if not version.csv_snapshot_path or not get_storage().exists(version.csv_snapshot_path):
         flash("CSV file for this version not found", "error")
         return redirect(url_for("dataset.list_versions", dataset_id=dataset_id))
 
-    directory = os.path.dirname(version.csv_snapshot_path)
-    filename = os.path.basename(version.csv_snapshot_path)
-
-    return send_from_directory(
-        directory,
-        filename,
-        as_attachment=True,
+    return send_stored_file(
+        version.csv_snapshot_path,
         download_name=f"{dataset.ds_meta_data.title}_v{version.version_number}.csv",
     )
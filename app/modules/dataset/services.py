@@ -1,8 +1,12 @@
 import csv
 import hashlib
+import io
 import logging
-import os
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Optional
 
 from flask import request
@@ -17,17 +21,236 @@ from app.modules.dataset.repositories import (
 )
 
 # UVL removed: from app.modules.featuremodel.repositories
+from core.database.locks import advisory_lock
+from core.metrics.metrics import DIFF_DURATION, record_cache_lookup, record_csv_ingest
 from core.services.BaseService import BaseService
+from core.storage.storage import get_storage
+from core.tracing.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
-def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
+# Size of the blocks read from uploaded/stored files. Large enough to keep syscalls cheap,
+# small enough that a multi-GB CSV never has to fit in memory.
+CHUNK_SIZE = 64 * 1024
+
+# Number of MaterialRecord rows sent to the database per executemany() call during ingestion
+INSERT_BATCH_SIZE = 1000
+
+# advisory_lock() namespace of the per-dataset locks
+DATASET_LOCK_NAMESPACE = 1
+
+
+def dataset_lock(dataset_id: int):
+    """
+    Lock taken by everything that rewrites a dataset's CSV or numbers its versions, shared by all
+    workers. Edits of different datasets run in parallel; those of one dataset take turns.
+    """
+    return advisory_lock(DATASET_LOCK_NAMESPACE, dataset_id)
+
+
+def calculate_checksum_and_size(file_path, algorithm: str = "md5"):
+    hasher = hashlib.new(algorithm)
+    file_size = 0
     with open(file_path, "rb") as file:
-        content = file.read()
-        hash_md5 = hashlib.md5(content).hexdigest()
-        return hash_md5, file_size
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+            file_size += len(chunk)
+    return hasher.hexdigest(), file_size
+
+
+class HashingTeeReader(io.RawIOBase):
+    """
+    Read-only binary stream that copies every block it reads from ``source``
+    into ``sink`` (if given) while keeping a running checksum and byte count.
+
+    Wrapping an upload in this reader lets the CSV parser consume the data while
+    the same bytes are persisted and hashed, so the upload is read exactly once.
+    """
+
+    def __init__(self, source, sink=None, algorithm: Optional[str] = "sha256"):
+        super().__init__()
+        self.source = source
+        self.sink = sink
+        self.hasher = hashlib.new(algorithm) if algorithm else None
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.source.read(len(buffer))
+        if not chunk:
+            return 0
+        length = len(chunk)
+        buffer[:length] = chunk
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        self.size += length
+        if self.sink is not None:
+            self.sink.write(chunk)
+        return length
+
+    def drain(self):
+        """Consume whatever the reader has not pulled yet so the copy and checksum are complete"""
+        buffer = bytearray(CHUNK_SIZE)
+        while self.readinto(buffer):
+            pass
+
+    @property
+    def checksum(self) -> Optional[str]:
+        return self.hasher.hexdigest() if self.hasher is not None else None
+
+
+# Compressed CSV uploads, keyed by filename suffix
+CSV_COMPRESSION_SUFFIXES = {".csv.gz": "gzip", ".csv.zst": "zstd", ".csv.br": "brotli"}
+CSV_UPLOAD_SUFFIXES = (".csv",) + tuple(CSV_COMPRESSION_SUFFIXES)
+
+
+def get_csv_compression(filename: str) -> Optional[str]:
+    """Return the codec of a compressed CSV filename ('gzip', 'zstd', 'brotli') or None"""
+    lowered = (filename or "").lower()
+    for suffix, compression in CSV_COMPRESSION_SUFFIXES.items():
+        if lowered.endswith(suffix):
+            return compression
+    return None
+
+
+def is_csv_filename(filename: str) -> bool:
+    """Whether a filename is a CSV, plain or compressed with a supported codec"""
+    return (filename or "").lower().endswith(CSV_UPLOAD_SUFFIXES)
+
+
+def get_csv_suffix(filename: str) -> str:
+    """Return '.csv' or the full compressed suffix ('.csv.gz', ...) of a CSV filename"""
+    compression = get_csv_compression(filename)
+    for suffix, codec in CSV_COMPRESSION_SUFFIXES.items():
+        if codec == compression:
+            return suffix
+    return ".csv"
+
+
+# Compressed bytes given to the Brotli decompressor per call. Its output for one call is unbounded, and
+# a few hundred bytes of Brotli can expand to hundreds of MB, so the step starts at the minimum and
+# doubles (up to CHUNK_SIZE) only while twice the step, at the expansion ratio of the stream so far,
+# stays under the output bound; a call going over the bound drops it back to the minimum. The size
+# and ratio limits of DecompressionLimitReader still apply to the whole stream
+BROTLI_MIN_INPUT_STEP = 16
+BROTLI_OUTPUT_BOUND = 1024 * 1024
+
+
+class BrotliDecompressingReader(io.RawIOBase):
+    """Binary reader that decompresses a Brotli stream incrementally"""
+
+    def __init__(self, source):
+        import brotli
+
+        super().__init__()
+        self.source = source
+        self.decompressor = brotli.Decompressor()
+        self.pending = memoryview(b"")
+        self.input = memoryview(b"")
+        self.step = BROTLI_MIN_INPUT_STEP
+        self.consumed = 0
+        self.produced = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            if not self.input:
+                chunk = self.source.read(CHUNK_SIZE)
+                if not chunk:
+                    if not self.decompressor.is_finished():
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    return 0
+                self.input = memoryview(chunk)
+            data = self.input[: self.step]
+            self.input = self.input[self.step :]
+            self.pending = memoryview(self.decompressor.process(data))
+            self.consumed += len(data)
+            self.produced += len(self.pending)
+            if len(self.pending) > BROTLI_OUTPUT_BOUND:
+                self.step = BROTLI_MIN_INPUT_STEP
+            elif 2 * self.step * self.produced <= BROTLI_OUTPUT_BOUND * self.consumed:
+                self.step = min(self.step * 2, CHUNK_SIZE)
+
+        length = min(len(buffer), len(self.pending))
+        buffer[:length] = self.pending[:length]
+        self.pending = self.pending[length:]
+        return length
+
+
+class DecompressionLimitError(ValueError):
+    """A compressed upload expands past MAX_DECOMPRESSED_CSV_SIZE or MAX_CSV_COMPRESSION_RATIO"""
+
+
+class DecompressionLimitReader(io.RawIOBase):
+    """
+    Passes the decompressed bytes of an upload through, raising DecompressionLimitError as soon as
+    they exceed ``max_size`` or ``max_ratio`` times the compressed bytes read so far (``compressed``
+    is the reader counting those, and the ratio is only enforced past the first CHUNK_SIZE of them).
+    A limit of 0 or None is not enforced.
+    """
+
+    def __init__(self, source, compressed, max_size: Optional[int], max_ratio: Optional[float]):
+        super().__init__()
+        self.source = source
+        self.compressed = compressed
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.source.read(len(buffer))
+        if not chunk:
+            return 0
+        length = len(chunk)
+        self.size += length
+        if self.max_size and self.size > self.max_size:
+            raise DecompressionLimitError(f"The decompressed CSV is larger than {self.max_size} bytes")
+        if self.max_ratio and self.size > self.max_ratio * max(self.compressed.size, CHUNK_SIZE):
+            raise DecompressionLimitError(f"The CSV expands more than {self.max_ratio:g} times its compressed size")
+        buffer[:length] = chunk
+        return length
+
+
+def open_decompressed(source, compression: Optional[str]):
+    """
+    Wrap a binary stream so reads return decompressed bytes.
+
+    Args:
+        source: Binary file-like object
+        compression: 'gzip', 'zstd', 'brotli' or None (returned unchanged)
+
+    Returns:
+        Binary file-like object yielding the decompressed data
+    """
+    if compression is None:
+        return source
+    if compression == "gzip":
+        import gzip
+
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True)
+    if compression == "brotli":
+        return io.BufferedReader(BrotliDecompressingReader(source), CHUNK_SIZE)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def open_csv_file(csv_file_path: str, encoding: str = "utf-8", newline: Optional[str] = ""):
+    """Open a stored CSV as text, transparently decompressing .csv.gz/.csv.zst/.csv.br files"""
+    binary = get_storage().open_read(csv_file_path)
+    return io.TextIOWrapper(
+        open_decompressed(binary, get_csv_compression(csv_file_path)), encoding=encoding, newline=newline
+    )
 
 
 # UVL removed: class DataSetService(BaseService):
@@ -396,6 +619,7 @@ class SizeService:
             return f"{round(size / (1024 ** 3), 2)} GB"
 
 
+@traced_class("service")
 class MaterialsDatasetService:
     """Service for handling MaterialsDataset operations including CSV parsing"""
 
@@ -420,12 +644,14 @@ class MaterialsDatasetService:
             DSMetaDataRepository,
             MaterialRecordRepository,
             MaterialsDatasetRepository,
+            TagRepository,
         )
 
         self.materials_dataset_repository = MaterialsDatasetRepository()
         self.material_record_repository = MaterialRecordRepository()
         self.author_repository = AuthorRepository()
         self.dsmetadata_repository = DSMetaDataRepository()
+        self.tag_repository = TagRepository()
 
     def create_from_form(self, form, current_user):
         """Create a MaterialsDataset from a form submission"""
@@ -531,33 +757,23 @@ class MaterialsDatasetService:
 
         try:
             # Check if file exists
-            if not os.path.exists(csv_file_path):
+            if not get_storage().exists(csv_file_path):
                 result["error"] = f"CSV file not found: {csv_file_path}"
                 return result
 
             # Read and validate CSV
-            with open(csv_file_path, "r", encoding=encoding) as csv_file:
+            with open_csv_file(csv_file_path, encoding) as csv_file:
                 csv_reader = csv.DictReader(csv_file)
 
                 # Validate columns
-                columns = csv_reader.fieldnames
-                validation = self.validate_csv_columns(columns)
+                validation = self.validate_csv_columns(csv_reader.fieldnames)
                 result["validation"] = validation
 
                 if not validation["valid"]:
                     result["error"] = validation["message"]
                     return result
 
-                # Parse rows
-                rows_data = []
-                for row_num, row in enumerate(csv_reader, start=2):  # start=2 because row 1 is header
-                    try:
-                        parsed_row = self._parse_csv_row(row, row_num)
-                        rows_data.append(parsed_row)
-                    except ValueError as e:
-                        logger.warning(f"Skipping row {row_num}: {str(e)}")
-                        continue
-
+                rows_data = list(self._iter_parsed_rows(csv_reader))
                 result["data"] = rows_data
                 result["rows_parsed"] = len(rows_data)
                 result["success"] = True
@@ -570,6 +786,23 @@ class MaterialsDatasetService:
 
         return result
 
+    def _iter_parsed_rows(self, csv_reader):
+        """
+        Lazily parses the rows of a csv.DictReader, skipping invalid ones.
+
+        Args:
+            csv_reader: csv.DictReader positioned after the header
+
+        Yields:
+            dict with parsed and typed data for each valid row
+        """
+        for row_num, row in enumerate(csv_reader, start=2):  # start=2 because row 1 is header
+            try:
+                yield self._parse_csv_row(row, row_num)
+            except ValueError as e:
+                logger.warning(f"Skipping row {row_num}: {str(e)}")
+                continue
+
     def _parse_csv_row(self, row: dict, row_num: int) -> dict:
         """
         Parses a single CSV row and converts data types.
@@ -671,31 +904,500 @@ class MaterialsDatasetService:
                 - 'records_created': int
                 - 'error': str (if failed)
         """
+        storage = get_storage()
+        if not storage.exists(csv_file_path):
+            return {"success": False, "records_created": 0, "error": f"CSV file not found: {csv_file_path}"}
+
+        with storage.open_read(csv_file_path) as source:
+            result = self.ingest_csv_stream(materials_dataset, source, compression=get_csv_compression(csv_file_path))
+
+        return {"success": result["success"], "records_created": result["records_created"], "error": result["error"]}
+
+    def get_stored_filename(self, filename: str) -> str:
+        """
+        Name under which an uploaded CSV is stored.
+
+        Compressed uploads are expanded to a plain .csv unless KEEP_COMPRESSED_UPLOADS is enabled.
+        """
+        from flask import current_app
+        from werkzeug.utils import secure_filename
+
+        filename = secure_filename(filename)
+        suffix = get_csv_suffix(filename)
+        if suffix == ".csv" or current_app.config.get("KEEP_COMPRESSED_UPLOADS"):
+            return filename
+        return filename[: -len(suffix)] + ".csv"
+
+    def get_upload_key(self, materials_dataset, filename: str) -> str:
+        """Storage key for a new upload, unique per upload so repeated or concurrent uploads never collide"""
+        from core.configuration.configuration import uploads_folder_name
+
+        return "/".join(
+            [
+                uploads_folder_name(),
+                "materials_csv",
+                f"dataset_{materials_dataset.id}",
+                uuid.uuid4().hex,
+                self.get_stored_filename(filename),
+            ]
+        )
+
+    @staticmethod
+    def parse_sha256_header(header: Optional[str]) -> Optional[str]:
+        """Extract the digest from an ``Upload-Checksum: sha256 <hex digest>`` header, if present"""
+        parts = (header or "").split()
+        if len(parts) == 2 and parts[0].lower() == "sha256":
+            return parts[1].lower()
+        return None
+
+    def find_duplicate_upload(self, materials_dataset, checksum: str):
+        """
+        Finds a dataset whose uploaded CSV had the given SHA-256 and whose file is still on disk.
+
+        Returns:
+            MaterialsDataset (possibly ``materials_dataset`` itself) or None
+        """
+        storage = get_storage()
+        if materials_dataset.csv_checksum == checksum and materials_dataset.csv_file_path:
+            if storage.exists(materials_dataset.csv_file_path):
+                record_cache_lookup("csv_upload_dedup", hit=True)
+                return materials_dataset
+
+        for candidate in self.materials_dataset_repository.get_by_csv_checksum(checksum):
+            if storage.exists(candidate.csv_file_path):
+                record_cache_lookup("csv_upload_dedup", hit=True)
+                return candidate
+        record_cache_lookup("csv_upload_dedup", hit=False)
+        return None
+
+    def clone_csv_upload(self, materials_dataset, source_dataset) -> dict:
+        """
+        Reuses an identical, already ingested upload: records are copied with one
+        INSERT ... SELECT and the stored CSV file is shared instead of re-parsed.
+
+        Returns:
+            dict in the same shape as ingest_csv_stream(), with 'deduplicated' set
+        """
+        from sqlalchemy.exc import SQLAlchemyError
+
         from app import db
-        from app.modules.dataset.models import MaterialRecord
 
-        # Parse the CSV
-        parse_result = self.parse_csv_file(csv_file_path)
+        result = {
+            "success": False,
+            "records_created": 0,
+            "error": None,
+            "validation": None,
+            "checksum": source_dataset.csv_checksum,
+            "size": 0,
+            "csv_file_path": source_dataset.csv_file_path,
+            "deduplicated": True,
+        }
+
+        if source_dataset.id == materials_dataset.id:
+            # Retry of an upload that already went through
+            result["records_created"] = self.material_record_repository.count_by_dataset(materials_dataset.id)
+        else:
+            try:
+                result["records_created"] = self.material_record_repository.clone_records(
+                    source_dataset.id, materials_dataset.id
+                )
+                materials_dataset.csv_checksum = source_dataset.csv_checksum
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.error(f"Error cloning MaterialRecords: {str(e)}", exc_info=True)
+                result["error"] = f"Database error: {str(e)}"
+                return result
+
+        result["size"] = get_storage().size(source_dataset.csv_file_path)
+        result["success"] = True
+        logger.info(
+            f"Upload for dataset {materials_dataset.id} de-duplicated against dataset {source_dataset.id} "
+            f"({result['records_created']} records)"
+        )
+        return result
+
+    def ingest_csv_upload(
+        self,
+        materials_dataset,
+        source,
+        destination_key: str = None,
+        compression: str = None,
+        expected_checksum: str = None,
+    ) -> dict:
+        """
+        Ingests an uploaded CSV, skipping the parse when an identical file was already ingested.
+
+        When the client declares the SHA-256 of the file and a dataset with that
+        checksum exists, the upload is hashed (without parsing) to confirm the claim
+        and the existing records are cloned. Otherwise the upload goes through
+        ingest_csv_stream(), which verifies the declared checksum and still shares
+        the stored file of an identical upload, found by the checksum it computes.
+
+        Args:
+            materials_dataset: MaterialsDataset instance to link records to
+            source: Seekable binary file-like object
+            destination_key: Where to store the upload if it has to be ingested
+            compression: Codec of ``source`` ('gzip', 'zstd', 'brotli') or None
+            expected_checksum: SHA-256 hex digest declared by the client (optional)
+
+        Returns:
+            dict in the same shape as ingest_csv_stream()
+        """
+        if expected_checksum:
+            expected_checksum = expected_checksum.lower()
+            duplicate = self.find_duplicate_upload(materials_dataset, expected_checksum)
+            if duplicate:
+                hasher = hashlib.sha256()
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                if hasher.hexdigest() == expected_checksum:
+                    return self.clone_csv_upload(materials_dataset, duplicate)
+                source.seek(0)
+
+        return self.ingest_csv_stream(
+            materials_dataset,
+            source,
+            destination_key,
+            compression=compression,
+            expected_checksum=expected_checksum,
+        )
+
+    def ingest_csv_stream(
+        self,
+        materials_dataset,
+        source,
+        destination_key: str = None,
+        encoding: str = "utf-8",
+        compression: str = None,
+        expected_checksum: str = None,
+    ):
+        """
+        Persists, hashes and parses an uploaded CSV in a single pass over ``source``.
 
-        if not parse_result["success"]:
-            return {"success": False, "records_created": 0, "error": parse_result["error"]}
+        Every block read by the CSV parser is written to ``destination_key`` and fed
+        to a running SHA-256 at the same time; parsed rows are inserted in batches of
+        INSERT_BATCH_SIZE inside one transaction. On failure the transaction is rolled
+        back and nothing is left in storage.
 
-        # Create MaterialRecord instances
-        records_created = 0
+        Compressed uploads are decompressed on the fly. If ``destination_key`` carries
+        the same compressed suffix the original bytes are stored, otherwise the expanded
+        CSV is. The checksum always covers the bytes as received and is recorded as the
+        dataset's ``csv_checksum``; when another upload with that checksum is still stored,
+        the new copy is dropped and the dataset points at that file instead.
+
+        Args:
+            materials_dataset: MaterialsDataset instance to link records to
+            source: Binary file-like object (e.g. ``FileStorage.stream``)
+            destination_key: Storage key under which to store the upload (optional)
+            encoding: CSV text encoding (default: utf-8)
+            compression: Codec of ``source`` ('gzip', 'zstd', 'brotli') or None
+            expected_checksum: SHA-256 declared by the client; the upload is rejected if it differs
+
+        Returns:
+            dict with:
+                - 'success': bool
+                - 'records_created': int
+                - 'error': str (if failed)
+                - 'validation': column validation result
+                - 'checksum': SHA-256 hex digest of the uploaded bytes
+                - 'size': number of bytes read
+                - 'csv_file_path': ``destination_key``, or the file of an identical earlier upload
+                - 'deduplicated': whether that earlier upload's file is reused
+                - 'status_code': 200, 400, or 413 when a compressed upload expands past
+                  MAX_DECOMPRESSED_CSV_SIZE or MAX_CSV_COMPRESSION_RATIO
+        """
+        from flask import current_app
+        from sqlalchemy import insert
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from app import db
+        from app.modules.dataset.models import MaterialRecord, composition_columns
+
+        result = {
+            "success": False,
+            "records_created": 0,
+            "error": None,
+            "validation": None,
+            "checksum": None,
+            "size": 0,
+            "csv_file_path": destination_key,
+            "deduplicated": False,
+            "status_code": 200,
+        }
+
+        started = time.perf_counter()
+
+        # Store the expanded CSV rather than the bytes as received?
+        expand = compression is not None and destination_key is not None and not get_csv_compression(destination_key)
+
+        def limited(decompressed, compressed):
+            if compression is None:
+                return decompressed
+            limiter = DecompressionLimitReader(
+                decompressed,
+                compressed,
+                current_app.config.get("MAX_DECOMPRESSED_CSV_SIZE"),
+                current_app.config.get("MAX_CSV_COMPRESSION_RATIO"),
+            )
+            return io.BufferedReader(limiter, CHUNK_SIZE)
+
+        storage = get_storage()
+        sink = storage.open_write(destination_key) if destination_key else None
         try:
-            for row_data in parse_result["data"]:
-                material_record = MaterialRecord(materials_dataset_id=materials_dataset.id, **row_data)
-                db.session.add(material_record)
-                records_created += 1
+            if expand:
+                received = HashingTeeReader(source)
+                decompressed = open_decompressed(io.BufferedReader(received, CHUNK_SIZE), compression)
+                tee = HashingTeeReader(limited(decompressed, received), sink, algorithm=None)
+                binary_stream = io.BufferedReader(tee, CHUNK_SIZE)
+            else:
+                received = tee = HashingTeeReader(source, sink)
+                binary_stream = limited(open_decompressed(io.BufferedReader(tee, CHUNK_SIZE), compression), tee)
+
+            text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+            csv_reader = csv.DictReader(text_stream)
+
+            validation = self.validate_csv_columns(csv_reader.fieldnames)
+            result["validation"] = validation
+            if not validation["valid"]:
+                result["error"] = validation["message"]
+                return result
 
+            batch = []
+            for row_data in self._iter_parsed_rows(csv_reader):
+                row_data["materials_dataset_id"] = materials_dataset.id
+                row_data.update(composition_columns(row_data["chemical_formula"]))
+                batch.append(row_data)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    db.session.execute(insert(MaterialRecord), batch)
+                    result["records_created"] += len(batch)
+                    batch = []
+
+            if batch:
+                db.session.execute(insert(MaterialRecord), batch)
+                result["records_created"] += len(batch)
+
+            tee.drain()
+            received.drain()
+
+            if expected_checksum and received.checksum != expected_checksum.lower():
+                db.session.rollback()
+                result["error"] = "Checksum mismatch: the uploaded file does not match the declared SHA-256"
+                return result
+
+            # Identical to an upload already stored: share its file instead of keeping a second copy
+            duplicate = self.find_duplicate_upload(materials_dataset, received.checksum) if sink is not None else None
+            if duplicate is not None:
+                sink.abort()
+                if duplicate.id == materials_dataset.id:
+                    # Retry of an upload that already went through: its records are there
+                    db.session.rollback()
+                    result["records_created"] = self.material_record_repository.count_by_dataset(materials_dataset.id)
+                result["csv_file_path"] = duplicate.csv_file_path
+                result["deduplicated"] = True
+            elif sink is not None:
+                # Make the stored file visible before the records that point at it
+                sink.close()
+
+            materials_dataset.csv_checksum = received.checksum
             db.session.commit()
 
-            return {"success": True, "records_created": records_created, "error": None}
+            result["checksum"] = received.checksum
+            result["size"] = received.size
+            result["success"] = True
 
-        except Exception as e:
+        except UnicodeDecodeError:
+            db.session.rollback()
+            result["error"] = f"Encoding error. Try different encoding (current: {encoding})"
+        except DecompressionLimitError as e:
+            db.session.rollback()
+            result["error"] = str(e)
+            result["status_code"] = 413
+        except SQLAlchemyError as e:
             db.session.rollback()
             logger.error(f"Error creating MaterialRecords: {str(e)}", exc_info=True)
-            return {"success": False, "records_created": 0, "error": f"Database error: {str(e)}"}
+            result["error"] = f"Database error: {str(e)}"
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"CSV parsing error: {str(e)}", exc_info=True)
+            result["error"] = f"Error parsing CSV: {str(e)}"
+        finally:
+            if not result["success"]:
+                result["records_created"] = 0
+                if result["status_code"] == 200:
+                    result["status_code"] = 400
+                if sink is not None and not sink.closed:
+                    sink.abort()
+                elif sink is not None:
+                    storage.delete(destination_key)
+            record_csv_ingest(result["records_created"], time.perf_counter() - started)
+
+        return result
+
+    def _parse_record_fields(self, data: dict, partial: bool = False) -> dict:
+        """
+        Validates and types the fields of a material record sent as JSON.
+
+        Args:
+            data: Field values keyed by column name
+            partial: Whether required fields may be left out (updates)
+
+        Returns:
+            dict with the typed values of the fields present in ``data``
+
+        Raises:
+            ValueError: On unknown fields, missing required fields or invalid values
+        """
+        from app.modules.dataset.models import DataSource
+
+        if not isinstance(data, dict):
+            raise ValueError("Each record must be an object")
+
+        unknown = set(data) - set(self.REQUIRED_COLUMNS) - set(self.OPTIONAL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        parsed = {}
+        for name in self.REQUIRED_COLUMNS:
+            if name not in data and partial:
+                continue
+            value = data.get(name)
+            value = str(value).strip() if isinstance(value, (str, int, float)) and not isinstance(value, bool) else ""
+            if not value:
+                raise ValueError(f"{name} is required")
+            parsed[name] = value
+
+        for name in ("chemical_formula", "structure_type", "composition_method", "property_unit", "description"):
+            if name in data:
+                if data[name] is not None and not isinstance(data[name], str):
+                    raise ValueError(f"{name} must be a string")
+                parsed[name] = (data[name] or "").strip() or None
+
+        for name in ("temperature", "pressure", "uncertainty"):
+            if name in data:
+                value = data[name]
+                if value is None or value == "":
+                    parsed[name] = None
+                    continue
+                if isinstance(value, bool):
+                    raise ValueError(f"{name} must be a number")
+                try:
+                    parsed[name] = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name} must be a number")
+
+        if "data_source" in data:
+            value = data["data_source"]
+            if not value:
+                parsed["data_source"] = None
+            else:
+                try:
+                    parsed["data_source"] = DataSource[str(value).strip().upper()]
+                except KeyError:
+                    valid_sources = ", ".join(e.value for e in DataSource)
+                    raise ValueError(f"Invalid data_source '{value}'. Valid options: {valid_sources}")
+
+        return parsed
+
+    def apply_record_changes(self, materials_dataset, changes: dict) -> dict:
+        """
+        Applies a batch of record additions, updates and deletions to a dataset in one
+        transaction, with one set-based statement per kind of change. The caller is
+        responsible for regenerating the CSV and creating the version afterwards.
+
+        Args:
+            materials_dataset: MaterialsDataset instance whose records change
+            changes: dict with optional lists "add" (new records), "update" (records with
+                their "id" and the fields to change) and "delete" (record ids)
+
+        Returns:
+            dict with:
+                - 'success': bool
+                - 'added', 'updated', 'deleted': number of records changed
+                - 'error': str (if failed)
+                - 'status_code': HTTP status for the error (if failed)
+        """
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from app import db
+
+        result = {"success": False, "added": 0, "updated": 0, "deleted": 0, "error": None, "status_code": None}
+
+        def fail(status_code, error):
+            result["error"] = error
+            result["status_code"] = status_code
+            return result
+
+        if not isinstance(changes, dict):
+            return fail(400, "Expected an object with 'add', 'update' and/or 'delete' lists")
+        unknown = set(changes) - {"add", "update", "delete"}
+        if unknown:
+            return fail(400, f"Unknown keys: {', '.join(sorted(unknown))}")
+        adds, updates, deletes = (changes.get(key) or [] for key in ("add", "update", "delete"))
+        if not all(isinstance(items, list) for items in (adds, updates, deletes)):
+            return fail(400, "'add', 'update' and 'delete' must be lists")
+        if not (adds or updates or deletes):
+            return fail(400, "No changes provided")
+
+        try:
+            rows = [self._parse_record_fields(item) for item in adds]
+
+            parsed_updates = []
+            for item in updates:
+                if not isinstance(item, dict) or not isinstance(item.get("id"), int) or isinstance(item["id"], bool):
+                    raise ValueError("Each update needs the integer 'id' of the record")
+                fields = self._parse_record_fields({k: v for k, v in item.items() if k != "id"}, partial=True)
+                if not fields:
+                    raise ValueError(f"Update of record {item['id']} has no fields to change")
+                parsed_updates.append({"id": item["id"], **fields})
+
+            if not all(isinstance(record_id, int) and not isinstance(record_id, bool) for record_id in deletes):
+                raise ValueError("'delete' must be a list of record ids")
+        except ValueError as e:
+            return fail(400, str(e))
+
+        update_ids = [item["id"] for item in parsed_updates]
+        if len(set(update_ids)) != len(update_ids):
+            return fail(400, "A record can only be updated once per batch")
+        both = set(update_ids) & set(deletes)
+        if both:
+            return fail(400, f"Records both updated and deleted: {sorted(both)}")
+
+        dataset_id = materials_dataset.id
+        referenced = set(update_ids) | set(deletes)
+        missing = referenced - self.material_record_repository.get_existing_ids(dataset_id, referenced)
+        if missing:
+            return fail(404, f"Material records not found in this dataset: {sorted(missing)}")
+
+        try:
+            result["deleted"] = self.material_record_repository.delete_many(dataset_id, set(deletes))
+            result["updated"] = self.material_record_repository.update_many(dataset_id, parsed_updates)
+            result["added"] = self.material_record_repository.insert_many(dataset_id, rows)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error applying record changes to dataset {dataset_id}: {str(e)}", exc_info=True)
+            result.update(added=0, updated=0, deleted=0)
+            return fail(500, f"Database error: {str(e)}")
+
+        result["success"] = True
+        return result
+
+    def delete_dataset(self, materials_dataset):
+        """
+        Deletes a dataset with its records, versions, views, downloads and upload sessions.
+
+        The child rows go with ON DELETE CASCADE in the same statement, and the stored
+        files are queued for the file reaper in the same transaction, so the call takes a
+        handful of statements whatever the size of the dataset.
+        """
+        from app import db
+
+        file_reaper = FileReaperService()
+        file_reaper.schedule_dataset_files(materials_dataset)
+        db.session.delete(materials_dataset)
+        db.session.commit()
+        file_reaper.reap_in_background()
 
     def get_recommendations(self, materials_dataset_id: int, limit: int = 3):
         """
@@ -729,8 +1431,8 @@ class MaterialsDatasetService:
                     .all()
                 )
 
-            # Get tags from current dataset
-            current_tags = set(tag.strip().lower() for tag in current_dataset.ds_meta_data.tags.split(","))
+            # Tags shared with every other dataset, from the dataset_tag index
+            shared_tags = self.tag_repository.count_shared_tags(current_dataset.ds_meta_data_id)
 
             # Get all other materials datasets
             all_datasets = MaterialsDataset.query.filter(
@@ -747,10 +1449,7 @@ class MaterialsDatasetService:
                     continue
 
                 # 1. Tag similarity (weight: 3 points per common tag)
-                if dataset.ds_meta_data.tags:
-                    dataset_tags = set(tag.strip().lower() for tag in dataset.ds_meta_data.tags.split(","))
-                    common_tags = current_tags.intersection(dataset_tags)
-                    score += len(common_tags) * 3
+                score += shared_tags.get(dataset.ds_meta_data_id, 0) * 3
 
                 # 2. Same publication type (weight: 2 points)
                 if (
@@ -812,9 +1511,11 @@ class MaterialsDatasetService:
         """
         from app.modules.dataset.models import MaterialsDataset
 
-        return MaterialsDataset.query.filter(
-            MaterialsDataset.id != materials_dataset_id, MaterialsDataset.ds_meta_data_id.isnot(None)
-        ).all()
+        return (
+            MaterialsDataset.query.options(*self.materials_dataset_repository.listing_options())
+            .filter(MaterialsDataset.id != materials_dataset_id, MaterialsDataset.ds_meta_data_id.isnot(None))
+            .all()
+        )
 
     def filter_by_authors(self, datasets, current_dataset):
         """
@@ -830,15 +1531,9 @@ class MaterialsDatasetService:
         if not current_dataset.ds_meta_data or not current_dataset.ds_meta_data.authors:
             return []
 
-        current_authors = {a.name.strip().lower() for a in current_dataset.ds_meta_data.authors}
+        sharing = self.author_repository.get_meta_data_ids_sharing_authors(current_dataset.ds_meta_data_id)
 
-        return [
-            ds
-            for ds in datasets
-            if ds.ds_meta_data
-            and ds.ds_meta_data.authors
-            and any(a.name.strip().lower() in current_authors for a in ds.ds_meta_data.authors)
-        ]
+        return [ds for ds in datasets if ds.ds_meta_data_id in sharing]
 
     def filter_by_tags(self, datasets, current_dataset):
         """
@@ -854,15 +1549,9 @@ class MaterialsDatasetService:
         if not current_dataset.ds_meta_data or not current_dataset.ds_meta_data.tags:
             return []
 
-        current_tags = {t.strip().lower() for t in current_dataset.ds_meta_data.tags.split(",")}
+        shared_tags = self.tag_repository.count_shared_tags(current_dataset.ds_meta_data_id)
 
-        return [
-            ds
-            for ds in datasets
-            if ds.ds_meta_data
-            and ds.ds_meta_data.tags
-            and any(t.strip().lower() in current_tags for t in ds.ds_meta_data.tags.split(","))
-        ]
+        return [ds for ds in datasets if ds.ds_meta_data_id in shared_tags]
 
     def filter_by_properties(self, datasets, current_dataset):
         """
@@ -896,6 +1585,7 @@ class MaterialsDatasetService:
         return self.materials_dataset_repository.get_top_downloads_global(limit=limit, days=days)
 
 
+@traced_class("service")
 class DatasetVersionService:
     def __init__(self):
         from app.modules.dataset.repositories import DatasetVersionRepository, MaterialRecordRepository
@@ -911,6 +1601,7 @@ class DatasetVersionService:
         """Get specific version details"""
         return self.version_repository.get_by_id(version_id)
 
+    @DIFF_DURATION.labels(kind="records").time()
     def compare_files(self, version_id_1: int, version_id_2: int):
         """
         Compare CSV files between two versions.
@@ -929,10 +1620,10 @@ class DatasetVersionService:
         # First, check if both CSVs have record_id column
         def has_record_id_column(csv_path):
             """Check if CSV file has record_id column"""
-            if not csv_path or not os.path.exists(csv_path):
+            if not csv_path or not get_storage().exists(csv_path):
                 return False
 
-            with open(csv_path, "r", encoding="utf-8") as f:
+            with open_csv_file(csv_path) as f:
                 reader = csv.DictReader(f)
                 return "record_id" in reader.fieldnames if reader.fieldnames else False
 
@@ -959,10 +1650,10 @@ class DatasetVersionService:
             Otherwise, use a simple counter (content matching happens later).
             """
             records = {}
-            if not csv_path or not os.path.exists(csv_path):
+            if not csv_path or not get_storage().exists(csv_path):
                 return records
 
-            with open(csv_path, "r", encoding="utf-8") as f:
+            with open_csv_file(csv_path) as f:
                 reader = csv.DictReader(f)
                 counter = 0
                 for row in reader:
@@ -1191,6 +1882,7 @@ class DatasetVersionService:
 
         return result
 
+    @DIFF_DURATION.labels(kind="metadata").time()
     def compare_metadata(self, version_id_1: int, version_id_2: int):
         """
         Compare metadata between two versions.
@@ -1225,6 +1917,7 @@ class DatasetVersionService:
 
         return comparison
 
+    @DIFF_DURATION.labels(kind="unified").time()
     def get_csv_diff(self, version_id_1: int, version_id_2: int):
         """
         Generate unified diff for CSV content using difflib.
@@ -1242,9 +1935,9 @@ class DatasetVersionService:
 
         # Read file contents
         def read_file_lines(path):
-            if not path or not os.path.exists(path):
+            if not path or not get_storage().exists(path):
                 return []
-            with open(path, "r", encoding="utf-8") as f:
+            with open_csv_file(path, newline=None) as f:
                 return f.readlines()
 
         lines1 = read_file_lines(version1.csv_snapshot_path)
@@ -1260,3 +1953,473 @@ class DatasetVersionService:
         )
 
         return "\n".join(diff)
+
+
+class UploadSessionService(BaseService):
+    """
+    Resumable chunked uploads.
+
+    A client opens a session, PUTs the file in chunks at explicit byte offsets
+    (each optionally verified by a checksum) and completes the session, at which
+    point the assembled file goes through the regular CSV ingestion pipeline.
+    Re-sending a chunk that was already received is harmless, so a dropped
+    connection only costs the chunk in flight.
+
+    Received bytes are kept in storage as one object per contiguous piece, named
+    after its offset, so chunks of a session may land on different web nodes.
+    """
+
+    SUPPORTED_CHECKSUMS = ("md5", "sha1", "sha256")
+
+    def __init__(self):
+        from app.modules.dataset.repositories import UploadSessionRepository
+
+        super().__init__(UploadSessionRepository())
+        self.materials_dataset_service = MaterialsDatasetService()
+
+    @staticmethod
+    def get_chunks_prefix(upload_session) -> str:
+        from core.configuration.configuration import uploads_folder_name
+
+        return f"{uploads_folder_name()}/upload_sessions/{upload_session.id}"
+
+    def get_chunk_key(self, upload_session, offset: int) -> str:
+        # Zero-padded so the lexicographic order of the keys is the byte order
+        return f"{self.get_chunks_prefix(upload_session)}/{offset:016d}"
+
+    def open_assembled(self, upload_session):
+        """Binary stream over every byte received so far, in order"""
+        storage = get_storage()
+        return storage.open_read_many(storage.list_keys(self.get_chunks_prefix(upload_session)))
+
+    def discard_chunks(self, upload_session):
+        storage = get_storage()
+        for key in storage.list_keys(self.get_chunks_prefix(upload_session)):
+            storage.delete(key)
+
+    def create_session(self, materials_dataset, filename: str, total_size: int = None):
+        """Open a new upload session"""
+        from app.modules.dataset.models import UploadSession
+
+        return self.repository.create(
+            id=str(uuid.uuid4()),
+            materials_dataset_id=materials_dataset.id,
+            filename=filename,
+            total_size=total_size,
+            received_bytes=0,
+            status=UploadSession.STATUS_ACTIVE,
+        )
+
+    def verify_checksum(self, data: bytes, checksum_header: str) -> Optional[str]:
+        """
+        Checks a chunk against an ``Upload-Checksum: <algorithm> <hex digest>`` header.
+
+        Returns:
+            None if the chunk matches, otherwise an error message
+        """
+        try:
+            algorithm, expected = checksum_header.strip().split(None, 1)
+        except ValueError:
+            return "Malformed Upload-Checksum header, expected '<algorithm> <hex digest>'"
+
+        algorithm = algorithm.lower()
+        if algorithm not in self.SUPPORTED_CHECKSUMS:
+            return f"Unsupported checksum algorithm '{algorithm}'"
+
+        if hashlib.new(algorithm, data).hexdigest() != expected.strip().lower():
+            return "Checksum mismatch"
+
+        return None
+
+    def write_chunk(self, upload_id: str, offset: int, data: bytes, checksum_header: str = None) -> dict:
+        """
+        Stores a chunk sent at ``offset``.
+
+        Chunks must be contiguous: an offset beyond the bytes received so far is
+        rejected with the current offset so the client can resume from there. Only
+        the part of a chunk past the bytes already received is stored, which makes
+        retries idempotent.
+
+        Returns:
+            dict with 'success', 'status_code', 'error' and 'offset' (bytes received)
+        """
+        from app.modules.dataset.models import UploadSession
+
+        upload_session = self.repository.get_for_update(upload_id)
+        if not upload_session:
+            return {"success": False, "status_code": 404, "error": "Upload session not found", "offset": None}
+
+        current_offset = upload_session.received_bytes
+
+        def fail(status_code, error):
+            self.repository.session.rollback()
+            return {"success": False, "status_code": status_code, "error": error, "offset": current_offset}
+
+        if upload_session.status != UploadSession.STATUS_ACTIVE:
+            return fail(409, f"Upload session is {upload_session.status}")
+
+        if offset < 0 or offset > current_offset:
+            return fail(409, f"Offset mismatch, expected at most {current_offset}")
+
+        end = offset + len(data)
+        if upload_session.total_size is not None and end > upload_session.total_size:
+            return fail(413, "Chunk exceeds the declared upload size")
+
+        if checksum_header:
+            checksum_error = self.verify_checksum(data, checksum_header)
+            if checksum_error:
+                return fail(400, checksum_error)
+
+        if end > current_offset:
+            with get_storage().open_write(self.get_chunk_key(upload_session, current_offset)) as chunk:
+                chunk.write(data[current_offset - offset :])
+
+        upload_session.received_bytes = max(current_offset, end)
+        self.repository.session.commit()
+
+        return {"success": True, "status_code": 200, "error": None, "offset": upload_session.received_bytes}
+
+    def complete(self, upload_id: str) -> dict:
+        """
+        Assembles the uploaded file and hands it to the CSV ingestion pipeline.
+
+        Returns:
+            dict with 'success', 'status_code', 'error' and, on success,
+            'records_created', 'checksum', 'size' and 'csv_file_path'
+        """
+        from app.modules.dataset.models import UploadSession
+
+        upload_session = self.repository.get_for_update(upload_id)
+        if not upload_session:
+            return {"success": False, "status_code": 404, "error": "Upload session not found"}
+
+        if upload_session.status != UploadSession.STATUS_ACTIVE:
+            self.repository.session.rollback()
+            return {"success": False, "status_code": 409, "error": f"Upload session is {upload_session.status}"}
+
+        if upload_session.total_size is not None and upload_session.received_bytes != upload_session.total_size:
+            received = upload_session.received_bytes
+            self.repository.session.rollback()
+            return {
+                "success": False,
+                "status_code": 409,
+                "error": f"Upload incomplete: {received} of {upload_session.total_size} bytes received",
+            }
+
+        # Claim the session so concurrent chunk writes or completions are rejected while ingesting
+        upload_session.status = UploadSession.STATUS_PROCESSING
+        self.repository.session.commit()
+
+        materials_dataset = upload_session.materials_dataset
+
+        # The whole file is already stored, so an identical earlier upload can be detected before parsing
+        hasher = hashlib.sha256()
+        with self.open_assembled(upload_session) as assembled:
+            for chunk in iter(lambda: assembled.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        duplicate = self.materials_dataset_service.find_duplicate_upload(materials_dataset, hasher.hexdigest())
+
+        if duplicate:
+            result = self.materials_dataset_service.clone_csv_upload(materials_dataset, duplicate)
+        else:
+            csv_file_path = self.materials_dataset_service.get_upload_key(materials_dataset, upload_session.filename)
+            with self.open_assembled(upload_session) as assembled:
+                result = self.materials_dataset_service.ingest_csv_stream(
+                    materials_dataset,
+                    assembled,
+                    csv_file_path,
+                    compression=get_csv_compression(upload_session.filename),
+                )
+
+        self.discard_chunks(upload_session)
+
+        if not result["success"]:
+            upload_session.status = UploadSession.STATUS_FAILED
+            self.repository.session.commit()
+            return {"success": False, "status_code": result.get("status_code", 400), "error": result["error"]}
+
+        csv_file_path = result["csv_file_path"]
+        materials_dataset.csv_file_path = csv_file_path
+        upload_session.status = UploadSession.STATUS_COMPLETED
+        self.repository.session.commit()
+
+        return {
+            "success": True,
+            "status_code": 200,
+            "error": None,
+            "records_created": result["records_created"],
+            "checksum": result["checksum"],
+            "size": result["size"],
+            "csv_file_path": csv_file_path,
+            "deduplicated": result["deduplicated"],
+        }
+
+
+# Single background thread running the file reaper after requests that queued deletions
+_file_reaper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-reaper")
+
+
+class FileReaperService(BaseService):
+    """
+    Removes stored files nothing points at anymore: CSVs and version snapshots of deleted
+    datasets, and the chunks of abandoned upload sessions.
+
+    Files are queued in the file_deletion table by ``schedule()``, inside the transaction
+    that orphans them, and removed later by ``reap()``: in a background thread right after
+    the request (FILE_REAPER_ASYNC) and by ``rosemary storage:reap``, which also picks up
+    whatever a crash left behind. A CSV that another dataset still references (identical
+    uploads share the stored file) is kept.
+    """
+
+    # Deletions failing this many times are left in the table for inspection
+    MAX_ATTEMPTS = 5
+
+    def __init__(self):
+        from app.modules.dataset.repositories import FileDeletionRepository, UploadSessionRepository
+
+        super().__init__(FileDeletionRepository())
+        self.upload_session_repository = UploadSessionRepository()
+
+    def schedule(self, key: str, is_prefix: bool = False):
+        """Queue a stored file (or every file under a prefix) for deletion. Does not commit."""
+        from app import db
+        from app.modules.dataset.models import FileDeletion
+
+        db.session.add(FileDeletion(key=key, is_prefix=is_prefix, attempts=0))
+
+    def schedule_dataset_files(self, materials_dataset) -> int:
+        """Queue the CSV, version snapshots and upload chunks of a dataset about to be deleted. Does not commit."""
+        from app import db
+        from app.modules.dataset.models import DatasetVersion, UploadSession
+
+        keys = [materials_dataset.csv_file_path] if materials_dataset.csv_file_path else []
+        keys.extend(
+            path
+            for (path,) in db.session.query(DatasetVersion.csv_snapshot_path).filter_by(
+                materials_dataset_id=materials_dataset.id
+            )
+        )
+        for key in keys:
+            self.schedule(key)
+
+        upload_ids = db.session.query(UploadSession.id).filter_by(materials_dataset_id=materials_dataset.id)
+        prefixes = [UploadSessionService.get_chunks_prefix(upload_session) for upload_session in upload_ids]
+        for prefix in prefixes:
+            self.schedule(prefix, is_prefix=True)
+
+        return len(keys) + len(prefixes)
+
+    def schedule_stale_upload_sessions(self, max_age: timedelta) -> int:
+        """Queue the chunks of upload sessions abandoned for longer than ``max_age`` and drop the sessions"""
+        from app import db
+
+        stale = self.upload_session_repository.get_stale(datetime.utcnow() - max_age)
+        for upload_session in stale:
+            self.schedule(UploadSessionService.get_chunks_prefix(upload_session), is_prefix=True)
+            db.session.delete(upload_session)
+        db.session.commit()
+        return len(stale)
+
+    def reap(self, limit: int = 500) -> dict:
+        """
+        Removes up to ``limit`` queued files.
+
+        Returns:
+            dict with the number of deletions 'deleted', 'kept' (still referenced) and 'failed'
+        """
+        from app import db
+
+        result = {"deleted": 0, "kept": 0, "failed": 0}
+        storage = get_storage()
+        for deletion in self.repository.claim_pending(limit, self.MAX_ATTEMPTS):
+            try:
+                if deletion.is_prefix:
+                    for key in storage.list_keys(deletion.key):
+                        storage.delete(key)
+                elif self.repository.is_key_referenced(deletion.key):
+                    result["kept"] += 1
+                    db.session.delete(deletion)
+                    continue
+                else:
+                    storage.delete(deletion.key)
+            except Exception as e:
+                logger.warning(f"Could not delete stored file {deletion.key}: {e}")
+                deletion.attempts += 1
+                deletion.last_error = str(e)
+                result["failed"] += 1
+                continue
+            db.session.delete(deletion)
+            result["deleted"] += 1
+
+        db.session.commit()
+        return result
+
+    def reap_in_background(self):
+        """Runs ``reap()`` in the reaper thread, so the request that queued the files returns right away"""
+        from flask import current_app
+
+        if not current_app.config.get("FILE_REAPER_ASYNC", True):
+            return
+        _file_reaper_executor.submit(self._reap_in_app_context, current_app._get_current_object())
+
+    def _reap_in_app_context(self, app):
+        with app.app_context():
+            try:
+                # Batch after batch until one makes no progress (empty queue, or only failing files)
+                while True:
+                    result = self.reap()
+                    if not result["deleted"] and not result["kept"]:
+                        break
+            except Exception as e:
+                logger.exception(f"File reaper failed: {e}")
+
+
+# Composition index of this process, shared by its threads; see CompositionSimilarityService.get_index()
+_composition_index = None
+_composition_index_lock = threading.Lock()
+# Set while the thread below rebuilds the index, so a burst of requests queues a single rebuild
+_composition_index_rebuilding = False
+_composition_index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="composition-index")
+
+
+@traced_class("service")
+class CompositionSimilarityService(BaseService):
+    """
+    "Materials similar to LiFePO4": nearest neighbours of a formula among the distinct formulas of
+    every dataset, by their element fractions (see app.modules.dataset.similarity).
+
+    The index lives in memory and in the storage under SIMILARITY_INDEX_KEY, so a restarted worker
+    or another host loads it instead of rebuilding it. It is rebuilt from material_record when records
+    were inserted after it was built, or when it is older than SIMILARITY_INDEX_MAX_AGE: in a
+    background thread that swaps it in when done (SIMILARITY_INDEX_ASYNC), while requests keep being
+    answered from the stale one. Only a process without any index builds it within the request.
+    """
+
+    def __init__(self):
+        from app.modules.dataset.repositories import MaterialRecordRepository
+
+        super().__init__(MaterialRecordRepository())
+
+    def _is_fresh(self, index, watermark: Optional[int]) -> bool:
+        from flask import current_app
+
+        max_age = current_app.config.get("SIMILARITY_INDEX_MAX_AGE", 3600)
+        return index is not None and index.watermark == watermark and time.time() - index.built_at < max_age
+
+    def _get_key(self) -> str:
+        from flask import current_app
+
+        return current_app.config.get("SIMILARITY_INDEX_KEY", "indexes/compositions.idx")
+
+    def _load_stored(self, key: str):
+        from app.modules.dataset.similarity import CompositionIndex
+
+        storage = get_storage()
+        if not storage.exists(key):
+            return None
+        try:
+            with storage.open_read(key) as stored:
+                return CompositionIndex.from_bytes(stored.read())
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable composition index {key}: {e}")
+            return None
+
+    def rebuild(self):
+        """
+        Builds the index from material_record and stores it, unless another worker stored a fresh one
+        meanwhile. Makes it this process's index and returns it.
+        """
+        from app.modules.dataset.similarity import CompositionIndex
+
+        global _composition_index
+        key = self._get_key()
+        watermark = self.repository.get_max_id()
+        index = self._load_stored(key)
+        if not self._is_fresh(index, watermark):
+            index = CompositionIndex.build(self.repository.get_formula_compositions(), watermark)
+            with get_storage().open_write(key) as stored:
+                stored.write(index.to_bytes())
+            logger.info(f"Composition index rebuilt: {len(index)} formulas, {len(index.elements)} elements")
+        _composition_index = index
+        return index
+
+    def rebuild_in_background(self):
+        """Queues a ``rebuild()`` in the index thread, unless one is already queued or running"""
+        from flask import current_app
+
+        global _composition_index_rebuilding
+        with _composition_index_lock:
+            if _composition_index_rebuilding:
+                return
+            _composition_index_rebuilding = True
+        _composition_index_executor.submit(self._rebuild_in_app_context, current_app._get_current_object())
+
+    def _rebuild_in_app_context(self, app):
+        global _composition_index_rebuilding
+        with app.app_context():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.exception(f"Composition index rebuild failed: {e}")
+            finally:
+                _composition_index_rebuilding = False
+
+    def get_index(self):
+        """
+        The composition index. A stale one is returned as is while a fresh one is built in the
+        background; the request waits only when this process has no index at all.
+        """
+        from flask import current_app
+
+        global _composition_index
+        watermark = self.repository.get_max_id()
+        index = _composition_index
+        if self._is_fresh(index, watermark):
+            record_cache_lookup("composition_index", hit=True)
+            return index
+        record_cache_lookup("composition_index", hit=False)
+
+        if index is None:
+            with _composition_index_lock:
+                if _composition_index is None:
+                    # Whatever another worker stored beats building one, even if stale
+                    _composition_index = self._load_stored(self._get_key())
+                index = _composition_index
+            if self._is_fresh(index, watermark):
+                return index
+
+        if index is None or not current_app.config.get("SIMILARITY_INDEX_ASYNC", True):
+            with _composition_index_lock:
+                if self._is_fresh(_composition_index, watermark):
+                    return _composition_index
+                return self.rebuild()
+
+        self.rebuild_in_background()
+        return index
+
+    def find_similar(self, formula: str, k: int = 10, metric: str = "cosine") -> list:
+        """
+        The ``k`` formulas closest to ``formula``, with their score, composition and the records and
+        datasets using them. Raises ValueError when the formula can't be parsed or the metric is unknown.
+        """
+        from app.modules.dataset.formulas import parse_formula
+        from app.modules.dataset.similarity import METRICS
+
+        composition = parse_formula(formula)
+        if composition is None:
+            raise ValueError(f"Could not parse the chemical formula: {formula}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (expected one of {', '.join(METRICS)})")
+
+        neighbours = self.get_index().search(composition, k, metric)
+        usage = self.repository.get_formula_usage(name for name, _ in neighbours)
+        return [
+            {
+                "chemical_formula": name,
+                "score": round(score, 6),
+                "composition": parse_formula(name),
+                "records": usage[name]["records"],
+                "dataset_ids": usage[name]["dataset_ids"],
+            }
+            for name, score in neighbours
+        ]
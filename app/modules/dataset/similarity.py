@@ -0,0 +1,129 @@
+"""
+Nearest-neighbour search over the compositions of the hub's distinct chemical formulas.
+
+Each formula is a vector of element fractions (amount / total amount) over the elements used
+anywhere in the catalogue, and all of them live in one contiguous ``array("f")`` stored column by
+column: the fractions of one element for every formula are adjacent. A query only has a few
+elements, so its dot products with every formula are that many sequential passes over columns,
+and both cosine similarity and Euclidean distance follow from those dot products and the norms
+computed when the index is loaded.
+"""
+
+import heapq
+import json
+import math
+import operator
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS = ("cosine", "euclidean")
+
+# Length of the JSON header that precedes the vectors in to_bytes()
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def element_fractions(composition: Dict[str, float]) -> Dict[str, float]:
+    """Amount of each element over the total, so Fe2O3 and Fe4O6 are the same vector"""
+    total = sum(composition.values())
+    return {symbol: amount / total for symbol, amount in composition.items()}
+
+
+class CompositionIndex:
+    def __init__(
+        self, formulas: List[str], elements: List[str], values: array, watermark: Optional[int], built_at: float
+    ):
+        """
+        ``values`` holds ``len(elements) * len(formulas)`` fractions, column-major: the fraction of
+        ``elements[j]`` in ``formulas[i]`` is ``values[j * len(formulas) + i]``. ``watermark`` is the
+        highest material record id seen when the index was built, to tell when it is stale.
+        """
+        self.formulas = formulas
+        self.elements = elements
+        self.values = values
+        self.watermark = watermark
+        self.built_at = built_at
+
+        count = len(formulas)
+        self.offsets = {symbol: j * count for j, symbol in enumerate(elements)}
+        squared_norms = [0.0] * count
+        for offset in self.offsets.values():
+            column = self.values[offset : offset + count]
+            squared_norms = list(map(operator.add, squared_norms, map(operator.mul, column, column)))
+        self.squared_norms = array("d", squared_norms)
+        self.norms = array("d", map(math.sqrt, squared_norms))
+
+    def __len__(self):
+        return len(self.formulas)
+
+    @classmethod
+    def build(
+        cls, compositions: Iterable[Tuple[str, Dict[str, float]]], watermark: Optional[int] = None
+    ) -> "CompositionIndex":
+        """Index of ``(formula, composition)`` pairs; formulas without a composition are left out"""
+        fractions = {formula: element_fractions(composition) for formula, composition in compositions if composition}
+        formulas = sorted(fractions)
+        elements = sorted({symbol for vector in fractions.values() for symbol in vector})
+        values = array("f")
+        for symbol in elements:
+            values.extend(fractions[formula].get(symbol, 0.0) for formula in formulas)
+        return cls(formulas, elements, values, watermark, time.time())
+
+    def search(self, composition: Dict[str, float], k: int = 10, metric: str = "cosine") -> List[Tuple[str, float]]:
+        """
+        The ``k`` formulas closest to ``composition`` with their cosine similarity (highest first)
+        or the Euclidean distance between fraction vectors (lowest first).
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        count = len(self.formulas)
+        query = element_fractions(composition)
+
+        dots = [0.0] * count
+        for symbol, fraction in query.items():
+            offset = self.offsets.get(symbol)
+            if offset is not None:
+                column = self.values[offset : offset + count]
+                dots = list(map(operator.add, dots, map(fraction.__mul__, column)))
+        query_squared_norm = sum(fraction * fraction for fraction in query.values())
+
+        if metric == "cosine":
+            query_norm = math.sqrt(query_squared_norm)
+            scores = list(map(operator.truediv, dots, self.norms))
+            best = heapq.nlargest(k, range(count), key=scores.__getitem__)
+            return [(self.formulas[i], scores[i] / query_norm) for i in best]
+
+        # |x - q|² = |x|² - 2 x·q + |q|²; the last term doesn't change the ranking
+        scores = list(map(operator.sub, self.squared_norms, map((2.0).__mul__, dots)))
+        best = heapq.nsmallest(k, range(count), key=scores.__getitem__)
+        return [(self.formulas[i], math.sqrt(max(scores[i] + query_squared_norm, 0.0))) for i in best]
+
+    def to_bytes(self) -> bytes:
+        """A JSON header (formulas, elements, watermark) followed by the float32 fractions, little-endian"""
+        header = json.dumps(
+            {
+                "formulas": self.formulas,
+                "elements": self.elements,
+                "watermark": self.watermark,
+                "built_at": self.built_at,
+            }
+        ).encode("utf-8")
+        values = array("f", self.values)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return _HEADER_LENGTH.pack(len(header)) + header + values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompositionIndex":
+        (length,) = _HEADER_LENGTH.unpack_from(data)
+        start = _HEADER_LENGTH.size
+        header = json.loads(data[start : start + length].decode("utf-8"))
+        values = array("f")
+        values.frombytes(data[start + length :])
+        if sys.byteorder != "little":
+            values.byteswap()
+        if len(values) != len(header["formulas"]) * len(header["elements"]):
+            raise ValueError("Truncated composition index")
+        return cls(header["formulas"], header["elements"], values, header["watermark"], header["built_at"])
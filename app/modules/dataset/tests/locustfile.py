@@ -10,6 +10,14 @@ from locust import HttpUser, TaskSet, between, task
 from core.environment.host import get_host_for_locust_testing
 from core.locust.common import get_csrf_token
 
+# Objectives checked by `rosemary locust --gate`: latency percentiles in ms, error rate as a fraction
+SLOS = {
+    "/dataset/list": {"p50": 150, "p95": 600, "p99": 1200, "error_rate": 0.01},
+    "/api/v1/materials-datasets/": {"p50": 150, "p95": 600, "p99": 1200, "error_rate": 0.01},
+    "/api/v1/materials-datasets/[id]": {"p50": 100, "p95": 400, "p99": 800, "error_rate": 0.01},
+    "/api/v1/materials-datasets/[id]/records/search": {"p50": 200, "p95": 800, "p99": 1500, "error_rate": 0.01},
+}
+
 
 class DatasetUploadBehavior(TaskSet):
     """
@@ -37,7 +45,7 @@ class DatasetUploadBehavior(TaskSet):
     def view_dataset_detail(self):
         """View dataset details"""
         dataset_id = 1
-        self.client.get(f"/dataset/view/{dataset_id}")
+        self.client.get(f"/materials/{dataset_id}", name="/materials/[id]")
 
 
 class APIUserBehavior(TaskSet):
@@ -48,18 +56,22 @@ class APIUserBehavior(TaskSet):
     @task(5)
     def api_list_datasets(self):
         """List datasets via API"""
-        self.client.get("/api/v1/datasets/", name="/api/v1/datasets/")
+        self.client.get("/api/v1/materials-datasets/", name="/api/v1/materials-datasets/")
 
     @task(3)
     def api_get_dataset(self):
         """Get specific dataset via API"""
         dataset_id = 1
-        self.client.get(f"/api/v1/datasets/{dataset_id}", name="/api/v1/datasets/[id]")
+        self.client.get(f"/api/v1/materials-datasets/{dataset_id}", name="/api/v1/materials-datasets/[id]")
 
     @task(2)
-    def api_search_datasets(self):
-        """Search datasets via API"""
-        self.client.get("/api/v1/datasets/?query=test", name="/api/v1/datasets/?query=[q]")
+    def api_search_records(self):
+        """Search the records of a dataset via API"""
+        dataset_id = 1
+        self.client.get(
+            f"/api/v1/materials-datasets/{dataset_id}/records/search?q=Material",
+            name="/api/v1/materials-datasets/[id]/records/search",
+        )
 
 
 class DatasetUploader(HttpUser):
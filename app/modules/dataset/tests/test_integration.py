@@ -8,6 +8,7 @@ from app import db
 from app.modules.auth.models import User
 from app.modules.dataset.models import MaterialsDataset
 from app.modules.dataset.services import DSViewRecordService
+from core.storage.storage import get_storage
 
 
 @pytest.mark.integration
@@ -518,3 +519,581 @@ def test_ds_view_record_service_get_by_id(test_client):
         # Test with non-existent ID
         result = service.get_by_id(99999)
         assert result is None
+
+
+@pytest.mark.integration
+def test_resumable_chunked_upload(test_client, integration_test_data, tmp_path, monkeypatch):
+    """Test uploading a CSV in chunks, retrying one and completing the session."""
+    import hashlib
+
+    from app.modules.dataset.models import MaterialRecord
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+
+    with test_client.application.app_context():
+        dataset = MaterialsDataset.query.filter(MaterialsDataset.csv_file_path.is_(None)).first()
+        dataset_id = dataset.id
+        records_before = MaterialRecord.query.filter_by(materials_dataset_id=dataset_id).count()
+
+    content = b"material_name,property_name,property_value\n" + b"".join(
+        f"Material{i},density,{i}\n".encode() for i in range(200)
+    )
+    chunks = [content[:1000], content[1000:2000], content[2000:]]
+
+    response = test_client.post(
+        f"/api/v1/materials-datasets/{dataset_id}/uploads", json={"filename": "big.csv", "size": len(content)}
+    )
+    assert response.status_code == 201
+    upload_id = response.json["upload_id"]
+    assert response.json["offset"] == 0
+
+    def put_chunk(offset, data, checksum=None):
+        headers = {"Upload-Offset": str(offset)}
+        if checksum:
+            headers["Upload-Checksum"] = checksum
+        return test_client.put(f"/api/v1/uploads/{upload_id}", data=data, headers=headers)
+
+    assert put_chunk(0, chunks[0], "sha256 " + hashlib.sha256(chunks[0]).hexdigest()).json["offset"] == 1000
+
+    # Retrying a chunk that was already stored is idempotent
+    response = put_chunk(0, chunks[0])
+    assert response.status_code == 200
+    assert response.json["offset"] == 1000
+
+    # Skipping ahead leaves a gap and is rejected with the offset to resume from
+    response = put_chunk(2000, chunks[2])
+    assert response.status_code == 409
+    assert response.json["offset"] == 1000
+
+    # Corrupted chunk
+    response = put_chunk(1000, chunks[1], "sha256 " + hashlib.sha256(b"other").hexdigest())
+    assert response.status_code == 400
+
+    # Completing before all bytes arrived is refused
+    assert test_client.post(f"/api/v1/uploads/{upload_id}/complete").status_code == 409
+
+    assert put_chunk(1000, chunks[1]).json["offset"] == 2000
+    assert put_chunk(2000, chunks[2]).json["offset"] == len(content)
+    assert test_client.get(f"/api/v1/uploads/{upload_id}").json["offset"] == len(content)
+
+    response = test_client.post(f"/api/v1/uploads/{upload_id}/complete")
+    assert response.status_code == 200
+    assert response.json["records_created"] == 200
+    assert response.json["checksum"] == hashlib.sha256(content).hexdigest()
+
+    # The session is closed once completed
+    assert test_client.get(f"/api/v1/uploads/{upload_id}").json["status"] == "completed"
+    assert put_chunk(0, chunks[0]).status_code == 409
+
+    with test_client.application.app_context():
+        dataset = db.session.get(MaterialsDataset, dataset_id)
+        assert MaterialRecord.query.filter_by(materials_dataset_id=dataset_id).count() == records_before + 200
+        with get_storage().open_read(dataset.csv_file_path) as f:
+            assert f.read() == content
+        # The received chunks are removed once assembled
+        assert get_storage().list_keys(f"uploads/upload_sessions/{upload_id}") == []
+
+
+@pytest.mark.integration
+def test_listing_pages_run_fixed_number_of_queries(test_client):
+    """
+    Test that dataset listings load the record counts in batch, so the number of
+    queries does not grow with the datasets or their records.
+    """
+    from sqlalchemy import event
+
+    from app.modules.dataset.models import DSMetaData, MaterialRecord, PublicationType
+
+    user = User.query.filter_by(email="test@example.com").first()
+
+    def add_datasets(count, records):
+        for i in range(count):
+            meta_data = DSMetaData(
+                title=f"Listing {i}", description="Listing test", publication_type=PublicationType.NONE
+            )
+            db.session.add(meta_data)
+            db.session.flush()
+            dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=meta_data.id, csv_file_path=f"listing_{i}.csv")
+            db.session.add(dataset)
+            db.session.flush()
+            for r in range(records):
+                db.session.add(
+                    MaterialRecord(
+                        materials_dataset_id=dataset.id,
+                        material_name=f"Material {r % 3}",
+                        property_name=f"property_{r % 2}",
+                        property_value="1.0",
+                    )
+                )
+        db.session.commit()
+
+    def count_queries(url):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.expire_all()
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = test_client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        return len(statements), response
+
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"}, follow_redirects=True)
+
+    add_datasets(2, records=2)
+    small_list, _ = count_queries("/dataset/list")
+    small_api, _ = count_queries("/api/v1/materials-datasets/")
+
+    add_datasets(4, records=30)
+    large_list, response = count_queries("/dataset/list")
+    large_api, api_response = count_queries("/api/v1/materials-datasets/")
+
+    assert large_list == small_list
+    assert large_api == small_api
+    assert b"30 records" in response.data
+
+    items = {item["id"]: item for item in api_response.json["items"]}
+    large = [item for item in items.values() if item["materials_count"] == 30]
+    assert len(large) == 4
+    assert sorted(large[0]["unique_materials"]) == ["Material 0", "Material 1", "Material 2"]
+    assert sorted(large[0]["unique_properties"]) == ["property_0", "property_1"]
+
+
+@pytest.mark.integration
+def test_bulk_record_changes_create_one_version(test_client, integration_test_data, tmp_path, monkeypatch):
+    """Test that a PATCH of records applies adds, updates and deletes set-based and creates a single version."""
+    import csv
+    import io
+
+    from sqlalchemy import event
+
+    from app.modules.dataset.models import DatasetVersion, DataSource, MaterialRecord
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+
+    dataset = (
+        MaterialsDataset.query.join(MaterialsDataset.material_records)
+        .filter(MaterialRecord.material_name == "Graphene")
+        .first()
+    )
+    dataset_id = dataset.id
+    graphene = MaterialRecord.query.filter_by(materials_dataset_id=dataset_id, material_name="Graphene").first()
+    silicon = MaterialRecord.query.filter_by(materials_dataset_id=dataset_id, material_name="Silicon").first()
+    steel = MaterialRecord.query.filter_by(material_name="Steel Alloy").first()
+    graphene_id, silicon_id, steel_id = graphene.id, silicon.id, steel.id
+    url = f"/api/v1/materials-datasets/{dataset_id}/records"
+
+    test_client.get("/logout", follow_redirects=True)
+    assert test_client.patch(url, json={"delete": [silicon_id]}).status_code == 401
+
+    test_client.post("/login", data={"email": "user1@example.com", "password": "test1234"}, follow_redirects=True)
+
+    # Invalid batches change nothing
+    assert test_client.patch(url, json={}).status_code == 400
+    assert test_client.patch(url, json={"add": [{"material_name": "Boron"}]}).status_code == 400
+    assert test_client.patch(url, json={"update": [{"id": graphene_id, "temperature": "hot"}]}).status_code == 400
+    response = test_client.patch(url, json={"delete": [silicon_id, steel_id]})
+    assert response.status_code == 404
+    assert str(steel_id) in response.json["message"]
+    assert MaterialRecord.query.filter_by(materials_dataset_id=dataset_id).count() == 2
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "material_record" in statement.split("WHERE")[0]:
+            statements.append(statement.lstrip().split(None, 1)[0].upper())
+
+    changes = {
+        "add": [
+            {"material_name": "Boron Nitride", "property_name": "Band Gap", "property_value": 6.0, "temperature": 300},
+            {
+                "material_name": "Diamond",
+                "property_name": "Hardness",
+                "property_value": "10",
+                "data_source": "literature",
+            },
+        ],
+        "update": [
+            {"id": graphene_id, "property_value": "5300", "temperature": None, "data_source": "computational"},
+        ],
+        "delete": [silicon_id],
+    }
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = test_client.patch(url, json=changes)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert response.json == {
+        "dataset_id": dataset_id,
+        "added": 2,
+        "updated": 1,
+        "deleted": 1,
+        "version": 1,
+        "row_version": 2,
+    }
+    assert statements.count("INSERT") == 1
+    assert statements.count("UPDATE") == 1
+    assert statements.count("DELETE") == 1
+
+    db.session.expire_all()
+    records = {r.material_name: r for r in MaterialRecord.query.filter_by(materials_dataset_id=dataset_id)}
+    assert sorted(records) == ["Boron Nitride", "Diamond", "Graphene"]
+    assert records["Graphene"].property_value == "5300"
+    assert records["Graphene"].temperature is None
+    assert records["Graphene"].data_source == DataSource.COMPUTATIONAL
+    assert records["Boron Nitride"].property_value == "6.0"
+    assert records["Diamond"].data_source == DataSource.LITERATURE
+
+    versions = DatasetVersion.query.filter_by(materials_dataset_id=dataset_id).all()
+    assert len(versions) == 1 and versions[0].records_count == 3
+
+    dataset = db.session.get(MaterialsDataset, dataset_id)
+    with get_storage().open_read(dataset.csv_file_path) as f:
+        rows = list(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8")))
+    assert sorted(row["material_name"] for row in rows) == ["Boron Nitride", "Diamond", "Graphene"]
+
+    test_client.get("/logout", follow_redirects=True)
+
+
+@pytest.mark.integration
+def test_dataset_delete_cascades_in_database_and_reaps_files(test_client, tmp_path, monkeypatch):
+    """
+    Test that deleting a dataset leaves its child rows to ON DELETE CASCADE and its stored
+    files to the file reaper, which keeps a CSV still shared with another dataset.
+    """
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import event, insert
+
+    from app.modules.dataset.models import (
+        DatasetVersion,
+        DSDownloadRecord,
+        DSMetaData,
+        DSViewRecord,
+        FileDeletion,
+        MaterialRecord,
+        PublicationType,
+        UploadSession,
+    )
+    from app.modules.dataset.services import FileReaperService, UploadSessionService
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    storage = get_storage()
+    user = User.query.filter_by(email="test@example.com").first()
+
+    def create_dataset(title, csv_file_path):
+        meta_data = DSMetaData(title=title, description="Delete test", publication_type=PublicationType.NONE)
+        db.session.add(meta_data)
+        db.session.flush()
+        dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=meta_data.id, csv_file_path=csv_file_path)
+        db.session.add(dataset)
+        db.session.flush()
+        return dataset
+
+    def store(key):
+        with storage.open_write(key) as f:
+            f.write(b"material_name,property_name,property_value\nGraphene,density,2.2\n")
+        return key
+
+    shared_csv = store("uploads/materials_csv/shared.csv")
+    dataset = create_dataset("Deleted dataset", shared_csv)
+    other = create_dataset("Dataset sharing the CSV", shared_csv)
+    db.session.execute(
+        insert(MaterialRecord),
+        [
+            {"materials_dataset_id": dataset.id, "material_name": f"M{i}", "property_name": "p", "property_value": "1"}
+            for i in range(500)
+        ],
+    )
+    snapshots = [store(f"uploads/materials_csv/versions/deleted_v{n}.csv") for n in (1, 2)]
+    for number, snapshot in enumerate(snapshots, start=1):
+        db.session.add(
+            DatasetVersion(
+                materials_dataset_id=dataset.id,
+                version_number=number,
+                csv_snapshot_path=snapshot,
+                metadata_snapshot={},
+                records_count=500,
+            )
+        )
+    db.session.add(DSViewRecord(dataset_id=dataset.id, view_cookie="delete-test"))
+    db.session.add(DSDownloadRecord(dataset_id=dataset.id, download_cookie="delete-test"))
+    upload_session = UploadSession(
+        id="delete-test-session", materials_dataset_id=dataset.id, filename="big.csv", received_bytes=0
+    )
+    stale_session = UploadSession(
+        id="stale-test-session",
+        materials_dataset_id=other.id,
+        filename="old.csv",
+        received_bytes=0,
+        updated_at=datetime.utcnow() - timedelta(days=3),
+    )
+    db.session.add_all([upload_session, stale_session])
+    db.session.commit()
+    dataset_id, other_id = dataset.id, other.id
+    chunk = store(f"{UploadSessionService.get_chunks_prefix(upload_session)}/{0:016d}")
+    stale_chunk = store(f"{UploadSessionService.get_chunks_prefix(stale_session)}/{0:016d}")
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"}, follow_redirects=True)
+    db.session.expire_all()
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = test_client.post(f"/materials/{dataset_id}/delete")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    test_client.get("/logout", follow_redirects=True)
+
+    assert response.status_code == 302
+    deletes = [s for s in statements if s.lstrip().upper().startswith("DELETE")]
+    assert not any("material_record" in s or "dataset_version" in s for s in deletes)
+    assert len(statements) < 30
+
+    db.session.expire_all()
+    assert db.session.get(MaterialsDataset, dataset_id) is None
+    assert MaterialRecord.query.filter_by(materials_dataset_id=dataset_id).count() == 0
+    assert DatasetVersion.query.filter_by(materials_dataset_id=dataset_id).count() == 0
+    assert DSViewRecord.query.filter_by(dataset_id=dataset_id).count() == 0
+    assert DSDownloadRecord.query.filter_by(dataset_id=dataset_id).count() == 0
+    assert UploadSession.query.filter_by(materials_dataset_id=dataset_id).count() == 0
+
+    # Nothing is removed from storage until the reaper runs
+    assert FileDeletion.query.count() == 4
+    assert all(storage.exists(key) for key in [shared_csv, chunk, *snapshots])
+
+    file_reaper = FileReaperService()
+    assert file_reaper.reap() == {"deleted": 3, "kept": 1, "failed": 0}
+    assert FileDeletion.query.count() == 0
+    assert storage.exists(shared_csv)
+    assert not any(storage.exists(key) for key in [chunk, *snapshots])
+
+    # Abandoned upload sessions are dropped with their chunks
+    assert file_reaper.schedule_stale_upload_sessions(timedelta(hours=24)) == 1
+    assert file_reaper.reap() == {"deleted": 1, "kept": 0, "failed": 0}
+    assert not storage.exists(stale_chunk)
+    assert db.session.get(MaterialsDataset, other_id) is not None
+
+
+@pytest.mark.integration
+def test_concurrent_dataset_edits_are_serialised(test_client, integration_test_data, tmp_path, monkeypatch):
+    """
+    Test that concurrent CSV regenerations and snapshots of one dataset take turns under the
+    dataset lock (distinct version numbers), that version numbers are unique in the database
+    and that a PATCH based on a stale row_version is rejected.
+    """
+    import threading
+
+    from sqlalchemy.exc import IntegrityError
+
+    from app.modules.dataset.models import DatasetVersion, MaterialRecord
+    from app.modules.dataset.routes import create_version_snapshot, regenerate_csv_for_dataset
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+
+    dataset = (
+        MaterialsDataset.query.join(MaterialsDataset.material_records)
+        .filter(MaterialRecord.material_name == "Steel Alloy")
+        .first()
+    )
+    dataset_id = dataset.id
+    user_id = dataset.user_id
+    assert regenerate_csv_for_dataset(dataset_id)
+
+    errors = []
+
+    def edit():
+        # Every worker thread has its own app context, hence its own session and connection (plus the
+        # one holding the lock: three threads fit the testing pool)
+        with test_client.application.app_context():
+            try:
+                assert regenerate_csv_for_dataset(dataset_id)
+                create_version_snapshot(dataset_id, user_id, "Concurrent edit")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=edit) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    db.session.expire_all()
+    versions = DatasetVersion.query.filter_by(materials_dataset_id=dataset_id).all()
+    assert sorted(v.version_number for v in versions) == [1, 2, 3]
+    assert len({v.csv_snapshot_path for v in versions}) == 3
+
+    duplicate = DatasetVersion(
+        materials_dataset_id=dataset_id,
+        version_number=3,
+        csv_snapshot_path="uploads/materials_csv/versions/duplicate.csv",
+        metadata_snapshot={},
+    )
+    db.session.add(duplicate)
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+    # Every regeneration bumped the optimistic concurrency counter
+    dataset = db.session.get(MaterialsDataset, dataset_id)
+    row_version = dataset.row_version
+    assert row_version >= 5
+
+    test_client.post("/login", data={"email": "user1@example.com", "password": "test1234"}, follow_redirects=True)
+    url = f"/api/v1/materials-datasets/{dataset_id}/records"
+    record_id = MaterialRecord.query.filter_by(materials_dataset_id=dataset_id).first().id
+
+    response = test_client.patch(url, json={"row_version": row_version - 1, "delete": [record_id]})
+    assert response.status_code == 409
+    assert response.json["row_version"] == row_version
+    assert db.session.get(MaterialRecord, record_id) is not None
+
+    response = test_client.patch(url, json={"row_version": row_version, "update": [{"id": record_id, "pressure": 2}]})
+    assert response.status_code == 200
+    assert response.json["version"] == 4
+    assert response.json["row_version"] == row_version + 1
+
+    test_client.get("/logout", follow_redirects=True)
+
+
+@pytest.mark.integration
+def test_recommendations_filter_and_paginate_in_sql(test_client, integration_test_data):
+    """
+    Test that each recommendations filter mode returns the datasets the Python filters select,
+    one page at a time, with a query count that doesn't depend on the size of the catalogue.
+    """
+    from sqlalchemy import event
+
+    from app.modules.dataset.models import MaterialRecord
+    from app.modules.dataset.repositories import MaterialsDatasetRepository
+    from app.modules.dataset.services import MaterialsDatasetService
+
+    current = (
+        MaterialsDataset.query.join(MaterialsDataset.material_records)
+        .filter(MaterialRecord.material_name == "Graphene")
+        .first()
+    )
+    service = MaterialsDatasetService()
+    repository = MaterialsDatasetRepository()
+    others = service.get_all_except(current.id)
+    python_filters = {
+        None: lambda datasets: datasets,
+        "authors": lambda datasets: service.filter_by_authors(datasets, current),
+        "tags": lambda datasets: service.filter_by_tags(datasets, current),
+        "properties": lambda datasets: service.filter_by_properties(datasets, current),
+    }
+
+    for filter_type, python_filter in python_filters.items():
+        expected = {ds.id for ds in python_filter(others)}
+        items, total = repository.get_related_page(current, filter_type, page=1, per_page=1000)
+        assert {ds.id for ds in items} == expected, filter_type
+        assert total == len(expected)
+
+    # Pages are consecutive slices of the same newest-first order
+    everything, total = repository.get_related_page(current, None, page=1, per_page=1000)
+    first, _ = repository.get_related_page(current, None, page=1, per_page=2)
+    second, _ = repository.get_related_page(current, None, page=2, per_page=2)
+    assert [ds.id for ds in first + second] == [ds.id for ds in everything[:4]]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = test_client.get(
+            f"/materials/{current.id}/recommendations", query_string={"page": 1, "filter_type": "tags"}
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert response.json["total_pages"] == (len(python_filters["tags"](others)) + 4) // 5 >= 1
+    # Dataset, count, page, metadata and authors of the page, listing stats: nothing per dataset
+    assert len(statements) == 6
+
+
+@pytest.mark.integration
+def test_similar_materials_api(test_client, integration_test_data, tmp_path, monkeypatch):
+    """
+    Test the nearest-neighbour search over formula compositions: ranking by either metric, the
+    index persisted in the storage, and its rebuild once records are added, in the request or the background.
+    """
+    import os
+
+    from app.modules.dataset import services
+    from app.modules.dataset.models import MaterialRecord
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(services, "_composition_index", None)
+
+    # Formulas of the fixture: "C", "Si", "Fe-C" and the unparseable "XYZ"
+    response = test_client.get("/api/v1/material-records/similar", query_string={"formula": "Fe3C", "k": 2})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [result["chemical_formula"] for result in results] == ["Fe-C", "C"]
+    assert results[0]["composition"] == {"Fe": 1, "C": 1}
+    assert results[0]["score"] == pytest.approx(4 / 20**0.5, abs=1e-5)
+    assert results[0]["records"] == 1 and len(results[0]["dataset_ids"]) == 1
+    assert os.path.isfile(tmp_path / "indexes" / "compositions.idx")
+
+    response = test_client.get(
+        "/api/v1/material-records/similar", query_string={"formula": "Si2", "metric": "euclidean", "k": 5}
+    )
+    scores = {result["chemical_formula"]: result["score"] for result in response.json["results"]}
+    assert set(scores) == {"Si", "C", "Fe-C"}
+    assert scores["Si"] == pytest.approx(0, abs=1e-5)
+    assert scores["C"] == pytest.approx(2**0.5, abs=1e-5)
+
+    # Another worker starts from the stored index; new records make it stale
+    monkeypatch.setattr(services, "_composition_index", None)
+    dataset_id = MaterialRecord.query.filter_by(chemical_formula="Si").one().materials_dataset_id
+    db.session.add(
+        MaterialRecord(
+            materials_dataset_id=dataset_id,
+            material_name="Silicon carbide",
+            chemical_formula="SiC",
+            property_name="hardness",
+            property_value="9.5",
+        )
+    )
+    db.session.commit()
+    response = test_client.get("/api/v1/material-records/similar", query_string={"formula": "CSi"})
+    assert response.json["results"][0]["chemical_formula"] == "SiC"
+    assert response.json["results"][0]["score"] == pytest.approx(1, abs=1e-5)
+
+    # Rebuilt in the background: the stale index answers until the new one is swapped in
+    monkeypatch.setitem(test_client.application.config, "SIMILARITY_INDEX_ASYNC", True)
+    db.session.add(
+        MaterialRecord(
+            materials_dataset_id=dataset_id,
+            material_name="Silica",
+            chemical_formula="SiO2",
+            property_name="density",
+            property_value="2.65",
+        )
+    )
+    db.session.commit()
+    response = test_client.get("/api/v1/material-records/similar", query_string={"formula": "SiO2"})
+    assert "SiO2" not in [result["chemical_formula"] for result in response.json["results"]]
+    services._composition_index_executor.submit(lambda: None).result(timeout=30)
+    assert not services._composition_index_rebuilding
+    response = test_client.get("/api/v1/material-records/similar", query_string={"formula": "SiO2"})
+    assert response.json["results"][0]["chemical_formula"] == "SiO2"
+
+    for query_string in ({}, {"formula": "XYZ"}, {"formula": "SiC", "metric": "manhattan"}):
+        assert test_client.get("/api/v1/material-records/similar", query_string=query_string).status_code == 400
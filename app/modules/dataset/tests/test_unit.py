@@ -39,9 +39,13 @@ from app.modules.dataset.services import (
     DSDownloadRecordService,
     DSMetaDataService,
     DSViewRecordService,
+    HashingTeeReader,
     MaterialsDatasetService,
     SizeService,
     calculate_checksum_and_size,
+    get_csv_compression,
+    is_csv_filename,
+    open_csv_file,
 )
 from core.services.BaseService import BaseService
 
@@ -1531,6 +1535,166 @@ def test_materials_dataset_service_filter_by_authors(test_client):
     assert dataset3 not in filtered  # Different author
 
 
+@pytest.mark.unit
+def test_author_identity_key_matches_orcid_or_normalised_name(test_client):
+    """Test that author identity keys prefer the ORCID iD and otherwise ignore name order, accents and case"""
+    from app.modules.dataset.models import author_identity_key
+
+    assert author_identity_key("Jane Smith", "https://orcid.org/0000-0002-1825-009x") == "orcid:0000-0002-1825-009X"
+    assert author_identity_key("Pérez, José-Luis") == author_identity_key("jose luis PEREZ") == "name:jose luis perez"
+    assert author_identity_key("Jane Smith", "not an orcid") == "name:jane smith"
+
+    user = User(email="test_author_identity@example.com", password="test123")
+    db.session.add(user)
+    db.session.commit()
+
+    datasets = []
+    for name, orcid in [("Smith, Jane", None), ("jane smith", None), ("J. Smith", "0000-0002-1825-0097")]:
+        metadata = DSMetaData(title=f"Identity {name}", description="Test", publication_type=PublicationType.NONE)
+        db.session.add(metadata)
+        db.session.flush()
+        db.session.add(Author(name=name, orcid=orcid, ds_meta_data_id=metadata.id))
+        datasets.append(MaterialsDataset(user_id=user.id, ds_meta_data_id=metadata.id))
+    db.session.add_all(datasets)
+    db.session.commit()
+
+    service = MaterialsDatasetService()
+    assert service.filter_by_authors(datasets, datasets[0]) == [datasets[1]]
+
+    # The key follows edits of the name or ORCID
+    author = datasets[1].ds_meta_data.authors[0]
+    author.orcid = "0000-0002-1825-0097"
+    db.session.commit()
+    assert author.identity_key == "orcid:0000-0002-1825-0097"
+    assert service.filter_by_authors(datasets, datasets[0]) == []
+    assert service.filter_by_authors(datasets, datasets[2]) == [datasets[1]]
+
+
+@pytest.mark.unit
+def test_author_identity_key_fits_long_transliterated_names(test_client):
+    """Test that names that grow when transliterated still get a stable key that fits the column"""
+    from app.modules.dataset.models import AUTHOR_IDENTITY_KEY_LENGTH, author_identity_key
+
+    name = "王" * 120
+    key = author_identity_key(name)
+    assert len(key) == AUTHOR_IDENTITY_KEY_LENGTH
+    assert key == author_identity_key(name)
+    assert key != author_identity_key("王" * 119 + "李")
+    assert len(author_identity_key("Щ" * 120)) == AUTHOR_IDENTITY_KEY_LENGTH
+    assert author_identity_key("Jane Smith") == "name:jane smith"
+
+
+@pytest.mark.unit
+def test_parse_formula_composition(test_client):
+    """Test that formulas parse into element amounts, and unreadable ones into None"""
+    from app.modules.dataset.formulas import atomic_numbers, parse_element_symbols, parse_formula
+
+    assert parse_formula("Fe2O3") == {"Fe": 2, "O": 3}
+    assert parse_formula("Ca(OH)2") == {"Ca": 1, "O": 2, "H": 2}
+    assert parse_formula("K4[Fe(CN)6]") == {"K": 4, "Fe": 1, "C": 6, "N": 6}
+    assert parse_formula("CuSO4·5H2O") == {"Cu": 1, "S": 1, "O": 9, "H": 10}
+    assert parse_formula("LiNi0.8Co0.1Mn0.1O2") == {"Li": 1, "Ni": 0.8, "Co": 0.1, "Mn": 0.1, "O": 2}
+    assert parse_formula("(C2F4)n") == {"C": 2, "F": 4}
+    assert parse_formula("Fe-C") == {"Fe": 1, "C": 1}
+    assert parse_formula("CO") == {"C": 1, "O": 1}
+    assert parse_formula("Co") == {"Co": 1}
+    for unreadable in (None, "", "XYZ", "Fermium", "Ca(OH", "Li1-xCoO2"):
+        assert parse_formula(unreadable) is None
+
+    assert atomic_numbers(["O", "Fe", "O"]) == [8, 26]
+    assert parse_element_symbols("fe, O,") == ["Fe", "O"]
+    with pytest.raises(ValueError):
+        parse_element_symbols(["Fe", "Xx"])
+
+
+@pytest.mark.unit
+def test_composition_index_search(test_client):
+    """Test cosine and Euclidean neighbours over element fractions, and the serialised index"""
+    from app.modules.dataset.formulas import parse_formula
+    from app.modules.dataset.similarity import CompositionIndex
+
+    formulas = ["LiFePO4", "LiMnPO4", "NaFePO4", "Fe2O3", "Fe4O6", "SiO2", "XYZ"]
+    index = CompositionIndex.build([(formula, parse_formula(formula)) for formula in formulas], watermark=42)
+    assert len(index) == 6  # XYZ has no composition
+    assert index.elements == ["Fe", "Li", "Mn", "Na", "O", "P", "Si"]
+
+    neighbours = index.search(parse_formula("LiFePO4"), k=3)
+    assert neighbours[0][0] == "LiFePO4" and neighbours[0][1] == pytest.approx(1, abs=1e-6)
+    assert {formula for formula, _ in neighbours[1:]} == {"LiMnPO4", "NaFePO4"}
+    assert neighbours[1][1] == pytest.approx(18 / 19, abs=1e-6)
+
+    # Same fractions, same point
+    nearest = index.search(parse_formula("Fe6O9"), k=2, metric="euclidean")
+    assert {formula for formula, _ in nearest} == {"Fe2O3", "Fe4O6"}
+    assert all(distance == pytest.approx(0, abs=1e-6) for _, distance in nearest)
+
+    loaded = CompositionIndex.from_bytes(index.to_bytes())
+    assert loaded.watermark == 42 and loaded.formulas == index.formulas
+    assert loaded.search(parse_formula("SiO"), k=1, metric="euclidean") == index.search(
+        parse_formula("SiO"), k=1, metric="euclidean"
+    )
+    with pytest.raises(ValueError):
+        index.search(parse_formula("SiO2"), metric="manhattan")
+
+
+@pytest.mark.unit
+def test_material_record_repository_search_by_composition(test_client):
+    """Test that every way of writing records keeps their composition, and the element searches on it"""
+    user = User(email="test_search_by_composition@example.com", password="test123")
+    db.session.add(user)
+    db.session.commit()
+    metadata = DSMetaData(title="Compositions", description="Test", publication_type=PublicationType.NONE)
+    db.session.add(metadata)
+    db.session.commit()
+    dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=metadata.id)
+    db.session.add(dataset)
+    db.session.commit()
+
+    def add(name, formula):
+        record = MaterialRecord(
+            materials_dataset_id=dataset.id,
+            material_name=name,
+            chemical_formula=formula,
+            property_name="density",
+            property_value="1",
+        )
+        db.session.add(record)
+        return record
+
+    hematite = add("Hematite", "Fe2O3")
+    lead_ferrite = add("Lead ferrite", "PbFe12O19")
+    monoxide = add("Carbon monoxide", "CO")
+    cobalt_oxide = add("Cobalt oxide", "CoO")
+    unknown = add("Unknown", "XYZ")
+    db.session.commit()
+    assert hematite.composition == {"Fe": 2, "O": 3}
+    assert hematite.elements == [8, 26]
+    assert unknown.composition is None and unknown.elements is None
+
+    repo = MaterialRecordRepository()
+    silica = {"material_name": "Silica", "chemical_formula": "SiO2", "property_name": "density", "property_value": "2"}
+    repo.insert_many(dataset.id, [silica])
+    repo.update_many(dataset.id, [{"id": unknown.id, "chemical_formula": "FeO"}])
+    db.session.commit()
+    db.session.expire_all()
+    assert unknown.elements == [8, 26]
+
+    def ids(**criteria):
+        records, total = repo.search_by_composition(per_page=1000, **criteria)
+        assert total == len(records)
+        return {record.id for record in records if record.materials_dataset_id == dataset.id}
+
+    silica = MaterialRecord.query.filter_by(materials_dataset_id=dataset.id, material_name="Silica").one()
+    assert silica.composition == {"Si": 1, "O": 2}
+    assert ids(elements=["Fe", "O"]) == {hematite.id, lead_ferrite.id, unknown.id}
+    assert ids(elements=["Fe", "O"], exclude=["Pb"]) == {hematite.id, unknown.id}
+    assert ids(elements=["O"], element_count=2) == {hematite.id, monoxide.id, cobalt_oxide.id, unknown.id, silica.id}
+
+    # A formula search term matches by elements: "Co" is cobalt, not the C and O of carbon monoxide
+    assert {record.id for record in repo.search_materials(dataset.id, "Co")} == {cobalt_oxide.id}
+    assert {record.id for record in repo.search_materials(dataset.id, "XY")} == set()
+
+
 @pytest.mark.unit
 def test_materials_dataset_service_filter_by_tags(test_client):
     """Test MaterialsDatasetService.filter_by_tags()"""
@@ -1792,6 +1956,40 @@ def test_regenerate_csv_for_dataset_not_found(test_client):
     assert result is False
 
 
+@pytest.mark.unit
+def test_regenerate_csv_for_compressed_upload(test_client, tmp_path, monkeypatch):
+    """
+    Test that regenerating a compressed upload only points the dataset at the plain CSV once it
+    is written, and queues the compressed original for the reaper
+    """
+    import gzip
+
+    from app.modules.dataset.models import FileDeletion
+    from app.modules.dataset.routes import regenerate_csv_for_dataset
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    dataset = _create_materials_dataset("test_regenerate_compressed@example.com")
+    (tmp_path / "upload.csv.gz").write_bytes(gzip.compress(b"material_name,property_name,property_value\n"))
+    dataset.csv_file_path = "upload.csv.gz"
+    db.session.add(
+        MaterialRecord(materials_dataset_id=dataset.id, material_name="A", property_name="density", property_value="1")
+    )
+    db.session.commit()
+    dataset_id = dataset.id
+
+    # A failed write leaves the dataset on the file it had
+    with unittest.mock.patch("app.modules.dataset.routes.get_storage") as get_storage:
+        get_storage.return_value.open_write.side_effect = OSError("disk full")
+        assert regenerate_csv_for_dataset(dataset_id) is False
+    assert db.session.get(MaterialsDataset, dataset_id).csv_file_path == "upload.csv.gz"
+    assert not FileDeletion.query.filter_by(key="upload.csv.gz").count()
+
+    assert regenerate_csv_for_dataset(dataset_id) is True
+    assert db.session.get(MaterialsDataset, dataset_id).csv_file_path == "upload.csv"
+    assert (tmp_path / "upload.csv").read_text().startswith("record_id,")
+    assert FileDeletion.query.filter_by(key="upload.csv.gz").count() == 1
+
+
 #  ============================================================================
 # Tests for MaterialRecord model methods
 # ============================================================================
@@ -2875,3 +3073,417 @@ def test_dataset_version_service_compare_files_no_changes(test_client):
             os.unlink(csv_path_v1)
         if os.path.exists(csv_path_v2):
             os.unlink(csv_path_v2)
+
+
+# ============================================================================
+# Tests for single-pass CSV ingestion
+# ============================================================================
+
+
+@pytest.mark.unit
+def test_hashing_tee_reader_copies_and_hashes(test_client):
+    """Test HashingTeeReader forwards every byte to the sink and the running hash"""
+    import hashlib
+    import io
+
+    content = b"material_name,property_name,property_value\n" * 5000
+    sink = io.BytesIO()
+    tee = HashingTeeReader(io.BytesIO(content), sink)
+
+    first = tee.read(10)
+    tee.drain()
+
+    assert first == content[:10]
+    assert sink.getvalue() == content
+    assert tee.size == len(content)
+    assert tee.checksum == hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.unit
+def test_materials_dataset_service_ingest_csv_stream(test_client):
+    """Test ingest_csv_stream stores, hashes and parses the upload in one pass"""
+    import hashlib
+    import io
+    import os
+
+    user = User(email="test_ingest_stream@example.com", password="test123")
+    db.session.add(user)
+    db.session.commit()
+
+    metadata = DSMetaData(title="Test", description="Test", publication_type=PublicationType.NONE)
+    db.session.add(metadata)
+    db.session.commit()
+
+    dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=metadata.id)
+    db.session.add(dataset)
+    db.session.commit()
+
+    lines = ["material_name,property_name,property_value,temperature,data_source"]
+    lines += [f"Material{i},density,{i}.5,{300 + i},experimental" for i in range(2500)]
+    lines.append(",density,1.0,,")  # invalid row, skipped
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        destination = os.path.join(temp_dir, "upload.csv")
+        result = MaterialsDatasetService().ingest_csv_stream(dataset, io.BytesIO(content), destination)
+
+        assert result["success"] is True
+        assert result["records_created"] == 2500
+        assert result["checksum"] == hashlib.sha256(content).hexdigest()
+        assert result["size"] == len(content)
+        with open(destination, "rb") as f:
+            assert f.read() == content
+
+    records = MaterialRecord.query.filter_by(materials_dataset_id=dataset.id).all()
+    assert len(records) == 2500
+    assert records[0].data_source == DataSource.EXPERIMENTAL
+
+
+@pytest.mark.unit
+def test_materials_dataset_service_ingest_csv_stream_invalid_columns(test_client):
+    """Test ingest_csv_stream removes the stored file when validation fails"""
+    import io
+    import os
+
+    dataset = MaterialsDataset.query.first()
+    content = b"material_name,property_name\nSilicon,density\n"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        destination = os.path.join(temp_dir, "upload.csv")
+        result = MaterialsDatasetService().ingest_csv_stream(dataset, io.BytesIO(content), destination)
+
+        assert result["success"] is False
+        assert result["records_created"] == 0
+        assert "property_value" in result["error"]
+        assert not os.path.exists(destination)
+
+
+# ============================================================================
+# Tests for compressed CSV uploads
+# ============================================================================
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    import gzip
+
+    import brotli
+    import zstandard
+
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return brotli.compress(data)
+
+
+@pytest.mark.unit
+def test_csv_filename_helpers(test_client):
+    """Test detection of plain and compressed CSV filenames"""
+    assert is_csv_filename("data.csv")
+    assert is_csv_filename("DATA.CSV.GZ")
+    assert is_csv_filename("data.csv.zst")
+    assert is_csv_filename("data.csv.br")
+    assert not is_csv_filename("data.gz")
+    assert not is_csv_filename("data.txt")
+
+    assert get_csv_compression("data.csv") is None
+    assert get_csv_compression("data.csv.gz") == "gzip"
+    assert get_csv_compression("data.csv.zst") == "zstd"
+    assert get_csv_compression("data.csv.br") == "brotli"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("compression,suffix", [("gzip", ".csv.gz"), ("zstd", ".csv.zst"), ("brotli", ".csv.br")])
+def test_ingest_csv_stream_compressed(test_client, compression, suffix):
+    """Test compressed uploads are decompressed on the fly, expanded or kept as received"""
+    import hashlib
+    import io
+    import os
+
+    user = User(email=f"test_ingest_{compression}@example.com", password="test123")
+    db.session.add(user)
+    db.session.commit()
+
+    metadata = DSMetaData(title="Test", description="Test", publication_type=PublicationType.NONE)
+    db.session.add(metadata)
+    db.session.commit()
+
+    dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=metadata.id)
+    db.session.add(dataset)
+    db.session.commit()
+
+    lines = ["material_name,property_name,property_value"] + [f"Material{i},density,{i}" for i in range(3000)]
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+    compressed = _compress(content, compression)
+    service = MaterialsDatasetService()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Expanded to plain CSV on disk
+        expanded_path = os.path.join(temp_dir, "upload.csv")
+        result = service.ingest_csv_stream(dataset, io.BytesIO(compressed), expanded_path, compression=compression)
+
+        assert result["success"] is True
+        assert result["records_created"] == 3000
+        assert result["checksum"] == hashlib.sha256(compressed).hexdigest()
+        with open(expanded_path, "rb") as f:
+            assert f.read() == content
+
+        # Compressed original kept
+        kept_path = os.path.join(temp_dir, "upload" + suffix)
+        result = service.ingest_csv_stream(dataset, io.BytesIO(compressed), kept_path, compression=compression)
+
+        assert result["success"] is True
+        assert result["checksum"] == hashlib.sha256(compressed).hexdigest()
+        assert result["size"] == len(compressed)
+        with open(kept_path, "rb") as f:
+            assert f.read() == compressed
+        with open_csv_file(kept_path) as f:
+            assert f.read().encode("utf-8") == content
+
+    assert MaterialRecord.query.filter_by(materials_dataset_id=dataset.id).count() == 6000
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("compression", ["gzip", "zstd", "brotli"])
+def test_ingest_csv_stream_rejects_decompression_bombs(test_client, compression):
+    """Test compressed uploads expanding past the size or ratio limits are rejected with 413, storing nothing"""
+    import io
+    import os
+
+    dataset = _create_materials_dataset(f"test_ingest_bomb_{compression}@example.com")
+    # Long rows, so the limits are reached after a few thousand records
+    row = b"Bomb,density,1," + b"x" * 2048 + b"\n"
+    content = b"material_name,property_name,property_value,description\n" + row * 10000
+    compressed = _compress(content, compression)
+    assert len(content) > 100 * max(len(compressed), 64 * 1024)
+    service = MaterialsDatasetService()
+    config = test_client.application.config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        destination = os.path.join(temp_dir, "upload.csv")
+        result = service.ingest_csv_stream(dataset, io.BytesIO(compressed), destination, compression=compression)
+        assert result["success"] is False
+        assert result["status_code"] == 413
+        assert "compressed size" in result["error"]
+        assert not os.listdir(temp_dir)
+
+        previous = config["MAX_DECOMPRESSED_CSV_SIZE"], config["MAX_CSV_COMPRESSION_RATIO"]
+        config.update(MAX_DECOMPRESSED_CSV_SIZE=1024 * 1024, MAX_CSV_COMPRESSION_RATIO=0)
+        try:
+            result = service.ingest_csv_stream(dataset, io.BytesIO(compressed), destination, compression=compression)
+        finally:
+            config["MAX_DECOMPRESSED_CSV_SIZE"], config["MAX_CSV_COMPRESSION_RATIO"] = previous
+        assert result["status_code"] == 413
+        assert "larger than 1048576 bytes" in result["error"]
+        assert not os.listdir(temp_dir)
+
+    assert MaterialRecord.query.filter_by(materials_dataset_id=dataset.id).count() == 0
+
+
+@pytest.mark.unit
+def test_brotli_reader_grows_its_step_but_bounds_each_call():
+    """Test Brotli uploads are fed to the decompressor in whole chunks, unless a call's output gets too large"""
+    import io
+
+    import brotli
+
+    from app.modules.dataset.services import BROTLI_OUTPUT_BOUND, CHUNK_SIZE, BrotliDecompressingReader
+
+    def decompress(data):
+        reader = BrotliDecompressingReader(io.BytesIO(data))
+        decompressor = reader.decompressor
+        outputs = []
+
+        class CountingDecompressor:
+            def process(self, chunk):
+                output = decompressor.process(chunk)
+                outputs.append(len(output))
+                return output
+
+            def is_finished(self):
+                return decompressor.is_finished()
+
+        reader.decompressor = CountingDecompressor()
+        return io.BufferedReader(reader, CHUNK_SIZE).read(), outputs
+
+    # A regular CSV: after a few small steps the whole chunks go in one call each
+    lines = ["material_name,property_name,property_value"] + [f"Material{i},density,{i * 0.37}" for i in range(200000)]
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+    compressed = brotli.compress(content, quality=5)
+    result, outputs = decompress(compressed)
+    assert result == content
+    assert len(outputs) <= len(compressed) // CHUNK_SIZE + 32
+
+    # 128 MB of zeros in ~24 KB: one call on the whole chunk would return all of it
+    compressed = brotli.compress(b"\0" * (128 * 1024 * 1024), quality=1)
+    assert len(compressed) < CHUNK_SIZE
+    result, outputs = decompress(compressed)
+    assert len(result) == 128 * 1024 * 1024
+    assert max(outputs) <= 8 * BROTLI_OUTPUT_BOUND
+
+
+@pytest.mark.unit
+def test_materials_dataset_service_get_stored_filename(test_client):
+    """Test compressed uploads are stored as .csv unless KEEP_COMPRESSED_UPLOADS is set"""
+    service = MaterialsDatasetService()
+
+    assert service.get_stored_filename("data.csv") == "data.csv"
+    assert service.get_stored_filename("my data.csv.gz") == "my_data.csv"
+
+    test_client.application.config["KEEP_COMPRESSED_UPLOADS"] = True
+    try:
+        assert service.get_stored_filename("data.csv.zst") == "data.csv.zst"
+    finally:
+        test_client.application.config["KEEP_COMPRESSED_UPLOADS"] = False
+
+
+# ============================================================================
+# Tests for upload de-duplication
+# ============================================================================
+
+
+def _create_materials_dataset(email):
+    user = User(email=email, password="test123")
+    db.session.add(user)
+    db.session.commit()
+
+    metadata = DSMetaData(title="Test", description="Test", publication_type=PublicationType.NONE)
+    db.session.add(metadata)
+    db.session.commit()
+
+    dataset = MaterialsDataset(user_id=user.id, ds_meta_data_id=metadata.id)
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+
+@pytest.mark.unit
+def test_material_record_repository_clone_records(test_client):
+    """Test MaterialRecordRepository.clone_records() copies every record in one statement"""
+    source = _create_materials_dataset("test_clone_records_src@example.com")
+    target = _create_materials_dataset("test_clone_records_dst@example.com")
+
+    db.session.add_all(
+        [
+            MaterialRecord(
+                materials_dataset_id=source.id,
+                material_name="Silicon",
+                property_name="density",
+                property_value="2.33",
+                temperature=300,
+                data_source=DataSource.LITERATURE,
+            ),
+            MaterialRecord(
+                materials_dataset_id=source.id, material_name="Copper", property_name="density", property_value="8.96"
+            ),
+        ]
+    )
+    db.session.commit()
+
+    copied = MaterialRecordRepository().clone_records(source.id, target.id)
+    db.session.commit()
+
+    assert copied == 2
+    cloned = MaterialRecord.query.filter_by(materials_dataset_id=target.id).order_by(MaterialRecord.id).all()
+    assert [r.material_name for r in cloned] == ["Silicon", "Copper"]
+    assert cloned[0].temperature == 300
+    assert cloned[0].data_source == DataSource.LITERATURE
+    assert MaterialRecord.query.filter_by(materials_dataset_id=source.id).count() == 2
+
+
+@pytest.mark.unit
+def test_materials_dataset_service_ingest_csv_upload_deduplicates(test_client):
+    """Test an identical upload with a declared checksum is cloned instead of re-parsed, and shares the file without"""
+    import hashlib
+    import io
+    import os
+
+    first = _create_materials_dataset("test_dedup_first@example.com")
+    second = _create_materials_dataset("test_dedup_second@example.com")
+    service = MaterialsDatasetService()
+
+    content = b"material_name,property_name,property_value\nSilicon,density,2.33\nCopper,density,8.96\n"
+    checksum = hashlib.sha256(content).hexdigest()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first_path = os.path.join(temp_dir, "first.csv")
+        result = service.ingest_csv_upload(first, io.BytesIO(content), first_path, expected_checksum=checksum)
+        assert result["success"] is True
+        assert result["deduplicated"] is False
+        first.csv_file_path = result["csv_file_path"]
+        db.session.commit()
+        assert first.csv_checksum == checksum
+
+        second_path = os.path.join(temp_dir, "second.csv")
+        with unittest.mock.patch.object(service, "ingest_csv_stream") as ingest:
+            result = service.ingest_csv_upload(second, io.BytesIO(content), second_path, expected_checksum=checksum)
+            ingest.assert_not_called()
+
+        assert result["success"] is True
+        assert result["deduplicated"] is True
+        assert result["records_created"] == 2
+        assert result["csv_file_path"] == first_path
+        assert not os.path.exists(second_path)
+        assert second.csv_checksum == checksum
+        assert MaterialRecord.query.filter_by(materials_dataset_id=second.id).count() == 2
+        second.csv_file_path = result["csv_file_path"]
+        db.session.commit()
+
+        # Retrying the same upload on a dataset that already has it does not insert anything again
+        result = service.ingest_csv_upload(second, io.BytesIO(content), second_path, expected_checksum=checksum)
+        assert result["deduplicated"] is True
+        assert MaterialRecord.query.filter_by(materials_dataset_id=second.id).count() == 2
+
+        # Without a declared checksum the upload is parsed, but the checksum computed meanwhile
+        # still finds the identical file, which is shared instead of stored again
+        third = _create_materials_dataset("test_dedup_third@example.com")
+        third_path = os.path.join(temp_dir, "third.csv")
+        result = service.ingest_csv_upload(third, io.BytesIO(content), third_path)
+        assert result["success"] is True
+        assert result["deduplicated"] is True
+        assert result["records_created"] == 2
+        assert result["csv_file_path"] == first_path
+        assert not os.path.exists(third_path)
+        assert third.csv_checksum == checksum
+        assert MaterialRecord.query.filter_by(materials_dataset_id=third.id).count() == 2
+
+        result = service.ingest_csv_upload(second, io.BytesIO(content), os.path.join(temp_dir, "retry.csv"))
+        assert result["deduplicated"] is True
+        assert result["records_created"] == 2
+        assert MaterialRecord.query.filter_by(materials_dataset_id=second.id).count() == 2
+        assert sorted(os.listdir(temp_dir)) == ["first.csv"]
+
+
+@pytest.mark.unit
+def test_materials_dataset_service_ingest_csv_upload_checksum_mismatch(test_client):
+    """Test a declared checksum that does not match the upload is rejected"""
+    import hashlib
+    import io
+
+    dataset = _create_materials_dataset("test_dedup_mismatch@example.com")
+    content = b"material_name,property_name,property_value\nSilicon,density,2.33\n"
+
+    result = MaterialsDatasetService().ingest_csv_upload(
+        dataset, io.BytesIO(content), expected_checksum=hashlib.sha256(b"something else").hexdigest()
+    )
+
+    assert result["success"] is False
+    assert "Checksum mismatch" in result["error"]
+    assert MaterialRecord.query.filter_by(materials_dataset_id=dataset.id).count() == 0
+
+
+@pytest.mark.unit
+def test_materials_dataset_repository_is_csv_file_shared(test_client):
+    """Test detection of CSV files shared between de-duplicated datasets"""
+    first = _create_materials_dataset("test_shared_first@example.com")
+    second = _create_materials_dataset("test_shared_second@example.com")
+    repository = MaterialsDatasetRepository()
+
+    first.csv_file_path = "/tmp/shared_upload_test.csv"
+    second.csv_file_path = "/tmp/other_upload_test.csv"
+    db.session.commit()
+    assert repository.is_csv_file_shared(first) is False
+
+    second.csv_file_path = first.csv_file_path
+    db.session.commit()
+    assert repository.is_csv_file_shared(first) is True
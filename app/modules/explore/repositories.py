@@ -1,23 +1,54 @@
 import re
 
 import unidecode
-from sqlalchemy import or_
+from sqlalchemy import String, cast, func, literal, or_, select, union_all
 
-from app.modules.dataset.models import Author, DSMetaData, MaterialRecord, MaterialsDataset, PublicationType
+from app.modules.dataset.formulas import parse_element_symbols
+from app.modules.dataset.models import (
+    ORCID_PATTERN,
+    Author,
+    DSMetaData,
+    MaterialRecord,
+    MaterialsDataset,
+    PublicationType,
+    Tag,
+    author_identity_key,
+    dataset_tag,
+    parse_tags,
+)
+from app.modules.dataset.repositories import MaterialRecordRepository
 from core.repositories.BaseRepository import BaseRepository
 
 
 class ExploreRepository(BaseRepository):
     def __init__(self):
-        super().__init__(MaterialsDataset)
+        super().__init__(MaterialsDataset, read_replica=True)
 
-    def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
+    def _query(
+        self,
+        query="",
+        publication_type="any",
+        tags=[],
+        tag_mode="any",
+        elements=[],
+        exclude_elements=[],
+        element_count=None,
+    ):
+        """
+        Datasets matching the explore criteria, unsorted. ``elements``, ``exclude_elements`` and
+        ``element_count`` keep the datasets with a record of that composition; unknown element
+        symbols raise ValueError.
+        """
         # Normalize and remove unwanted characters
         normalized_query = unidecode.unidecode(query).lower()
         cleaned_query = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", normalized_query)
 
         filters = []
         for word in cleaned_query.split():
+            if ORCID_PATTERN.fullmatch(word.upper()):
+                # An ORCID iD names one person: an indexed lookup of the author identity
+                filters.append(Author.identity_key == author_identity_key(None, word))
+                continue
             filters.append(DSMetaData.title.ilike(f"%{word}%"))
             filters.append(DSMetaData.description.ilike(f"%{word}%"))
             filters.append(Author.name.ilike(f"%{word}%"))
@@ -47,9 +78,45 @@ class ExploreRepository(BaseRepository):
             if matching_type is not None:
                 datasets = datasets.filter(DSMetaData.publication_type == matching_type.name)
 
-        if tags:
-            tag_filters = [DSMetaData.tags.ilike(f"%{tag}%") for tag in tags]
-            datasets = datasets.filter(or_(*tag_filters))
+        names = parse_tags(",".join(tags))
+        if names:
+            # Exact tag names through the (tag_id, ds_meta_data_id) index: any of them, or all of them
+            tagged = (
+                select(dataset_tag.c.ds_meta_data_id)
+                .join(Tag, Tag.id == dataset_tag.c.tag_id)
+                .where(Tag.name.in_(names))
+            )
+            if tag_mode == "all":
+                tagged = tagged.group_by(dataset_tag.c.ds_meta_data_id).having(func.count() == len(names))
+            datasets = datasets.filter(MaterialsDataset.ds_meta_data_id.in_(tagged))
+
+        elements = parse_element_symbols(elements)
+        exclude_elements = parse_element_symbols(exclude_elements)
+        if element_count in ("", None):
+            element_count = None
+        if elements or exclude_elements or element_count is not None:
+            # Records of that composition through the GIN index on their elements, then their datasets
+            composition = MaterialRecordRepository().composition_filters(
+                elements, exclude_elements, int(element_count) if element_count is not None else None
+            )
+            with_composition = select(MaterialRecord.materials_dataset_id).where(*composition)
+            datasets = datasets.filter(MaterialsDataset.id.in_(with_composition))
+
+        return datasets
+
+    def filter(
+        self,
+        query="",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        tag_mode="any",
+        elements=[],
+        exclude_elements=[],
+        element_count=None,
+        **kwargs,
+    ):
+        datasets = self._query(query, publication_type, tags, tag_mode, elements, exclude_elements, element_count)
 
         # Order by created_at
         if sorting == "oldest":
@@ -57,4 +124,52 @@ class ExploreRepository(BaseRepository):
         else:
             datasets = datasets.order_by(self.model.created_at.desc())
 
-        return datasets.all()
+        with self.reading():
+            return datasets.all()
+
+    def facets(
+        self,
+        query="",
+        publication_type="any",
+        tags=[],
+        tag_mode="any",
+        elements=[],
+        exclude_elements=[],
+        element_count=None,
+        **kwargs,
+    ) -> dict:
+        """
+        Tag and publication type counts of the datasets matching the explore criteria, most
+        frequent first. Both come from one statement grouping the matching metadata ids.
+        """
+        matching = self._query(
+            query, publication_type, tags, tag_mode, elements, exclude_elements, element_count
+        ).with_entities(MaterialsDataset.ds_meta_data_id)
+        matching = select(matching.subquery().c.ds_meta_data_id)
+
+        tag_counts = (
+            select(literal("tag").label("facet"), Tag.name.label("value"), func.count().label("count"))
+            .select_from(dataset_tag.join(Tag, Tag.id == dataset_tag.c.tag_id))
+            .where(dataset_tag.c.ds_meta_data_id.in_(matching))
+            .group_by(Tag.name)
+        )
+        type_counts = (
+            select(
+                literal("publication_type").label("facet"),
+                cast(DSMetaData.publication_type, String).label("value"),
+                func.count().label("count"),
+            )
+            .where(DSMetaData.id.in_(matching))
+            .group_by(DSMetaData.publication_type)
+        )
+
+        with self.reading():
+            rows = self.session.execute(union_all(tag_counts, type_counts)).all()
+
+        facets = {"tags": [], "publication_types": []}
+        for facet, value, count in sorted(rows, key=lambda row: (-row.count, row.value)):
+            if facet == "tag":
+                facets["tags"].append({"name": value, "count": count})
+            else:
+                facets["publication_types"].append({"value": PublicationType[value].value, "count": count})
+        return facets
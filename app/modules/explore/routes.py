@@ -14,5 +14,18 @@ def index():
 
     if request.method == "POST":
         criteria = request.get_json()
-        datasets = ExploreService().filter(**criteria)
+        try:
+            datasets = ExploreService().filter(**criteria)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
         return jsonify([dataset.to_dict() for dataset in datasets])
+
+
+@explore_bp.route("/explore/facets", methods=["POST"])
+def facets():
+    """Tag and publication type counts for the criteria of an explore search"""
+    criteria = request.get_json(silent=True) or {}
+    try:
+        return jsonify(ExploreService().facets(**criteria))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
@@ -6,5 +6,8 @@ class ExploreService(BaseService):
     def __init__(self):
         super().__init__(ExploreRepository())
 
-    def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
-        return self.repository.filter(query, sorting, publication_type, tags, **kwargs)
+    def filter(self, query="", sorting="newest", publication_type="any", tags=[], tag_mode="any", **kwargs):
+        return self.repository.filter(query, sorting, publication_type, tags, tag_mode, **kwargs)
+
+    def facets(self, query="", publication_type="any", tags=[], tag_mode="any", **kwargs):
+        return self.repository.facets(query, publication_type, tags, tag_mode, **kwargs)
@@ -287,3 +287,61 @@ def test_explore_dataset_metadata_in_results(test_client, integration_test_data)
             dataset = results[0]
             assert hasattr(dataset, "ds_meta_data")
             assert dataset.ds_meta_data is not None
+
+
+@pytest.mark.integration
+def test_explore_tag_filters_and_facets(test_client, integration_test_data):
+    """Test exact tag matching (any / all) through dataset_tag and the facet counts of a search."""
+    with test_client.application.app_context():
+        service = ExploreService()
+        published = service.filter(query="")
+        with_patterns = service.filter(query="", tags=["Patterns "])
+        assert with_patterns and all("patterns" in ds.ds_meta_data.tags for ds in with_patterns)
+
+        # Whole tag names only: "pattern" used to match "patterns" with ILIKE
+        assert service.filter(query="", tags=["pattern"]) == []
+
+        either = service.filter(query="", tags=["machine learning", "design"])
+        both = service.filter(query="", tags=["machine learning", "design"], tag_mode="all")
+        assert {ds.ds_meta_data.title for ds in either} == {"Machine Learning Dataset", "Software Patterns Dataset"}
+        assert both == []
+        assert service.filter(query="", tags=["patterns", "software"], tag_mode="all") == with_patterns
+
+    response = test_client.post("/explore/facets", json={"query": ""})
+    assert response.status_code == 200
+    tags = {facet["name"]: facet["count"] for facet in response.json["tags"]}
+    assert tags["patterns"] == len(with_patterns)
+    assert "unsynchronized" not in tags  # its dataset has no DOI, so explore never lists it
+    assert sum(facet["count"] for facet in response.json["publication_types"]) == len(published)
+
+    response = test_client.post("/explore/facets", json={"query": "", "tags": ["design"]})
+    assert {facet["name"] for facet in response.json["tags"]} == {"patterns", "design", "software"}
+    assert response.json["publication_types"] == [{"value": "article", "count": 1}]
+
+
+def test_explore_composition_filters(test_client, integration_test_data):
+    """Test the element filters of explore, and the cross-dataset composition search of the API."""
+    with test_client.application.app_context():
+        service = ExploreService()
+
+        def titles(**criteria):
+            return {ds.ds_meta_data.title for ds in service.filter(query="", **criteria)}
+
+        # Graphene "C" and Silicon "Si" in the ML dataset, Steel Alloy "Fe-C" in the patterns one
+        assert titles(elements=["C"]) == {"Machine Learning Dataset", "Software Patterns Dataset"}
+        assert titles(elements=["c"], exclude_elements="Fe") == {"Machine Learning Dataset"}
+        assert titles(elements=["Fe", "C"]) == titles(element_count=2) == {"Software Patterns Dataset"}
+        assert titles(elements=["Pb"]) == set()
+
+    response = test_client.post("/explore", json={"query": "", "elements": ["Fe", "Unobtainium"]})
+    assert response.status_code == 400
+    assert "Unobtainium" in response.json["message"]
+
+    response = test_client.get("/api/v1/material-records/composition?elements=Fe&exclude=Pb&element_count=2")
+    assert response.status_code == 200
+    assert response.json["total"] == 1
+    assert response.json["records"][0]["chemical_formula"] == "Fe-C"
+    assert response.json["records"][0]["composition"] == {"Fe": 1, "C": 1}
+
+    assert test_client.get("/api/v1/material-records/composition").status_code == 400
+    assert test_client.get("/api/v1/material-records/composition?elements=Xx").status_code == 400
@@ -449,3 +449,30 @@ def test_explore_repository_filter_with_special_characters(test_client):
 
     # Should still find the dataset
     assert len(results) >= 0  # May or may not find depending on other datasets
+
+
+@pytest.mark.unit
+def test_dataset_tags_follow_the_tags_string(test_client):
+    """Test that dataset_tag rows are written on create and rewritten when the tags string changes."""
+    from app.modules.dataset.models import Tag, dataset_tag
+
+    metadata = DSMetaData(
+        title="Tag Sync",
+        description="Test",
+        publication_type=PublicationType.NONE,
+        tags=" Thin  Films, oxides,thin films,, ",
+    )
+    db.session.add(metadata)
+    db.session.commit()
+    assert sorted(tag.name for tag in metadata.tag_list) == ["oxides", "thin films"]
+
+    metadata.tags = "oxides, perovskites"
+    db.session.commit()
+    db.session.expire_all()
+    assert sorted(tag.name for tag in metadata.tag_list) == ["oxides", "perovskites"]
+    assert Tag.query.filter_by(name="oxides").count() == 1
+
+    db.session.delete(metadata)
+    db.session.commit()
+    remaining = db.session.execute(db.select(dataset_tag).filter_by(ds_meta_data_id=metadata.id)).all()
+    assert remaining == []
@@ -2,22 +2,24 @@ import logging
 import os
 import tempfile
 
-from antlr4 import CommonTokenStream, FileStream
-from antlr4.error.ErrorListener import ErrorListener
-from flamapy.metamodels.fm_metamodel.transformations import GlencoeWriter, SPLOTWriter, UVLReader
-from flamapy.metamodels.pysat_metamodel.transformations import DimacsWriter, FmToPysat
 from flask import jsonify, send_file
-from uvl.UVLCustomLexer import UVLCustomLexer
-from uvl.UVLPythonParser import UVLPythonParser
 
 from app.modules.flamapy import flamapy_bp
 from app.modules.hubfile.services import HubfileService
 
 logger = logging.getLogger(__name__)
 
+# antlr4, uvl and flamapy (with pysat) are imported inside the views that use them,
+# so registering this module does not slow down the start-up of every worker
+
 
 @flamapy_bp.route("/flamapy/check_uvl/<int:file_id>", methods=["GET"])
 def check_uvl(file_id):
+    from antlr4 import CommonTokenStream, FileStream
+    from antlr4.error.ErrorListener import ErrorListener
+    from uvl.UVLCustomLexer import UVLCustomLexer
+    from uvl.UVLPythonParser import UVLPythonParser
+
     class CustomErrorListener(ErrorListener):
         def __init__(self):
             self.errors = []
@@ -72,6 +74,8 @@ def valid(file_id):
 
 @flamapy_bp.route("/flamapy/to_glencoe/<int:file_id>", methods=["GET"])
 def to_glencoe(file_id):
+    from flamapy.metamodels.fm_metamodel.transformations import GlencoeWriter, UVLReader
+
     temp_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
     try:
         hubfile = HubfileService().get_or_404(file_id)
@@ -87,6 +91,8 @@ def to_glencoe(file_id):
 
 @flamapy_bp.route("/flamapy/to_splot/<int:file_id>", methods=["GET"])
 def to_splot(file_id):
+    from flamapy.metamodels.fm_metamodel.transformations import SPLOTWriter, UVLReader
+
     temp_file = tempfile.NamedTemporaryFile(suffix=".splx", delete=False)
     try:
         hubfile = HubfileService().get_by_id(file_id)
@@ -102,6 +108,9 @@ def to_splot(file_id):
 
 @flamapy_bp.route("/flamapy/to_cnf/<int:file_id>", methods=["GET"])
 def to_cnf(file_id):
+    from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+    from flamapy.metamodels.pysat_metamodel.transformations import DimacsWriter, FmToPysat
+
     temp_file = tempfile.NamedTemporaryFile(suffix=".cnf", delete=False)
     try:
         hubfile = HubfileService().get_by_id(file_id)
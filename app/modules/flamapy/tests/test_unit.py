@@ -58,3 +58,18 @@ def test_flamapy_service_initialization():
     service = FlamapyService()
     assert service is not None
     assert isinstance(service.repository, FlamapyRepository)
+
+
+@pytest.mark.unit
+def test_flamapy_routes_import_without_heavy_dependencies():
+    """Test that registering the module does not import flamapy, antlr4 or uvl"""
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; import app.modules.flamapy.routes; "
+        "print(sorted(m for m in ('flamapy', 'antlr4', 'uvl', 'pysat') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "[]"
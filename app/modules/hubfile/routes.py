@@ -1,24 +1,21 @@
-import os
 import uuid
 from datetime import datetime, timezone
 
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import jsonify, make_response, request
 from flask_login import current_user
 
 from app import db
 from app.modules.hubfile import hubfile_bp
 from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
 from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from core.storage.storage import get_storage, send_stored_file
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
 def download_file(file_id):
-    file = HubfileService().get_or_404(file_id)
-    filename = file.name
-
-    directory_path = f"uploads/user_{file.feature_model.data_set.user_id}/dataset_{file.feature_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path)
+    hubfile_service = HubfileService()
+    file = hubfile_service.get_or_404(file_id)
+    file_key = hubfile_service.get_storage_key_by_hubfile(file)
 
     # Get the cookie from the request or generate a new one if it does not exist
     user_cookie = request.cookies.get("file_download_cookie")
@@ -40,7 +37,7 @@ def download_file(file_id):
         )
 
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
+    resp = make_response(send_stored_file(file_key, download_name=file.name))
     resp.set_cookie("file_download_cookie", user_cookie)
 
     return resp
@@ -48,17 +45,15 @@ def download_file(file_id):
 
 @hubfile_bp.route("/file/view/<int:file_id>", methods=["GET"])
 def view_file(file_id):
-    file = HubfileService().get_or_404(file_id)
-    filename = file.name
-
-    directory_path = f"uploads/user_{file.feature_model.data_set.user_id}/dataset_{file.feature_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path, filename)
+    hubfile_service = HubfileService()
+    file = hubfile_service.get_or_404(file_id)
+    file_key = hubfile_service.get_storage_key_by_hubfile(file)
 
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                content = f.read()
+        storage = get_storage()
+        if storage.exists(file_key):
+            with storage.open_read(file_key) as f:
+                content = f.read().decode("utf-8")
 
             user_cookie = request.cookies.get("view_cookie")
             if not user_cookie:
@@ -36,6 +36,18 @@ class HubfileService(BaseService):
 
         return path
 
+    def get_storage_key_by_hubfile(self, hubfile: Hubfile) -> str:
+        from core.configuration.configuration import uploads_folder_name
+
+        return "/".join(
+            [
+                uploads_folder_name(),
+                f"user_{hubfile.feature_model.data_set.user_id}",
+                f"dataset_{hubfile.feature_model.data_set_id}",
+                hubfile.name,
+            ]
+        )
+
     def total_hubfile_views(self) -> int:
         return self.hubfile_view_record_repository.total_hubfile_views()
 
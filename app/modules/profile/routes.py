@@ -4,6 +4,7 @@ from flask_login import current_user, login_required
 from app import db
 from app.modules.auth.services import AuthenticationService
 from app.modules.dataset.models import MaterialsDataset
+from app.modules.dataset.repositories import MaterialsDatasetRepository
 from app.modules.profile import profile_bp
 from app.modules.profile.forms import UserProfileForm
 from app.modules.profile.services import UserProfileService
@@ -36,6 +37,7 @@ def my_profile():
 
     user_datasets_pagination = (
         db.session.query(MaterialsDataset)
+        .options(*MaterialsDatasetRepository.listing_options())
         .filter(MaterialsDataset.user_id == current_user.id)
         .order_by(MaterialsDataset.created_at.desc())
         .paginate(page=page, per_page=per_page, error_out=False)
@@ -1,13 +1,15 @@
 import logging
 
-from flask import render_template
+from flask import jsonify, render_template
 
 from app.modules.dataset.repositories import (
     DSDownloadRecordRepository,
     DSViewRecordRepository,
+    MaterialRecordRepository,
     MaterialsDatasetRepository,
 )
 from app.modules.public import public_bp
+from core.database.database import get_pool_statistics, replica_reads
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +21,21 @@ def index():
     download_repository = DSDownloadRecordRepository()
     view_repository = DSViewRecordRepository()
 
-    # Statistics: materials datasets
-    datasets_counter = materials_dataset_repository.count_synchronized()
-    latest_materials_datasets = materials_dataset_repository.get_synchronized_latest(limit=5)
+    # Statistics are read from the replica, if there is one
+    with replica_reads():
+        # Statistics: materials datasets
+        datasets_counter = materials_dataset_repository.count_synchronized()
+        latest_materials_datasets = materials_dataset_repository.get_synchronized_latest(limit=5)
+        listing_stats = MaterialRecordRepository().get_listing_stats(d.id for d in latest_materials_datasets)
 
-    # Statistics: total downloads and views
-    total_dataset_downloads = download_repository.count()
-    total_dataset_views = view_repository.count()
+        # Statistics: total downloads and views
+        total_dataset_downloads = download_repository.count()
+        total_dataset_views = view_repository.count()
 
     return render_template(
         "public/index.html",
         latest_materials_datasets=latest_materials_datasets,
+        listing_stats=listing_stats,
         datasets_counter=datasets_counter,
         materials_datasets_counter=datasets_counter,
         feature_models_counter=0,
@@ -38,3 +44,9 @@ def index():
         total_feature_model_views=0,
         total_feature_model_downloads=0,
     )
+
+
+@public_bp.route("/status/database", methods=["GET"])
+def database_status():
+    """Connection pool usage of the worker that serves the request"""
+    return jsonify({"pools": get_pool_statistics()})
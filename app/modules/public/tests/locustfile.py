@@ -7,6 +7,16 @@ Usage:
 
 from locust import HttpUser, TaskSet, between, task
 
+# Objectives checked by `rosemary locust --gate`: latency percentiles in ms, error rate as a fraction
+SLOS = {
+    "/": {"p50": 100, "p95": 400, "p99": 800, "error_rate": 0.01},
+    "/explore": {"p50": 150, "p95": 600, "p99": 1200, "error_rate": 0.01},
+    "/explore?query=[q]": {"p50": 200, "p95": 800, "p99": 1500, "error_rate": 0.01},
+    "/materials/[id]": {"p50": 200, "p95": 800, "p99": 1500, "error_rate": 0.01},
+    "/login": {"p95": 300, "error_rate": 0.01},
+    "/signup": {"p95": 300, "error_rate": 0.01},
+}
+
 
 class PublicUserBehavior(TaskSet):
     """
@@ -28,14 +38,14 @@ class PublicUserBehavior(TaskSet):
         """Search for datasets with various queries"""
         queries = ["machine learning", "data science", "materials", "test"]
         for query in queries:
-            self.client.get(f"/explore?query={query}")
+            self.client.get(f"/explore?query={query}", name="/explore?query=[q]")
 
     @task(1)
     def view_dataset_detail(self):
         """View a specific dataset detail page"""
         # Assuming dataset IDs start from 1
         dataset_id = 1
-        self.client.get(f"/dataset/view/{dataset_id}")
+        self.client.get(f"/materials/{dataset_id}", name="/materials/[id]")
 
     @task(1)
     def view_signup_page(self):
@@ -85,4 +95,4 @@ class StressTestUser(HttpUser):
     @task(3)
     def rapid_search_requests(self):
         """Make rapid search requests"""
-        self.client.get("/explore?query=test")
+        self.client.get("/explore?query=test", name="/explore?query=[q]")
@@ -105,3 +105,29 @@ def test_index_page_multiple_requests(test_client):
     for i in range(3):
         response = test_client.get("/")
         assert response.status_code == 200
+
+
+@pytest.mark.integration
+def test_database_status_reports_pool_usage(test_client):
+    """Test that the database status endpoint reports the primary connection pool."""
+    response = test_client.get("/status/database")
+    assert response.status_code == 200
+
+    primary = response.json["pools"]["primary"]
+    assert primary["size"] == test_client.application.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"]
+    assert primary["checked_out"] >= 0
+
+
+@pytest.mark.integration
+def test_metrics_endpoint_exposes_request_metrics(test_client):
+    """Test that /metrics reports the requests served so far in the Prometheus text format."""
+    test_client.get("/")
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+
+    body = response.get_data(as_text=True)
+    assert 'materialshub_http_request_duration_seconds_bucket{endpoint="public.index"' in body
+    assert "materialshub_http_request_db_queries" in body
+    assert "materialshub_db_pool_connections" in body
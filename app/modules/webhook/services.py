@@ -10,8 +10,23 @@ from core.services.BaseService import BaseService
 
 DISABLE_WEBHOOK = os.getenv("DISABLE_WEBHOOK", "false").lower() == "true"
 
+
+class _LazyDockerClient:
+    """Connects to the Docker daemon on first use, so importing this module works without one"""
+
+    _client = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            # Introspection (e.g. by unittest.mock) must not open a connection
+            raise AttributeError(name)
+        if _LazyDockerClient._client is None:
+            _LazyDockerClient._client = docker.from_env()
+        return getattr(_LazyDockerClient._client, name)
+
+
 if not DISABLE_WEBHOOK:
-    client = docker.from_env()
+    client = _LazyDockerClient()
 
 
 class WebhookService(BaseService):
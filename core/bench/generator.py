@@ -0,0 +1,119 @@
+import csv
+import io
+import math
+import random
+from typing import Iterator
+
+CSV_COLUMNS = [
+    "material_name",
+    "chemical_formula",
+    "structure_type",
+    "composition_method",
+    "property_name",
+    "property_value",
+    "property_unit",
+    "temperature",
+    "pressure",
+    "data_source",
+    "uncertainty",
+    "description",
+]
+
+DISTRIBUTIONS = ("uniform", "normal", "lognormal")
+
+ELEMENTS = ["Al", "B", "C", "Ca", "Co", "Cr", "Cu", "Fe", "Ga", "Mg", "Mn", "Mo", "N", "Ni", "O", "Si", "Ti", "W", "Zn"]
+STRUCTURE_TYPES = ["Cubic", "Hexagonal", "Tetragonal", "Orthorhombic", "Monoclinic", "Amorphous"]
+COMPOSITION_METHODS = ["Sintering", "CVD", "Sol-gel", "Arc melting", "Ball milling", "DFT"]
+DATA_SOURCES = ["experimental", "computational", "literature", "database"]
+UNITS = ["GPa", "W/mK", "eV", "g/cm3", "K", "MPa", "S/m", "%"]
+
+# Dataset tags used by the benchmark catalogue and the bulk seeder
+TAG_VOCABULARY = [
+    "ceramics",
+    "alloys",
+    "semiconductors",
+    "polymers",
+    "composites",
+    "oxides",
+    "nitrides",
+    "carbides",
+    "thermal",
+    "mechanical",
+    "electronic",
+    "optical",
+    "magnetic",
+    "dft",
+    "experimental",
+    "high-entropy",
+]
+
+
+def _formula(rng: random.Random) -> str:
+    elements = rng.sample(ELEMENTS, rng.randint(1, 3))
+    return "".join(f"{element}{rng.choice(['', '2', '3'])}" for element in elements)
+
+
+class MaterialsCsvGenerator:
+    """
+    Synthetic materials CSVs for benchmarks.
+
+    ``materials`` distinct materials each get measurements of ``properties`` distinct
+    properties; every property has its own typical magnitude and the values are drawn
+    around it from the chosen ``distribution``. The same seed always yields the same file.
+    """
+
+    def __init__(self, materials: int = 100, properties: int = 10, distribution: str = "lognormal", seed: int = 0):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}', expected one of {', '.join(DISTRIBUTIONS)}")
+        self.materials = max(materials, 1)
+        self.properties = max(properties, 1)
+        self.distribution = distribution
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self.material_catalogue = [
+            (f"Material-{i:05d}", _formula(rng), rng.choice(STRUCTURE_TYPES), rng.choice(COMPOSITION_METHODS))
+            for i in range(self.materials)
+        ]
+        self.property_catalogue = [
+            (f"property_{i:03d}", rng.choice(UNITS), 10 ** rng.uniform(-1, 4)) for i in range(self.properties)
+        ]
+
+    def _value(self, rng: random.Random, magnitude: float) -> float:
+        if self.distribution == "uniform":
+            return rng.uniform(0, 2 * magnitude)
+        if self.distribution == "normal":
+            return rng.gauss(magnitude, magnitude * 0.15)
+        return magnitude * math.exp(rng.gauss(0, 0.5))
+
+    def rows(self, count: int) -> Iterator[dict]:
+        rng = random.Random(self.seed + count)
+        for i in range(count):
+            material_name, formula, structure_type, method = self.material_catalogue[i % self.materials]
+            property_name, unit, magnitude = self.property_catalogue[(i // self.materials) % self.properties]
+            value = self._value(rng, magnitude)
+            yield {
+                "material_name": material_name,
+                "chemical_formula": formula,
+                "structure_type": structure_type,
+                "composition_method": method,
+                "property_name": property_name,
+                "property_value": f"{value:.6g}",
+                "property_unit": unit,
+                "temperature": rng.choice(["", str(rng.randint(4, 1500))]),
+                "pressure": rng.choice(["", "101325"]),
+                "data_source": rng.choice(DATA_SOURCES),
+                "uncertainty": str(rng.randint(0, 5)),
+                "description": f"Synthetic measurement {i}",
+            }
+
+    def write(self, stream, count: int):
+        """Writes a CSV with ``count`` rows to a text stream"""
+        writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.rows(count))
+
+    def to_bytes(self, count: int) -> bytes:
+        buffer = io.StringIO(newline="")
+        self.write(buffer, count)
+        return buffer.getvalue().encode("utf-8")
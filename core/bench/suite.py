@@ -0,0 +1,290 @@
+import io
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from core.bench.generator import TAG_VOCABULARY, MaterialsCsvGenerator
+
+BENCHMARKS = [
+    "parse_csv_file",
+    "create_material_records_from_csv",
+    "regenerate_csv_for_dataset",
+    "compare_files",
+    "get_csv_diff",
+    "explore_filter",
+    "get_recommendations",
+]
+
+# Rows per dataset of the catalogue that explore_filter and get_recommendations search
+CATALOGUE_DATASET_ROWS = 100
+
+
+def summarise_runs(runs: List[float]) -> dict:
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "mean": statistics.fmean(runs),
+        "runs": runs,
+    }
+
+
+def time_runs(run: Callable, repeat: int, setup: Callable = None) -> dict:
+    """Times ``run(setup())`` ``repeat`` times; the setup is not part of the measurement"""
+    runs = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(argument)
+        runs.append(time.perf_counter() - start)
+    return summarise_runs(runs)
+
+
+class BenchmarkSuite:
+    """
+    Times the dataset hot paths on synthetic data, at several scales (rows per CSV).
+
+    Everything the suite creates (a user, datasets, versions and stored files) is
+    removed by ``cleanup()``. Run it against a database without real traffic, since
+    explore_filter and get_recommendations also see the datasets already there.
+    """
+
+    def __init__(self, generator: MaterialsCsvGenerator, repeat: int = 3, echo: Callable = None):
+        from app.modules.dataset.routes import create_version_snapshot, regenerate_csv_for_dataset
+        from app.modules.dataset.services import DatasetVersionService, MaterialsDatasetService
+        from app.modules.explore.repositories import ExploreRepository
+        from core.configuration.configuration import uploads_folder_name
+        from core.storage.storage import get_storage
+
+        self.generator = generator
+        self.repeat = repeat
+        self.echo = echo or (lambda message: None)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.prefix = f"{uploads_folder_name()}/bench/{self.run_id}"
+        self.storage = get_storage()
+        self.materials_dataset_service = MaterialsDatasetService()
+        self.dataset_version_service = DatasetVersionService()
+        self.explore_repository = ExploreRepository()
+        self.regenerate_csv_for_dataset = regenerate_csv_for_dataset
+        self.create_version_snapshot = create_version_snapshot
+
+        self.user = None
+        self.dataset_ids = []
+        self.storage_keys = []
+
+    # Fixtures
+
+    def _get_user(self):
+        from app import db
+        from app.modules.auth.models import User
+
+        if self.user is None:
+            self.user = User(email=f"bench-{self.run_id}@materialshub.local", password=uuid.uuid4().hex)
+            db.session.add(self.user)
+            db.session.commit()
+        return self.user
+
+    def _create_dataset(self, title: str, tags: str = "", doi: str = None):
+        from app import db
+        from app.modules.dataset.models import Author, DSMetaData, MaterialsDataset, PublicationType
+
+        meta_data = DSMetaData(
+            title=title[:120],
+            description=f"Benchmark dataset {title}",
+            publication_type=PublicationType.JOURNAL_ARTICLE,
+            dataset_doi=doi,
+            tags=tags,
+        )
+        db.session.add(meta_data)
+        db.session.flush()
+        db.session.add(Author(name="Bench Author", affiliation="MaterialsHub", ds_meta_data_id=meta_data.id))
+        dataset = MaterialsDataset(user_id=self._get_user().id, ds_meta_data_id=meta_data.id)
+        db.session.add(dataset)
+        db.session.commit()
+        self.dataset_ids.append(dataset.id)
+        return dataset
+
+    def _store_csv(self, rows: int) -> str:
+        key = f"{self.prefix}/materials_{rows}.csv"
+        if key not in self.storage_keys:
+            with self.storage.open_write(key) as stored:
+                text_stream = io.TextIOWrapper(stored, encoding="utf-8", newline="", write_through=True)
+                self.generator.write(text_stream, rows)
+                text_stream.detach()
+            self.storage_keys.append(key)
+        return key
+
+    def _ingested_dataset(self, rows: int):
+        dataset = self._create_dataset(f"bench {self.run_id} {rows} rows")
+        with self.storage.open_read(self._store_csv(rows)) as source:
+            dataset.csv_file_path = f"{self.prefix}/dataset_{dataset.id}.csv"
+            self.materials_dataset_service.ingest_csv_stream(dataset, source, destination_key=dataset.csv_file_path)
+        return dataset
+
+    def _versioned_dataset(self, rows: int):
+        """Dataset with two versions, ~5% of the records modified, 2% deleted and 2% added in between"""
+        from app import db
+        from app.modules.dataset.models import DataSource, MaterialRecord
+
+        dataset = self._ingested_dataset(rows)
+        first = self.create_version_snapshot(dataset.id, self._get_user().id, "Benchmark base version")
+
+        records = MaterialRecord.query.filter_by(materials_dataset_id=dataset.id).order_by(MaterialRecord.id).all()
+        for record in records[::20]:
+            record.property_value = f"{float(record.property_value) * 1.01:.6g}"
+        for record in records[7::50]:
+            db.session.delete(record)
+        for row in list(self.generator.rows(max(rows // 50, 1))):
+            row["data_source"] = DataSource[row["data_source"].upper()]
+            row["temperature"] = int(row["temperature"]) if row["temperature"] else None
+            row["pressure"] = int(row["pressure"]) if row["pressure"] else None
+            db.session.add(MaterialRecord(materials_dataset_id=dataset.id, **row))
+        db.session.commit()
+
+        self.regenerate_csv_for_dataset(dataset.id)
+        second = self.create_version_snapshot(dataset.id, self._get_user().id, "Benchmark modified version")
+        return first, second
+
+    def _catalogue(self, rows: int):
+        """About ``rows`` records spread over datasets of CATALOGUE_DATASET_ROWS rows, tagged and with DOIs"""
+        datasets = []
+        data = self.generator.to_bytes(CATALOGUE_DATASET_ROWS)
+        for i in range(max(rows // CATALOGUE_DATASET_ROWS, 10)):
+            tags = ", ".join(TAG_VOCABULARY[(i + offset * 5) % len(TAG_VOCABULARY)] for offset in range(3))
+            dataset = self._create_dataset(
+                f"bench {self.run_id} catalogue {i}", tags=tags, doi=f"10.1234/bench.{self.run_id}.{i}"
+            )
+            self.materials_dataset_service.ingest_csv_stream(dataset, io.BytesIO(data))
+            datasets.append(dataset)
+        return datasets
+
+    # Benchmarks
+
+    def bench_parse_csv_file(self, rows: int) -> dict:
+        key = self._store_csv(rows)
+        return time_runs(lambda _: self.materials_dataset_service.parse_csv_file(key), self.repeat)
+
+    def bench_create_material_records_from_csv(self, rows: int) -> dict:
+        key = self._store_csv(rows)
+        return time_runs(
+            lambda dataset: self.materials_dataset_service.create_material_records_from_csv(dataset, key),
+            self.repeat,
+            setup=lambda: self._create_dataset(f"bench {self.run_id} ingest {rows}"),
+        )
+
+    def bench_regenerate_csv_for_dataset(self, rows: int) -> dict:
+        dataset_id = self._ingested_dataset(rows).id
+        return time_runs(lambda _: self.regenerate_csv_for_dataset(dataset_id), self.repeat)
+
+    def bench_compare_files(self, rows: int) -> dict:
+        first, second = self._versioned_dataset(rows)
+        return time_runs(lambda _: self.dataset_version_service.compare_files(first.id, second.id), self.repeat)
+
+    def bench_get_csv_diff(self, rows: int) -> dict:
+        first, second = self._versioned_dataset(rows)
+        return time_runs(lambda _: self.dataset_version_service.get_csv_diff(first.id, second.id), self.repeat)
+
+    def bench_explore_filter(self, rows: int) -> dict:
+        self._catalogue(rows)
+        return time_runs(lambda _: self.explore_repository.filter(query="material", tags=["oxides"]), self.repeat)
+
+    def bench_get_recommendations(self, rows: int) -> dict:
+        dataset_id = self._catalogue(rows)[0].id
+        return time_runs(lambda _: self.materials_dataset_service.get_recommendations(dataset_id, limit=5), self.repeat)
+
+    def run(self, scales: List[int], only: List[str] = None) -> dict:
+        """Runs the benchmarks at every scale, removing the data of each scale before the next one"""
+        names = [name for name in BENCHMARKS if not only or name in only]
+        results = {name: {} for name in names}
+        for scale in scales:
+            for name in names:
+                self.echo(f"  {name} @ {scale} rows ...")
+                try:
+                    results[name][str(scale)] = getattr(self, f"bench_{name}")(scale)
+                finally:
+                    self.cleanup()
+
+        return {"meta": self.metadata(scales), "results": results}
+
+    def metadata(self, scales: List[int]) -> dict:
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "scales": scales,
+            "repeat": self.repeat,
+            "generator": {
+                "materials": self.generator.materials,
+                "properties": self.generator.properties,
+                "distribution": self.generator.distribution,
+                "seed": self.generator.seed,
+            },
+        }
+
+    def cleanup(self):
+        from app import db
+        from app.modules.dataset.models import MaterialsDataset
+
+        db.session.rollback()
+        for dataset_id in self.dataset_ids:
+            dataset = db.session.get(MaterialsDataset, dataset_id)
+            if dataset is None:
+                continue
+            self.storage_keys.extend(version.csv_snapshot_path for version in dataset.versions)
+            if dataset.csv_file_path:
+                self.storage_keys.append(dataset.csv_file_path)
+            # Records and versions go with ON DELETE CASCADE
+            db.session.delete(dataset)
+        db.session.commit()
+        self.dataset_ids = []
+
+        for key in set(self.storage_keys):
+            self.storage.delete(key)
+        self.storage_keys = []
+        local_directory = self.storage.local_path(self.prefix)
+        if local_directory and os.path.isdir(local_directory):
+            shutil.rmtree(local_directory, ignore_errors=True)
+
+        if self.user is not None:
+            db.session.delete(self.user)
+            db.session.commit()
+            self.user = None
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = 0.25) -> List[Dict]:
+    """
+    Median of every benchmark/scale present in both result sets, with the ratio
+    current / baseline; ratios above 1 + ``threshold`` are regressions.
+    """
+    rows = []
+    for name, scales in current.get("results", {}).items():
+        for scale, stats in scales.items():
+            previous = baseline.get("results", {}).get(name, {}).get(scale)
+            if previous is None:
+                continue
+            ratio = stats["median"] / previous["median"] if previous["median"] else float("inf")
+            rows.append(
+                {
+                    "benchmark": name,
+                    "scale": scale,
+                    "baseline": previous["median"],
+                    "current": stats["median"],
+                    "ratio": ratio,
+                    "regression": ratio > 1 + threshold,
+                }
+            )
+    return rows
@@ -0,0 +1,117 @@
+import gzip
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+# Content codings in order of preference when the client accepts several with the same quality
+ENCODINGS = ("br", "zstd", "gzip")
+
+# Compressed by default: text payloads, which are highly repetitive (record JSON, CSV views, pages)
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+)
+
+# Levels per content type and coding (br 0-11, zstd 1-22, gzip 1-9). Dynamic responses are
+# compressed on every request, so the levels trade a little ratio for much less CPU.
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+COMPRESSION_LEVELS = {
+    "application/json": {"br": 5, "zstd": 6, "gzip": 6},
+    "text/html": {"br": 5, "zstd": 6, "gzip": 6},
+    "text/csv": {"br": 4, "zstd": 3, "gzip": 5},
+}
+
+
+def negotiate_encoding(accept_encodings, encodings: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """
+    The coding to use for a request, from its parsed Accept-Encoding header
+    (``request.accept_encodings``): the accepted one with the highest quality, ties
+    broken by the order of ``encodings``. None when the client accepts none of them.
+    """
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compression_level(mimetype: str, encoding: str, levels: Dict[str, Dict[str, int]] = None) -> int:
+    levels = COMPRESSION_LEVELS if levels is None else levels
+    return levels.get(mimetype, {}).get(encoding, DEFAULT_LEVELS[encoding])
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """Compresses a whole body with ``encoding`` ('br', 'zstd' or 'gzip')"""
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=level)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+class StreamCompressor:
+    """
+    Incremental compressor for streamed bodies. Each chunk is compressed and flushed
+    right away, so the client can decode everything sent so far instead of waiting for
+    the compressor's window to fill up (what matters for progressive responses).
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            import brotli
+
+            self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+        elif encoding == "zstd":
+            import zstandard
+
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "gzip":
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError(f"Unsupported content coding: {encoding}")
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(chunk) + self.compressor.flush()
+        if self.encoding == "zstd":
+            import zstandard
+
+            return self.compressor.compress(chunk) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    """Compresses an iterable body chunk by chunk, closing it afterwards as WSGI servers would"""
+    compressor = StreamCompressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
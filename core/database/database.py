@@ -0,0 +1,99 @@
+import os
+from contextlib import contextmanager, nullcontext
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+
+# Bind key of the optional read replica in SQLALCHEMY_BINDS
+REPLICA_BIND_KEY = "replica"
+
+
+def database_engine_options(
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 1800,
+    pool_timeout: int = 30,
+    statement_timeout: int = 0,
+) -> dict:
+    """
+    SQLAlchemy engine options for SQLALCHEMY_ENGINE_OPTIONS.
+
+    The arguments are the defaults of an environment; each one can be overridden with
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT or DB_STATEMENT_TIMEOUT
+    (milliseconds, 0 disables it). The options apply to the primary and replica engines.
+    """
+    options = {
+        "pool_pre_ping": True,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", max_overflow)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", pool_recycle)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", pool_timeout)),
+    }
+
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT", statement_timeout))
+    if statement_timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+
+    return options
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the SELECTs issued inside ``replica_reads()`` to the read replica.
+
+    Flushes, INSERT/UPDATE/DELETE statements, raw SQL and SELECT ... FOR UPDATE always use the
+    primary, as does everything when no replica is configured. Objects loaded from the replica
+    live in the same session and can be modified and committed as usual.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.replica_reads = 0
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.replica_reads and not self._flushing and self._is_plain_select(clause):
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @staticmethod
+    def _is_plain_select(clause) -> bool:
+        return clause is not None and clause.is_select and getattr(clause, "_for_update_arg", None) is None
+
+
+@contextmanager
+def replica_reads():
+    """
+    Send the queries of the block to the read replica, when one is configured.
+
+    Meant for listings and statistics that tolerate replication lag; anything that must see
+    the current request's own writes should read from the primary.
+    """
+    session = current_app.extensions["sqlalchemy"].session()
+    session.replica_reads += 1
+    try:
+        yield session
+    finally:
+        session.replica_reads -= 1
+
+
+def reads_from(use_replica: bool):
+    """``replica_reads()`` when ``use_replica`` is set, a no-op context otherwise"""
+    return replica_reads() if use_replica else nullcontext()
+
+
+def get_pool_statistics() -> dict:
+    """Connection pool usage of this process, per engine ('primary' and, if configured, 'replica')"""
+    statistics = {}
+    for bind_key, engine in current_app.extensions["sqlalchemy"].engines.items():
+        pool = engine.pool
+        statistics[bind_key or "primary"] = {
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        }
+    return statistics
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# (namespace, key) -> depth of the locks held by the current thread, so nested blocks don't deadlock
+_held = threading.local()
+
+# Last resort when neither PostgreSQL nor fcntl are available: only serialises this process
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+def _depths() -> dict:
+    if not hasattr(_held, "depths"):
+        _held.depths = {}
+    return _held.depths
+
+
+@contextmanager
+def _postgresql_lock(engine, namespace: int, key: int):
+    # A connection of its own: the session releases its connection on every commit, and a
+    # session-level advisory lock has to outlive the commits made inside the block
+    connection = engine.connect()
+    parameters = {"namespace": namespace, "key": key}
+    locked = False
+    try:
+        connection.execute(text("SELECT pg_advisory_lock(:namespace, :key)"), parameters)
+        connection.commit()
+        locked = True
+        yield
+    finally:
+        try:
+            if locked:
+                connection.execute(text("SELECT pg_advisory_unlock(:namespace, :key)"), parameters)
+                connection.commit()
+        except BaseException:
+            # Never hand a connection that may still hold the lock back to the pool
+            connection.invalidate()
+            raise
+        finally:
+            connection.close()
+
+
+@contextmanager
+def _file_lock(namespace: int, key: int):
+    lock_dir = current_app.config.get("LOCK_DIR") or os.path.join(tempfile.gettempdir(), "materialhub-locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{namespace}-{key}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _process_lock(namespace: int, key: int):
+    with _process_locks_guard:
+        lock = _process_locks.setdefault((namespace, key), threading.Lock())
+    with lock:
+        yield
+
+
+@contextmanager
+def advisory_lock(namespace: int, key: int):
+    """
+    Exclusive lock on ``(namespace, key)`` shared by every worker and thread, held until the
+    end of the block whatever the transactions committed or rolled back inside it.
+
+    PostgreSQL advisory locks are used when the primary database is PostgreSQL, so the lock
+    spans hosts; other databases fall back to a lock file under LOCK_DIR (workers of one host).
+    The lock is reentrant within a thread. Both numbers must fit in a signed 32-bit integer.
+    """
+    depths = _depths()
+    if depths.get((namespace, key)):
+        depths[(namespace, key)] += 1
+        try:
+            yield
+        finally:
+            depths[(namespace, key)] -= 1
+        return
+
+    engine = current_app.extensions["sqlalchemy"].engine
+    if engine.dialect.name == "postgresql":
+        lock = _postgresql_lock(engine, namespace, key)
+    elif fcntl is not None:
+        lock = _file_lock(namespace, key)
+    else:
+        lock = _process_lock(namespace, key)
+
+    with lock:
+        depths[(namespace, key)] = 1
+        try:
+            yield
+        finally:
+            del depths[(namespace, key)]
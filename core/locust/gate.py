@@ -0,0 +1,142 @@
+import ast
+import csv
+import glob
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Load shapes for the headless performance gate
+PROFILES = {
+    "smoke": {"users": 10, "spawn_rate": 5, "run_time": "1m"},
+    "load": {"users": 25, "spawn_rate": 5, "run_time": "2m"},
+    "stress": {"users": 100, "spawn_rate": 10, "run_time": "3m"},
+}
+
+SLO_METRICS = ("p50", "p95", "p99", "error_rate")
+
+# Endpoints with fewer requests than this in either run are too noisy to compare with the baseline
+MIN_REQUESTS_FOR_COMPARISON = 20
+
+# Slowdowns smaller than this (ms) never count as regressions, whatever the ratio
+MIN_REGRESSION_MS = 10
+
+
+def find_locustfiles(modules_dir: str, module: str = None) -> List[str]:
+    pattern = os.path.join(modules_dir, module or "*", "tests", "locustfile.py")
+    return sorted(glob.glob(pattern))
+
+
+def load_slos(locustfile_path: str) -> Dict[str, dict]:
+    """
+    Reads the ``SLOS`` dict of a locustfile without importing it (importing locust
+    monkey-patches the interpreter with gevent). Keys are request names as Locust
+    reports them, optionally prefixed with the method ("POST /login").
+    """
+    with open(locustfile_path) as f:
+        tree = ast.parse(f.read(), filename=locustfile_path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "SLOS" for target in node.targets):
+            slos = ast.literal_eval(node.value)
+            for name, objectives in slos.items():
+                unknown = set(objectives) - set(SLO_METRICS)
+                if unknown:
+                    raise ValueError(f"{locustfile_path}: unknown SLO metric(s) {sorted(unknown)} for '{name}'")
+            return slos
+    return {}
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_stats(stats_csv_path: str) -> Dict[str, dict]:
+    """Per-endpoint results of a Locust ``--csv`` run, keyed by "METHOD name" ("Aggregated" for the total)"""
+    endpoints = {}
+    with open(stats_csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            requests = int(row["Request Count"])
+            failures = int(row["Failure Count"])
+            key = f"{row['Type']} {row['Name']}" if row["Type"] else row["Name"]
+            endpoints[key] = {
+                "method": row["Type"],
+                "name": row["Name"],
+                "requests": requests,
+                "failures": failures,
+                "error_rate": failures / requests if requests else 0.0,
+                "p50": _number(row["50%"]),
+                "p95": _number(row["95%"]),
+                "p99": _number(row["99%"]),
+            }
+    return endpoints
+
+
+def _matching(endpoints: Dict[str, dict], slo_name: str) -> List[str]:
+    if slo_name in endpoints:
+        return [slo_name]
+    return [key for key, stats in endpoints.items() if stats["method"] and stats["name"] == slo_name]
+
+
+def check_slos(endpoints: Dict[str, dict], slos: Dict[str, dict]) -> List[dict]:
+    """
+    One row per SLO metric and matching endpoint, with ``breach`` set when the measured
+    value is above the objective. SLOs of endpoints the run never hit come back with
+    ``actual`` None and are not breaches.
+    """
+    rows = []
+    for slo_name, objectives in slos.items():
+        keys = _matching(endpoints, slo_name)
+        for metric, objective in objectives.items():
+            if not keys:
+                rows.append({"endpoint": slo_name, "metric": metric, "objective": objective, "actual": None})
+            for key in keys:
+                actual = endpoints[key][metric]
+                rows.append({"endpoint": key, "metric": metric, "objective": objective, "actual": actual})
+    for row in rows:
+        row["breach"] = row["actual"] is not None and row["actual"] > row["objective"]
+    return rows
+
+
+def compare_with_baseline(current: dict, baseline: dict, threshold: float = 0.25, metric: str = "p95") -> List[dict]:
+    """
+    ``metric`` of every endpoint present in both runs, with the ratio current / baseline.
+    Ratios above 1 + ``threshold`` are regressions unless the slowdown is under
+    MIN_REGRESSION_MS or either run has too few requests to tell.
+    """
+    rows = []
+    for key, stats in current.get("endpoints", {}).items():
+        previous = baseline.get("endpoints", {}).get(key)
+        if previous is None or stats[metric] is None or previous[metric] is None:
+            continue
+        comparable = min(stats["requests"], previous["requests"]) >= MIN_REQUESTS_FOR_COMPARISON
+        ratio = stats[metric] / previous[metric] if previous[metric] else float("inf")
+        rows.append(
+            {
+                "endpoint": key,
+                "baseline": previous[metric],
+                "current": stats[metric],
+                "ratio": ratio,
+                "regression": comparable
+                and ratio > 1 + threshold
+                and stats[metric] - previous[metric] >= MIN_REGRESSION_MS,
+            }
+        )
+    return rows
+
+
+def build_results(endpoints: Dict[str, dict], profile: str, module: str = None, scale: float = None) -> dict:
+    from core.bench.suite import _git_commit
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "profile": profile,
+            "load": PROFILES[profile],
+            "module": module,
+            "scale": scale,
+        },
+        "endpoints": endpoints,
+    }
@@ -0,0 +1,84 @@
+from flask import request
+
+from core.compression.compression import (
+    COMPRESSIBLE_MIMETYPES,
+    COMPRESSION_LEVELS,
+    compress,
+    compress_stream,
+    compression_level,
+    negotiate_encoding,
+)
+
+
+class CompressionManager:
+    """
+    Compresses text responses (JSON, HTML, CSV...) with the best coding the client accepts
+    among br, zstd and gzip. Bodies under COMPRESSION_MIN_SIZE are sent as they are, and
+    streamed responses are compressed chunk by chunk (COMPRESSION_STREAMING) so they stay
+    streamed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def register_compression(self):
+        if not self.app.config.get("COMPRESSION_ENABLED", True):
+            return
+
+        self.app.after_request(self._compress_response)
+
+    def _levels(self) -> dict:
+        levels = {mimetype: dict(codings) for mimetype, codings in COMPRESSION_LEVELS.items()}
+        for mimetype, codings in (self.app.config.get("COMPRESSION_LEVELS") or {}).items():
+            levels.setdefault(mimetype, {}).update(codings)
+        return levels
+
+    def _compress_response(self, response):
+        config = self.app.config
+        mimetypes = config.get("COMPRESSION_MIMETYPES") or COMPRESSIBLE_MIMETYPES
+        if response.mimetype not in mimetypes:
+            return response
+
+        # The body depends on Accept-Encoding from here on, whether it ends up compressed or not
+        response.vary.add("Accept-Encoding")
+
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or "no-transform" in (response.headers.get("Cache-Control") or "")
+        ):
+            return response
+
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        min_size = config.get("COMPRESSION_MIN_SIZE", 1024)
+        level = compression_level(response.mimetype, encoding, self._levels())
+
+        if response.is_streamed or response.direct_passthrough:
+            if not config.get("COMPRESSION_STREAMING", True):
+                return response
+            if response.content_length is not None and response.content_length < min_size:
+                return response
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers.pop("Content-Length", None)
+            # Byte ranges of the compressed stream are not the ranges of the file
+            response.headers.pop("Accept-Ranges", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressed = compress(data, encoding, level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            # A compressed representation is a different entity from the plain one
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -1,6 +1,8 @@
 import os
 import secrets
 
+from core.database.database import REPLICA_BIND_KEY, database_engine_options
+
 
 class ConfigManager:
     def __init__(self, app):
@@ -19,6 +21,13 @@ class ConfigManager:
         else:
             self.app.config.from_object(DevelopmentConfig)
 
+        # Reads routed through replica_reads() go to the replica when one is configured
+        replica_uri = self.app.config.get("SQLALCHEMY_DATABASE_REPLICA_URI")
+        if replica_uri:
+            binds = dict(self.app.config.get("SQLALCHEMY_BINDS") or {})
+            binds[REPLICA_BIND_KEY] = replica_uri
+            self.app.config["SQLALCHEMY_BINDS"] = binds
+
         # Aseguramos que la app tenga la SECRET_KEY
         if not self.app.secret_key:
             self.app.secret_key = self.app.config.get("SECRET_KEY")
@@ -30,12 +39,86 @@ class Config:
 
     # SQLAlchemy
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = database_engine_options()
+    # Optional read replica for listings and statistics
+    SQLALCHEMY_DATABASE_REPLICA_URI = os.getenv("DATABASE_REPLICA_URL")
 
     # Config generales
     TIMEZONE = "Europe/Madrid"
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
 
+    # Prometheus metrics at /metrics (set PROMETHEUS_MULTIPROC_DIR to aggregate gunicorn workers)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Response compression (br, zstd or gzip, as negotiated with Accept-Encoding) of text bodies of at least
+    # COMPRESSION_MIN_SIZE bytes; streamed responses are compressed chunk by chunk unless COMPRESSION_STREAMING
+    # is off. COMPRESSION_LEVELS overrides core.compression.compression.COMPRESSION_LEVELS per content type.
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_STREAMING = os.getenv("COMPRESSION_STREAMING", "true").lower() == "true"
+    COMPRESSION_LEVELS = {}
+
+    # Requests sent with this token in the X-Profile header (or ?_profile=) are profiled; unset disables profiling
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+    PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.005))  # seconds between stack samples
+    PROFILES_DIR = os.getenv("PROFILES_DIR")  # defaults to logs/profiles
+
+    # Memory tracking mode: peak allocations (tracemalloc) and RSS growth per request, at /debug/memory.
+    # Requests peaking over MEMORY_BUDGET_MB are logged with their top allocation sites.
+    MEMORY_TRACKING_ENABLED = os.getenv("MEMORY_TRACKING_ENABLED", "false").lower() == "true"
+    MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", 256))
+    MEMORY_TRACKING_TOP = int(os.getenv("MEMORY_TRACKING_TOP", 10))
+    MEMORY_TRACKING_FRAMES = int(os.getenv("MEMORY_TRACKING_FRAMES", 10))  # stack frames kept per allocation
+    MEMORY_TRACKING_HISTORY = int(os.getenv("MEMORY_TRACKING_HISTORY", 50))  # over-budget requests listed
+
+    # Request tracing: spans for services, repositories, SQL and storage, written as OTLP/JSON lines
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACES_FILE = os.getenv("TRACES_FILE")  # defaults to logs/traces/traces.jsonl
+    TRACING_MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", 10000))  # per request
+
+    # Modules not registered in this environment, on top of .moduleignore (comma-separated)
+    DISABLED_MODULES = [m.strip() for m in os.getenv("DISABLED_MODULES", "").split(",") if m.strip()]
+
+    # Resumable uploads: largest chunk accepted per PUT (bytes)
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+    # Sessions not completed after this many hours are dropped by `rosemary storage:reap`
+    UPLOAD_SESSION_MAX_AGE_HOURS = float(os.getenv("UPLOAD_SESSION_MAX_AGE_HOURS", 24))
+
+    # Files of deleted datasets are removed by a background thread after the request; when off, only
+    # `rosemary storage:reap` removes them
+    FILE_REAPER_ASYNC = os.getenv("FILE_REAPER_ASYNC", "true").lower() == "true"
+
+    # Lock files of the per-dataset locks when the database has no advisory locks (non-PostgreSQL);
+    # must be shared by all the workers of the host. Defaults to a directory under the system temp dir
+    LOCK_DIR = os.getenv("LOCK_DIR")
+
+    # Composition vectors of the distinct formulas for similarity search, kept in the storage under this key.
+    # Rebuilt when records were added since, or when older than SIMILARITY_INDEX_MAX_AGE seconds (edits, deletes)
+    SIMILARITY_INDEX_KEY = os.getenv("SIMILARITY_INDEX_KEY", "indexes/compositions.idx")
+    SIMILARITY_INDEX_MAX_AGE = float(os.getenv("SIMILARITY_INDEX_MAX_AGE", 3600))
+    # Rebuild a stale index in a background thread and keep answering from the stale one meanwhile; when off,
+    # the request that finds it stale rebuilds it
+    SIMILARITY_INDEX_ASYNC = os.getenv("SIMILARITY_INDEX_ASYNC", "true").lower() == "true"
+
+    # Compressed CSV uploads expanding past this many bytes, or more than this many times their compressed
+    # size, are rejected with 413 (0 disables a limit)
+    MAX_DECOMPRESSED_CSV_SIZE = int(os.getenv("MAX_DECOMPRESSED_CSV_SIZE", 1024 * 1024 * 1024))
+    MAX_CSV_COMPRESSION_RATIO = float(os.getenv("MAX_CSV_COMPRESSION_RATIO", 100))
+
+    # Store compressed CSV uploads (.csv.gz/.csv.zst/.csv.br) as received instead of expanding them
+    KEEP_COMPRESSED_UPLOADS = os.getenv("KEEP_COMPRESSED_UPLOADS", "false").lower() == "true"
+
+    # Object storage for uploaded CSVs and version snapshots: "local" or "s3" (any S3-compatible service)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT")  # defaults to WORKING_DIR
+    S3_BUCKET = os.getenv("S3_BUCKET")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://minio:9000
+    S3_REGION = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_PRESIGNED_URL_EXPIRATION = int(os.getenv("S3_PRESIGNED_URL_EXPIRATION", 3600))
+
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         f"postgresql+psycopg2://{os.getenv('POSTGRES_USER', 'default_user')}:"
         f"{os.getenv('POSTGRES_PASSWORD', 'default_password')}@"
@@ -59,6 +142,9 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
+    FILE_REAPER_ASYNC = False
+    SIMILARITY_INDEX_ASYNC = False
+    SQLALCHEMY_ENGINE_OPTIONS = database_engine_options(pool_size=2, max_overflow=5)
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         f"postgresql+psycopg2://{os.getenv('POSTGRES_USER', 'materialhub_user')}:"
         f"{os.getenv('POSTGRES_PASSWORD', 'materialhub_password')}@"
@@ -70,4 +156,5 @@ class TestingConfig(Config):
 
 class ProductionConfig(Config):
     DEBUG = False
+    SQLALCHEMY_ENGINE_OPTIONS = database_engine_options(pool_size=10, max_overflow=20, statement_timeout=30000)
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
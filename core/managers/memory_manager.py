@@ -0,0 +1,90 @@
+import threading
+from collections import deque
+
+from flask import g, jsonify, request
+
+from core.metrics.metrics import HTTP_REQUEST_MEMORY_OVER_BUDGET, HTTP_REQUEST_PEAK_MEMORY, HTTP_REQUEST_RSS_GROWTH
+from core.profiling.memory import AllocationTracker
+
+MB = 1024 * 1024
+
+
+class MemoryManager:
+    """
+    Memory tracking mode: measures the peak allocations and RSS growth of every request,
+    flags those over MEMORY_BUDGET_MB and reports them at /debug/memory.
+
+    tracemalloc slows allocations down noticeably, so the mode is off unless
+    MEMORY_TRACKING_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.over_budget = deque(maxlen=app.config["MEMORY_TRACKING_HISTORY"])
+
+    def register_memory_tracking(self):
+        if not self.app.config.get("MEMORY_TRACKING_ENABLED"):
+            return
+
+        self.app.before_request(self._start_tracking)
+        self.app.after_request(self._finish_tracking)
+        self.app.add_url_rule("/debug/memory", "debug_memory", self._report_view, methods=["GET"])
+        self.app.extensions["memory_tracking"] = self
+
+    def _start_tracking(self):
+        tracker = AllocationTracker(
+            frames=self.app.config["MEMORY_TRACKING_FRAMES"],
+            top=self.app.config["MEMORY_TRACKING_TOP"],
+        )
+        tracker.start()
+        g.memory_tracker = tracker
+
+    def _finish_tracking(self, response):
+        tracker = g.pop("memory_tracker", None)
+        if tracker is None:
+            return response
+
+        tracker.stop()
+        endpoint = request.endpoint or "unmatched"
+        HTTP_REQUEST_PEAK_MEMORY.labels(endpoint=endpoint).observe(tracker.peak_bytes)
+        HTTP_REQUEST_RSS_GROWTH.labels(endpoint=endpoint).observe(max(tracker.rss_growth, 0))
+        self.record(endpoint, request.method, request.path, tracker)
+        return response
+
+    def record(self, endpoint: str, method: str, path: str, tracker: AllocationTracker):
+        budget = self.app.config.get("MEMORY_BUDGET_MB")
+        over_budget = budget is not None and tracker.peak_bytes > budget * MB
+
+        with self.lock:
+            stats = self.endpoints.setdefault(
+                endpoint, {"requests": 0, "over_budget": 0, "max_peak_bytes": 0, "max_rss_growth": 0}
+            )
+            stats["requests"] += 1
+            stats["max_peak_bytes"] = max(stats["max_peak_bytes"], tracker.peak_bytes)
+            stats["max_rss_growth"] = max(stats["max_rss_growth"], tracker.rss_growth)
+            if over_budget:
+                stats["over_budget"] += 1
+                self.over_budget.append(dict(tracker.to_dict(), endpoint=endpoint, method=method, path=path))
+
+        if over_budget:
+            HTTP_REQUEST_MEMORY_OVER_BUDGET.labels(endpoint=endpoint).inc()
+            sites = ", ".join(f"{site['site']} ({site['size'] / MB:.1f} MB)" for site in tracker.top_sites[:3])
+            self.app.logger.warning(
+                f"{method} {path} ({endpoint}) peaked at {tracker.peak_bytes / MB:.1f} MB, "
+                f"over the {budget} MB budget. Top allocations: {sites}"
+            )
+
+    def report(self) -> dict:
+        with self.lock:
+            endpoints = sorted(self.endpoints.items(), key=lambda item: item[1]["max_peak_bytes"], reverse=True)
+            return {
+                "budget_mb": self.app.config.get("MEMORY_BUDGET_MB"),
+                "endpoints": [dict(stats, endpoint=endpoint) for endpoint, stats in endpoints],
+                "over_budget": list(reversed(self.over_budget)),
+            }
+
+    def _report_view(self):
+        """Per-endpoint memory peaks of this worker and its latest over-budget requests"""
+        return jsonify(self.report())
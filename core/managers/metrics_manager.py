@@ -0,0 +1,106 @@
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.database.database import get_pool_statistics
+from core.metrics.metrics import (
+    DB_POOL_CONNECTIONS,
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_DURATION,
+    DB_TIME_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_SIZE,
+    HTTP_REQUESTS,
+    HTTP_RESPONSE_SIZE,
+    render_metrics,
+)
+
+_query_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _observe_query(conn):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERY_DURATION.observe(elapsed)
+
+    if has_request_context():
+        g.metrics_db_queries = g.get("metrics_db_queries", 0) + 1
+        g.metrics_db_seconds = g.get("metrics_db_seconds", 0.0) + elapsed
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _observe_query(conn)
+
+
+def _handle_error(exception_context):
+    # A failing statement never reaches after_cursor_execute: pop its start time here, or it stays on
+    # the pooled connection, and count it, so lock and statement timeouts show in the histogram
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        _observe_query(exception_context.connection)
+
+
+class MetricsManager:
+    """Prometheus instrumentation of requests and SQL statements, exposed at /metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def register_metrics(self):
+        if not self.app.config.get("METRICS_ENABLED", True):
+            return
+
+        self._install_query_listeners()
+        self.app.before_request(self._start_request)
+        self.app.after_request(self._observe_request)
+        self.app.add_url_rule("/metrics", "metrics", self._metrics_view, methods=["GET"])
+
+    @staticmethod
+    def _install_query_listeners():
+        # Listeners on the Engine class cover the primary and replica engines of every app
+        global _query_listeners_installed
+        if _query_listeners_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _query_listeners_installed = True
+
+    @staticmethod
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+
+    @staticmethod
+    def _observe_request(response):
+        start = g.get("metrics_start")
+        if start is None:
+            return response
+
+        endpoint = request.endpoint or "unmatched"
+        HTTP_REQUESTS.labels(method=request.method, endpoint=endpoint, status=str(response.status_code)).inc()
+        HTTP_REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start)
+        HTTP_REQUEST_SIZE.labels(endpoint=endpoint).observe(request.content_length or 0)
+        if response.content_length is not None:
+            HTTP_RESPONSE_SIZE.labels(endpoint=endpoint).observe(response.content_length)
+
+        DB_QUERIES_PER_REQUEST.labels(endpoint=endpoint).observe(g.get("metrics_db_queries", 0))
+        DB_TIME_PER_REQUEST.labels(endpoint=endpoint).observe(g.get("metrics_db_seconds", 0.0))
+
+        for engine, pool in get_pool_statistics().items():
+            for state in ("checked_out", "checked_in", "overflow"):
+                if pool.get(state) is not None:
+                    DB_POOL_CONNECTIONS.labels(engine=engine, state=state).set(pool[state])
+
+        return response
+
+    @staticmethod
+    def _metrics_view():
+        data, content_type = render_metrics()
+        return Response(data, content_type=content_type)
@@ -1,6 +1,7 @@
 # module_manager.py
 import importlib.util
 import os
+import time
 
 from dotenv import load_dotenv
 from flask import Blueprint
@@ -22,11 +23,18 @@ class ModuleManager:
         if os.path.exists(self.ignored_modules_file):
             with open(self.ignored_modules_file, "r") as f:
                 ignored_modules = [line.strip() for line in f.readlines()]
+
+        # Module profile of the environment: modules disabled through DISABLED_MODULES
+        for module_name in self.app.config.get("DISABLED_MODULES", []):
+            if module_name not in ignored_modules:
+                ignored_modules.append(module_name)
         return ignored_modules
 
     def register_modules(self):
         self.app.modules = {}
         self.app.blueprint_url_prefixes = {}
+        # Seconds spent importing and registering each module, reported by `rosemary startup:profile`
+        self.app.module_load_times = {}
 
         for module_name in os.listdir(self.modules_dir):
 
@@ -40,6 +48,7 @@ class ModuleManager:
                 and os.path.exists(os.path.join(module_path, "__init__.py"))
                 and module_name != ".pytest_cache"
             ):
+                start = time.perf_counter()
                 try:
                     routes_module = importlib.import_module(f"app.modules.{module_name}.routes")
                     for item in dir(routes_module):
@@ -48,6 +57,7 @@ class ModuleManager:
                             self.app.register_blueprint(blueprint)
                 except ModuleNotFoundError as e:
                     print(f"Error registering modules: Could not load the module " f"for Module '{module_name}': {e}")
+                self.app.module_load_times[module_name] = time.perf_counter() - start
 
     def register_module(self, module_name):
         module_path = os.path.join(self.modules_dir, module_name)
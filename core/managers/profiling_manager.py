@@ -0,0 +1,72 @@
+import hmac
+from urllib.parse import urlencode
+
+from flask import g, request
+
+from core.profiling.profiler import StackSampler, save_profile
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "_profile"
+
+
+class ProfilingManager:
+    """
+    Profiles single requests on demand.
+
+    A request carrying the PROFILING_TOKEN in the X-Profile header (or the ``_profile``
+    query parameter) is sampled and its folded stacks are written to PROFILES_DIR.
+    Without a token configured no hooks are installed at all.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def register_profiling(self):
+        if not self.app.config.get("PROFILING_TOKEN"):
+            return
+
+        self.app.before_request(self._start_profile)
+        self.app.after_request(self._tag_response)
+        self.app.teardown_request(self._finish_profile)
+
+    def _is_authorised(self) -> bool:
+        supplied = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
+        if not supplied:
+            return False
+        return hmac.compare_digest(supplied.encode(), self.app.config["PROFILING_TOKEN"].encode())
+
+    def _start_profile(self):
+        if not self._is_authorised():
+            return
+        sampler = StackSampler(interval=self.app.config.get("PROFILING_INTERVAL", 0.005))
+        sampler.start()
+        g.profile_sampler = sampler
+
+    @staticmethod
+    def _tag_response(response):
+        if g.get("profile_sampler") is not None:
+            g.profile_status = response.status_code
+        return response
+
+    @staticmethod
+    def _path_without_token() -> str:
+        query = urlencode([(k, v) for k, v in request.args.items(multi=True) if k != PROFILE_QUERY_PARAM])
+        return f"{request.path}?{query}" if query else request.path
+
+    def _finish_profile(self, exc):
+        sampler = g.pop("profile_sampler", None)
+        if sampler is None:
+            return
+
+        sampler.stop()
+        metadata = {
+            "method": request.method,
+            "path": self._path_without_token(),
+            "endpoint": request.endpoint,
+            "status": g.get("profile_status", 500 if exc else None),
+        }
+        try:
+            name = save_profile(sampler, metadata, self.app.config.get("PROFILES_DIR"))
+            self.app.logger.info(f"Request profile saved: {name}")
+        except OSError as e:
+            self.app.logger.error(f"Could not save request profile: {e}")
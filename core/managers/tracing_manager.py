@@ -0,0 +1,111 @@
+import os
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.tracing.tracing import SPAN_KIND_CLIENT, JsonLinesExporter, end_trace, start_span, start_trace
+
+_sql_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    sql_span = start_span(
+        f"db.{operation}",
+        "db",
+        SPAN_KIND_CLIENT,
+        {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:2000],
+            "db.executemany": executemany,
+        },
+    )
+    conn.info.setdefault("tracing_spans", []).append(sql_span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("tracing_spans")
+    sql_span = spans.pop() if spans else None
+    if sql_span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_span.set_attribute("db.rowcount", cursor.rowcount)
+        sql_span.end()
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    spans = connection.info.get("tracing_spans") if connection is not None else None
+    sql_span = spans.pop() if spans else None
+    if sql_span is not None:
+        sql_span.end(exception_context.original_exception)
+
+
+class TracingManager:
+    """
+    Traces every request: routes, service and repository calls, SQL statements and
+    storage reads/writes become spans that are appended to TRACES_FILE as OTLP/JSON lines.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.exporter = None
+
+    def register_tracing(self):
+        if not self.app.config.get("TRACING_ENABLED"):
+            return
+
+        path = self.app.config.get("TRACES_FILE") or os.path.join(os.getcwd(), "logs", "traces", "traces.jsonl")
+        self.exporter = JsonLinesExporter(path, self.app.config.get("TRACING_SERVICE_NAME", "materialshub"))
+
+        self._install_sql_listeners()
+        self.app.before_request(self._start_trace)
+        self.app.after_request(self._tag_response)
+        self.app.teardown_request(self._finish_trace)
+
+    @staticmethod
+    def _install_sql_listeners():
+        # Listeners on the Engine class cover the primary and replica engines of every app
+        global _sql_listeners_installed
+        if _sql_listeners_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _sql_listeners_installed = True
+
+    def _start_trace(self):
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        root, token = start_trace(
+            f"{request.method} {route}",
+            traceparent=request.headers.get("traceparent"),
+            max_spans=self.app.config.get("TRACING_MAX_SPANS", 10000),
+            attributes={
+                "http.method": request.method,
+                "http.route": route,
+                "http.target": request.path,
+                "flask.endpoint": request.endpoint,
+            },
+        )
+        g.trace_root = root
+        g.trace_token = token
+
+    @staticmethod
+    def _tag_response(response):
+        root = g.get("trace_root")
+        if root is not None:
+            root.set_attribute("http.status_code", response.status_code)
+            response.headers["X-Trace-Id"] = root.trace.trace_id
+            response.headers["traceparent"] = f"00-{root.trace.trace_id}-{root.span_id}-01"
+        return response
+
+    def _finish_trace(self, exc):
+        root = g.pop("trace_root", None)
+        if root is None:
+            return
+
+        trace = end_trace(root, g.pop("trace_token"), exc)
+        try:
+            self.exporter.export(trace)
+        except OSError as e:
+            self.app.logger.error(f"Could not export trace {trace.trace_id}: {e}")
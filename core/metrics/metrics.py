@@ -0,0 +1,142 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets for payload sizes: 100 B .. 1 GiB
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_073_741_824)
+
+HTTP_REQUESTS = Counter(
+    "materialshub_http_requests_total",
+    "HTTP requests handled",
+    ["method", "endpoint", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "materialshub_http_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "materialshub_http_request_size_bytes",
+    "Size of request bodies",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "materialshub_http_response_size_bytes",
+    "Size of response bodies (when known up front)",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+
+DB_QUERY_DURATION = Histogram(
+    "materialshub_db_query_duration_seconds",
+    "Time spent executing a single SQL statement",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "materialshub_http_request_db_queries",
+    "SQL statements executed per request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "materialshub_http_request_db_seconds",
+    "Time spent in SQL statements per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "materialshub_db_pool_connections",
+    "Connections of the SQLAlchemy pools, by engine and state",
+    ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+
+HTTP_REQUEST_PEAK_MEMORY = Histogram(
+    "materialshub_http_request_peak_memory_bytes",
+    "Peak Python memory allocated while handling a request (memory tracking mode)",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+HTTP_REQUEST_RSS_GROWTH = Histogram(
+    "materialshub_http_request_rss_growth_bytes",
+    "Growth of the worker's peak RSS while handling a request (memory tracking mode)",
+    ["endpoint"],
+    buckets=(0,) + SIZE_BUCKETS,
+)
+HTTP_REQUEST_MEMORY_OVER_BUDGET = Counter(
+    "materialshub_http_request_memory_over_budget_total",
+    "Requests whose peak memory exceeded MEMORY_BUDGET_MB",
+    ["endpoint"],
+)
+
+CSV_INGEST_ROWS = Counter(
+    "materialshub_csv_ingest_rows_total",
+    "Material records inserted from uploaded CSVs",
+)
+CSV_INGEST_DURATION = Histogram(
+    "materialshub_csv_ingest_duration_seconds",
+    "Time spent storing, hashing and parsing an uploaded CSV",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+CSV_INGEST_THROUGHPUT = Histogram(
+    "materialshub_csv_ingest_rows_per_second",
+    "Rows inserted per second of CSV ingestion",
+    buckets=(100, 500, 1_000, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000),
+)
+
+DIFF_DURATION = Histogram(
+    "materialshub_dataset_diff_duration_seconds",
+    "Time spent comparing two dataset versions",
+    ["kind"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+CACHE_LOOKUPS = Counter(
+    "materialshub_cache_lookups_total",
+    "Cache lookups, by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_csv_ingest(rows: int, seconds: float):
+    """Records one CSV ingestion; failed ones (no rows inserted) only count towards the duration"""
+    CSV_INGEST_DURATION.observe(seconds)
+    if rows:
+        CSV_INGEST_ROWS.inc(rows)
+        CSV_INGEST_THROUGHPUT.observe(rows / max(seconds, 1e-6))
+
+
+def is_multiprocess() -> bool:
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics():
+    """
+    Metrics in the Prometheus text format, with their content type.
+
+    Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) every worker writes its samples to that
+    directory and the values of all workers are aggregated here, whichever worker serves
+    the scrape.
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    from prometheus_client import REGISTRY
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
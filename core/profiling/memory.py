@@ -0,0 +1,84 @@
+import os
+import resource
+import sys
+import tracemalloc
+from typing import List, Optional
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None where /proc is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss() -> int:
+    """High-water mark of the resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class AllocationTracker:
+    """
+    Measures the memory used while a block of code runs.
+
+    ``peak_bytes`` is the largest amount of Python memory allocated on top of what was
+    already in use when tracking started (tracemalloc), ``rss_growth`` how much the
+    process high-water mark grew, and ``top_sites`` the source lines that allocated
+    the most memory still held at the end.
+
+    tracemalloc is process-wide, so with threaded workers the numbers of concurrent
+    requests mix; run the tracking mode with one request per worker.
+    """
+
+    def __init__(self, frames: int = 10, top: int = 10):
+        self.frames = frames
+        self.top = top
+        self.peak_bytes = 0
+        self.rss_growth = 0
+        self.rss_after = None
+        self.top_sites = []
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        self._traced_before = tracemalloc.get_traced_memory()[0]
+        self._snapshot_before = tracemalloc.take_snapshot()
+        self._peak_rss_before = peak_rss()
+
+    def stop(self):
+        self.peak_bytes = max(tracemalloc.get_traced_memory()[1] - self._traced_before, 0)
+        self.rss_growth = peak_rss() - self._peak_rss_before
+        self.rss_after = current_rss()
+        snapshot = tracemalloc.take_snapshot()
+        self.top_sites = self._summarise(snapshot.compare_to(self._snapshot_before, "lineno"))
+        self._snapshot_before = None
+
+    def _summarise(self, differences) -> List[dict]:
+        sites = []
+        for difference in differences:
+            if difference.size_diff <= 0:
+                continue
+            frame = difference.traceback[0]
+            sites.append(
+                {
+                    "site": f"{os.path.relpath(frame.filename)}:{frame.lineno}",
+                    "size": difference.size_diff,
+                    "count": difference.count_diff,
+                }
+            )
+            if len(sites) == self.top:
+                break
+        return sites
+
+    def to_dict(self) -> dict:
+        return {
+            "peak_bytes": self.peak_bytes,
+            "rss_growth": self.rss_growth,
+            "rss_after": self.rss_after,
+            "top_sites": self.top_sites,
+        }
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+# Folded stacks ("frame;frame;frame count") are read by flamegraph.pl, speedscope and inferno
+PROFILE_EXTENSION = ".folded"
+METADATA_EXTENSION = ".json"
+
+
+def default_profiles_dir() -> str:
+    return os.path.join(os.getcwd(), "logs", "profiles")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    # ';' separates frames and the last ' ' separates the count in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """
+    Statistical profiler for a single thread.
+
+    A background thread records the stack of ``thread_id`` every ``interval`` seconds,
+    so the profiled code runs unmodified (no tracing hooks) and the cost is bounded by
+    the sampling rate.
+    """
+
+    def __init__(self, thread_id: int = None, interval: float = 0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def save_profile(sampler: StackSampler, metadata: dict, profiles_dir: str = None) -> str:
+    """Writes the folded stacks plus a JSON sidecar with the request details; returns the profile name"""
+    profiles_dir = profiles_dir or default_profiles_dir()
+    os.makedirs(profiles_dir, exist_ok=True)
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", metadata.get("endpoint") or "request").strip("_")
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{slug}"
+
+    with open(os.path.join(profiles_dir, name + PROFILE_EXTENSION), "w") as f:
+        f.write(sampler.folded())
+
+    metadata = dict(
+        metadata,
+        samples=sampler.samples,
+        interval=sampler.interval,
+        duration=sampler.duration,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    with open(os.path.join(profiles_dir, name + METADATA_EXTENSION), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    return name
+
+
+def list_profiles(profiles_dir: str = None) -> List[dict]:
+    """Metadata of the stored profiles, newest first"""
+    profiles_dir = profiles_dir or default_profiles_dir()
+    if not os.path.isdir(profiles_dir):
+        return []
+
+    profiles = []
+    for filename in sorted(os.listdir(profiles_dir), reverse=True):
+        if not filename.endswith(PROFILE_EXTENSION):
+            continue
+        name = filename[: -len(PROFILE_EXTENSION)]
+        profiles.append(dict(load_metadata(name, profiles_dir) or {}, name=name))
+    return profiles
+
+
+def load_metadata(name: str, profiles_dir: str = None) -> Optional[dict]:
+    path = os.path.join(profiles_dir or default_profiles_dir(), name + METADATA_EXTENSION)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def summarise_profile(name: str, profiles_dir: str = None, top: int = 15) -> dict:
+    """
+    Hottest frames of a stored profile: ``self`` counts the samples in which a frame was
+    executing, ``total`` those in which it was anywhere on the stack.
+    """
+    path = os.path.join(profiles_dir or default_profiles_dir(), name + PROFILE_EXTENSION)
+    self_samples = Counter()
+    total_samples = Counter()
+    samples = 0
+
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if not stack:
+                continue
+            count = int(count)
+            frames = stack.split(";")
+            samples += count
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+
+    return {
+        "samples": samples,
+        "self": self_samples.most_common(top),
+        "total": total_samples.most_common(top),
+    }
@@ -1,14 +1,27 @@
 from typing import Generic, List, NoReturn, Optional, TypeVar, Union
 
 import app
+from core.database.database import reads_from
+from core.tracing.tracing import trace_methods
 
 T = TypeVar("T")
 
 
 class BaseRepository(Generic[T]):
-    def __init__(self, model: T):
+    def __init_subclass__(cls, **kwargs):
+        # Repository calls show up as spans of the request trace
+        super().__init_subclass__(**kwargs)
+        trace_methods(cls, "repository")
+
+    def __init__(self, model: T, read_replica: bool = False):
         self.model = model
         self.session = app.db.session
+        # Read-only lookups of read_replica repositories go to the replica when one is configured;
+        # update and delete always work on the primary's rows
+        self.read_replica = read_replica
+
+    def reading(self):
+        return reads_from(self.read_replica)
 
     def create(self, commit: bool = True, **kwargs) -> T:
         instance: T = self.model(**kwargs)
@@ -20,18 +33,21 @@ class BaseRepository(Generic[T]):
         return instance
 
     def get_by_id(self, id: int) -> Optional[T]:
-        instance: Optional[T] = self.model.query.get(id)
+        with self.reading():
+            instance: Optional[T] = self.model.query.get(id)
         return instance
 
     def get_by_column(self, column_name: str, value) -> List[T]:
-        instances: List[T] = self.session.query(self.model).filter(getattr(self.model, column_name) == value).all()
+        with self.reading():
+            instances: List[T] = self._filter_by_column(column_name, value)
         return instances
 
     def get_or_404(self, id: int) -> Union[T, NoReturn]:
-        return self.model.query.get_or_404(id)
+        with self.reading():
+            return self.model.query.get_or_404(id)
 
     def update(self, id: int, **kwargs) -> Optional[T]:
-        instance: Optional[T] = self.get_by_id(id)
+        instance: Optional[T] = self.session.get(self.model, id)
         if instance:
             for key, value in kwargs.items():
                 setattr(instance, key, value)
@@ -40,7 +56,7 @@ class BaseRepository(Generic[T]):
         return None
 
     def delete(self, id: int) -> bool:
-        instance: Optional[T] = self.get_by_id(id)
+        instance: Optional[T] = self.session.get(self.model, id)
         if instance:
             self.session.delete(instance)
             self.session.commit()
@@ -48,7 +64,7 @@ class BaseRepository(Generic[T]):
         return False
 
     def delete_by_column(self, column_name: str, value) -> bool:
-        instances: List[T] = self.get_by_column(column_name, value)
+        instances: List[T] = self._filter_by_column(column_name, value)
         if not instances:
             return False
 
@@ -58,4 +74,11 @@ class BaseRepository(Generic[T]):
         return True
 
     def count(self) -> int:
-        return self.model.query.count()
+        with self.reading():
+            return self.model.query.count()
+
+    def _filter_by_column(self, column_name: str, value) -> List[T]:
+        return self.session.query(self.model).filter(getattr(self.model, column_name) == value).all()
+
+
+trace_methods(BaseRepository, "repository")
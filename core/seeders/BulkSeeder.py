@@ -0,0 +1,478 @@
+import csv
+import hashlib
+import io
+import json
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.modules.dataset.models import (
+    PublicationType,
+    author_identity_key,
+    composition_columns,
+    ensure_tag_ids,
+    parse_tags,
+)
+from core.bench.generator import TAG_VOCABULARY, MaterialsCsvGenerator
+from core.configuration.configuration import uploads_folder_name
+from core.storage.storage import get_storage
+
+# Rows sent to the database per COPY / INSERT batch
+BATCH_SIZE = 50_000
+
+FIRST_NAMES = ["Ana", "Luis", "Marta", "Pablo", "Lucía", "Javier", "Elena", "Carlos", "Sara", "David", "Irene", "Hugo"]
+SURNAMES = ["García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Ruiz", "Díaz", "Moreno", "Romero", "Navarro"]
+AFFILIATIONS = [
+    "University of Seville",
+    "CSIC",
+    "MIT",
+    "ETH Zurich",
+    "Max Planck Institute",
+    "NIST",
+    "Tohoku University",
+]
+TOPICS = ["Oxide Ceramics", "Refractory Alloys", "Wide-Bandgap Semiconductors", "Thermoelectrics", "Battery Cathodes"]
+PUBLICATION_TYPES = ["JOURNAL_ARTICLE", "CONFERENCE_PAPER", "PREPRINT", "REPORT", "THESIS", "OTHER"]
+
+
+class BulkSeeder:
+    """
+    Production-sized catalogue for load tests and benchmarks.
+
+    ``scale`` 1 means 100 users and 1,000 datasets of ``records_per_dataset`` records
+    (1M records by default), each with two versions and ~10 views and ~3 downloads.
+    Rows get explicit ids after the current maximum of each table so dependent
+    tables can be generated without reading anything back, and are written with
+    COPY on PostgreSQL (batched INSERTs elsewhere). Tables that do not depend on
+    each other are loaded in parallel, one connection per worker.
+
+    Every value derives from ``seed``: two runs on empty databases produce the same rows.
+    The CSV files are shared between datasets: ``templates`` synthetic files (plus their
+    previous version) are stored once and referenced by many datasets, the same way
+    de-duplicated uploads share a file, so editing a seeded dataset copies it first.
+    """
+
+    def __init__(
+        self,
+        scale: float = 1.0,
+        seed: int = 0,
+        workers: int = 4,
+        records_per_dataset: int = 1000,
+        templates: int = 8,
+        echo: Callable = None,
+    ):
+        self.scale = scale
+        self.seed = seed
+        self.workers = max(workers, 1)
+        self.records_per_dataset = max(records_per_dataset, 1)
+        self.templates = max(templates, 1)
+        self.echo = echo or (lambda message: None)
+
+        self.users = max(int(100 * scale), 1)
+        self.datasets = max(int(1000 * scale), 1)
+        self.engine = db.engine
+        self.now = datetime(2025, 1, 1) + timedelta(days=seed % 365)
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random(":".join(str(part) for part in (self.seed,) + parts))
+
+    # Loading
+
+    def _next_id(self, table: str) -> int:
+        with self.engine.connect() as connection:
+            return connection.execute(db.text(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"')).scalar() + 1
+
+    def _copy(self, table: str, columns: List[str], rows: Iterable[Tuple]) -> int:
+        """Loads rows (tuples in ``columns`` order) into ``table``; returns how many were written"""
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                written += self._write_batch(table, columns, batch)
+                batch = []
+        if batch:
+            written += self._write_batch(table, columns, batch)
+        return written
+
+    def _write_batch(self, table: str, columns: List[str], batch: List[Tuple]) -> int:
+        if self.engine.dialect.name == "postgresql":
+            text = io.StringIO()
+            csv.writer(text).writerows(batch)
+            buffer = io.BytesIO(text.getvalue().encode("utf-8"))
+            connection = self.engine.raw_connection()
+            try:
+                with connection.cursor() as cursor:
+                    column_list = ", ".join(f'"{column}"' for column in columns)
+                    statement = f"COPY \"{table}\" ({column_list}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')"
+                    cursor.copy_expert(statement, buffer)
+                connection.commit()
+            finally:
+                connection.close()
+        else:
+            table_object = db.metadata.tables[table]
+            with self.engine.begin() as connection:
+                connection.execute(table_object.insert(), [dict(zip(columns, row)) for row in batch])
+        return len(batch)
+
+    def _parallel(self, tasks: List[Tuple[str, Callable]]):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(name, executor.submit(task)) for name, task in tasks]
+            for name, future in futures:
+                self.echo(f"  {name}: {future.result():,} rows")
+
+    def _reset_sequences(self, tables: List[str]):
+        if self.engine.dialect.name != "postgresql":
+            return
+        with self.engine.begin() as connection:
+            for table in tables:
+                connection.execute(
+                    db.text(
+                        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                        f'(SELECT COALESCE(MAX(id), 1) FROM "{table}"))'
+                    )
+                )
+
+    # Stored files
+
+    def _write_templates(self) -> List[dict]:
+        """Current and previous CSV of every template, with the records the current one holds"""
+        storage = get_storage()
+        templates = []
+        for index in range(self.templates):
+            generator = MaterialsCsvGenerator(materials=50, properties=12, seed=self.seed * 1000 + index)
+            previous_rows = list(generator.rows(self.records_per_dataset))
+            current_rows = [dict(row) for row in previous_rows]
+            for row in current_rows[::20]:
+                row["property_value"] = f"{float(row['property_value']) * 1.02:.6g}"
+
+            prefix = f"{uploads_folder_name()}/seed/{self.seed}"
+            template = {"rows": current_rows}
+            for name, rows in (("previous", previous_rows), ("current", current_rows)):
+                buffer = io.StringIO(newline="")
+                writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+                data = buffer.getvalue().encode("utf-8")
+
+                key = f"{prefix}/template_{index}_{name}.csv"
+                with storage.open_write(key) as stored:
+                    stored.write(data)
+                template[f"{name}_key"] = key
+                template[f"{name}_checksum"] = hashlib.sha256(data).hexdigest()
+            templates.append(template)
+        return templates
+
+    # Row generators
+
+    def _user_rows(self, first_id: int, password_hash: str) -> Iterator[Tuple]:
+        rng = self._rng("user")
+        for user_id in range(first_id, first_id + self.users):
+            created_at = self.now - timedelta(days=rng.randint(0, 1500))
+            yield user_id, f"user{user_id}@seed.materialshub.local", password_hash, created_at
+
+    def _profile_rows(self, first_user_id: int) -> Iterator[Tuple]:
+        rng = self._rng("profile")
+        for user_id in range(first_user_id, first_user_id + self.users):
+            yield user_id, rng.choice(FIRST_NAMES), rng.choice(SURNAMES), rng.choice(AFFILIATIONS)
+
+    def _metadata(self, index: int) -> dict:
+        """Metadata of the ``index``-th seeded dataset; also the base of its version snapshots"""
+        rng = self._rng("metadata", index)
+        tags = rng.sample(TAG_VOCABULARY, rng.randint(2, 4))
+        return {
+            "title": f"{rng.choice(TOPICS)} #{index}",
+            "description": f"Synthetic {', '.join(tags)} measurements for load testing (dataset {index}).",
+            "publication_type": rng.choice(PUBLICATION_TYPES),
+            # Explore only lists datasets with a DOI
+            "published": rng.random() < 0.8,
+            "tags": ", ".join(tags),
+            "authors": [
+                {"name": f"{rng.choice(SURNAMES)}, {rng.choice(FIRST_NAMES)}", "affiliation": rng.choice(AFFILIATIONS)}
+                for _ in range(rng.randint(1, 3))
+            ],
+        }
+
+    @staticmethod
+    def _doi(meta_data_id: int) -> str:
+        return f"10.1234/materialshub.seed.{meta_data_id}"
+
+    def _meta_data_rows(self, first_id: int) -> Iterator[Tuple]:
+        for index in range(self.datasets):
+            meta_data_id = first_id + index
+            metadata = self._metadata(index)
+            doi = self._doi(meta_data_id) if metadata["published"] else None
+            yield (
+                meta_data_id,
+                metadata["title"],
+                metadata["description"],
+                metadata["publication_type"],
+                doi,
+                metadata["tags"],
+            )
+
+    def _dataset_tag_rows(self, first_meta_data_id: int, tag_ids: dict) -> Iterator[Tuple]:
+        for index in range(self.datasets):
+            for name in parse_tags(self._metadata(index)["tags"]):
+                yield first_meta_data_id + index, tag_ids[name]
+
+    def _author_rows(self, first_meta_data_id: int) -> Iterator[Tuple]:
+        for index in range(self.datasets):
+            for author in self._metadata(index)["authors"]:
+                name = author["name"]
+                yield name, author["affiliation"], author_identity_key(name), first_meta_data_id + index
+
+    def _dataset_rows(self, first_id: int, first_user_id: int, first_meta_data_id: int, templates) -> Iterator[Tuple]:
+        rng = self._rng("dataset")
+        for index in range(self.datasets):
+            template = templates[index % len(templates)]
+            created_at = self.now - timedelta(days=rng.randint(0, 1000), seconds=rng.randint(0, 86400))
+            yield (
+                first_id + index,
+                first_user_id + rng.randrange(self.users),
+                first_meta_data_id + index,
+                created_at,
+                template["current_key"],
+                template["current_checksum"],
+            )
+
+    def _composition(self, formula: str, cache: dict) -> Tuple:
+        """composition and elements of a formula as COPY values (JSON text and an array literal)"""
+        if formula not in cache:
+            columns = composition_columns(formula)
+            if columns["composition"] is None:
+                cache[formula] = (None, None)
+            else:
+                elements = "{" + ",".join(str(number) for number in columns["elements"]) + "}"
+                cache[formula] = (json.dumps(columns["composition"]), elements)
+        return cache[formula]
+
+    def _record_rows(self, first_dataset_id: int, indexes: range, templates) -> Iterator[Tuple]:
+        compositions = {}
+        for index in indexes:
+            dataset_id = first_dataset_id + index
+            for row in templates[index % len(templates)]["rows"]:
+                yield (
+                    dataset_id,
+                    row["material_name"],
+                    row["chemical_formula"],
+                    row["structure_type"],
+                    row["composition_method"],
+                    row["property_name"],
+                    row["property_value"],
+                    row["property_unit"],
+                    row["temperature"] or None,
+                    row["pressure"] or None,
+                    row["data_source"].upper(),
+                    row["uncertainty"] or None,
+                    row["description"],
+                    *self._composition(row["chemical_formula"], compositions),
+                )
+
+    def _version_rows(
+        self, first_dataset_id: int, first_meta_data_id: int, first_user_id: int, templates
+    ) -> Iterator[Tuple]:
+        rng = self._rng("version")
+        for index in range(self.datasets):
+            template = templates[index % len(templates)]
+            metadata = self._metadata(index)
+            # Same shape as the snapshots create_version_snapshot() takes
+            snapshot = {
+                "title": metadata["title"],
+                "description": metadata["description"],
+                "publication_type": PublicationType[metadata["publication_type"]].value,
+                "publication_doi": None,
+                "dataset_doi": self._doi(first_meta_data_id + index) if metadata["published"] else None,
+                "tags": metadata["tags"],
+                "authors": [dict(author, orcid=None) for author in metadata["authors"]],
+            }
+            created_at = self.now - timedelta(days=rng.randint(30, 900))
+            user_id = first_user_id + rng.randrange(self.users)
+            for number, key, action in (
+                (1, template["previous_key"], "Initial dataset creation"),
+                (2, template["current_key"], "Revised property values"),
+            ):
+                changelog = {
+                    "action": action,
+                    "timestamp": created_at.isoformat(),
+                    "records_count": len(template["rows"]),
+                }
+                yield (
+                    first_dataset_id + index,
+                    number,
+                    created_at,
+                    user_id,
+                    key,
+                    json.dumps(snapshot),
+                    json.dumps(changelog),
+                    len(template["rows"]),
+                )
+                created_at += timedelta(days=rng.randint(1, 29))
+
+    def _event_rows(self, kind: str, average: int, first_dataset_id: int, first_user_id: int) -> Iterator[Tuple]:
+        rng = self._rng(kind)
+        for index in range(self.datasets):
+            for _ in range(rng.randint(0, 2 * average)):
+                user_id = first_user_id + rng.randrange(self.users) if rng.random() < 0.3 else None
+                date = self.now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+                yield user_id, first_dataset_id + index, date, str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    # Entry point
+
+    def run(self) -> dict:
+        self.echo(
+            f"Bulk seeding scale {self.scale}: {self.users:,} users, {self.datasets:,} datasets, "
+            f"{self.datasets * self.records_per_dataset:,} records (seed {self.seed}, {self.workers} workers)"
+        )
+        templates = self._write_templates()
+
+        first_user_id = self._next_id("user")
+        first_meta_data_id = self._next_id("ds_meta_data")
+        first_dataset_id = self._next_id("materials_dataset")
+        # Hashing is deliberately slow, so every seeded user shares the password "1234"
+        password_hash = generate_password_hash("1234")
+        # Tags are COPYed as dataset_tag rows, which bypasses the ORM hook that keeps them in sync
+        with self.engine.begin() as connection:
+            tag_ids = ensure_tag_ids(connection, parse_tags(",".join(TAG_VOCABULARY)))
+
+        self._parallel(
+            [
+                (
+                    "user",
+                    lambda: self._copy(
+                        "user", ["id", "email", "password", "created_at"], self._user_rows(first_user_id, password_hash)
+                    ),
+                ),
+                (
+                    "ds_meta_data",
+                    lambda: self._copy(
+                        "ds_meta_data",
+                        ["id", "title", "description", "publication_type", "dataset_doi", "tags"],
+                        self._meta_data_rows(first_meta_data_id),
+                    ),
+                ),
+            ]
+        )
+        self._parallel(
+            [
+                (
+                    "user_profile",
+                    lambda: self._copy(
+                        "user_profile", ["user_id", "name", "surname", "affiliation"], self._profile_rows(first_user_id)
+                    ),
+                ),
+                (
+                    "author",
+                    lambda: self._copy(
+                        "author",
+                        ["name", "affiliation", "identity_key", "ds_meta_data_id"],
+                        self._author_rows(first_meta_data_id),
+                    ),
+                ),
+                (
+                    "dataset_tag",
+                    lambda: self._copy(
+                        "dataset_tag",
+                        ["ds_meta_data_id", "tag_id"],
+                        self._dataset_tag_rows(first_meta_data_id, tag_ids),
+                    ),
+                ),
+                (
+                    "materials_dataset",
+                    lambda: self._copy(
+                        "materials_dataset",
+                        ["id", "user_id", "ds_meta_data_id", "created_at", "csv_file_path", "csv_checksum"],
+                        self._dataset_rows(first_dataset_id, first_user_id, first_meta_data_id, templates),
+                    ),
+                ),
+            ]
+        )
+
+        record_columns = [
+            "materials_dataset_id",
+            "material_name",
+            "chemical_formula",
+            "structure_type",
+            "composition_method",
+            "property_name",
+            "property_value",
+            "property_unit",
+            "temperature",
+            "pressure",
+            "data_source",
+            "uncertainty",
+            "description",
+            "composition",
+            "elements",
+        ]
+        event_columns = ["user_id", "dataset_id", "{kind}_date", "{kind}_cookie"]
+        # Records dominate, so they are split between the workers
+        chunk = -(-self.datasets // self.workers)
+        record_tasks = [
+            (
+                f"material_record [{start}:{min(start + chunk, self.datasets)}]",
+                lambda start=start: self._copy(
+                    "material_record",
+                    record_columns,
+                    self._record_rows(first_dataset_id, range(start, min(start + chunk, self.datasets)), templates),
+                ),
+            )
+            for start in range(0, self.datasets, chunk)
+        ]
+        self._parallel(
+            record_tasks
+            + [
+                (
+                    "dataset_version",
+                    lambda: self._copy(
+                        "dataset_version",
+                        [
+                            "materials_dataset_id",
+                            "version_number",
+                            "created_at",
+                            "created_by_user_id",
+                            "csv_snapshot_path",
+                            "metadata_snapshot",
+                            "changelog",
+                            "records_count",
+                        ],
+                        self._version_rows(first_dataset_id, first_meta_data_id, first_user_id, templates),
+                    ),
+                ),
+                (
+                    "ds_view_record",
+                    lambda: self._copy(
+                        "ds_view_record",
+                        [column.format(kind="view") for column in event_columns],
+                        self._event_rows("view", 10, first_dataset_id, first_user_id),
+                    ),
+                ),
+                (
+                    "ds_download_record",
+                    lambda: self._copy(
+                        "ds_download_record",
+                        [column.format(kind="download") for column in event_columns],
+                        self._event_rows("download", 3, first_dataset_id, first_user_id),
+                    ),
+                ),
+            ]
+        )
+
+        tables = [
+            "user",
+            "user_profile",
+            "ds_meta_data",
+            "author",
+            "materials_dataset",
+            "material_record",
+            "dataset_version",
+            "ds_view_record",
+            "ds_download_record",
+        ]
+        self._reset_sequences(tables)
+        return {"users": self.users, "datasets": self.datasets, "records": self.datasets * self.records_per_dataset}
@@ -1,7 +1,14 @@
 from flask import flash, redirect, render_template, url_for
 
+from core.tracing.tracing import trace_methods
+
 
 class BaseService:
+    def __init_subclass__(cls, **kwargs):
+        # Service calls show up as spans of the request trace
+        super().__init_subclass__(**kwargs)
+        trace_methods(cls, "service")
+
     def __init__(self, repository):
         self.repository = repository
 
@@ -32,3 +39,6 @@ class BaseService:
                 for error_message in error_messages:
                     flash(f"{error_field}: {error_message}", "error")
             return render_template(error_template, form=form)
+
+
+trace_methods(BaseService, "service")
@@ -0,0 +1,521 @@
+import io
+import os
+import shutil
+import uuid
+from typing import Iterable, List, Optional
+
+from flask import current_app, redirect, send_file
+
+from core.tracing.tracing import SPAN_KIND_CLIENT, span, start_span
+
+# Size of the blocks moved between the application and the storage backend
+CHUNK_SIZE = 64 * 1024
+
+
+class StorageWriter(io.RawIOBase):
+    """
+    Writable binary stream returned by ``BaseStorage.open_write``.
+
+    Data only becomes visible under its key once the writer is closed; ``abort()``
+    throws everything away. Used as a context manager, the writer aborts when the
+    block raises and commits otherwise.
+    """
+
+    def writable(self) -> bool:
+        return True
+
+    def commit(self):
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.commit()
+            finally:
+                super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            if not self.closed:
+                self.abort()
+                super().close()
+        else:
+            self.close()
+
+
+class _RawStreamReader(io.RawIOBase):
+    """Adapts any object with ``read(n)`` (e.g. a botocore StreamingBody) to RawIOBase"""
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.stream.read(len(buffer))
+        length = len(chunk)
+        buffer[:length] = chunk
+        return length
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+class _ConcatenatedReader(io.RawIOBase):
+    """Reads several stored objects one after another as a single stream"""
+
+    def __init__(self, storage: "BaseStorage", keys: Iterable[str]):
+        super().__init__()
+        self.storage = storage
+        self.keys = list(keys)
+        self.current = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self.current is None:
+                if not self.keys:
+                    return 0
+                self.current = self.storage.open_read(self.keys.pop(0))
+
+            length = self.current.readinto(buffer)
+            if length:
+                return length
+
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        super().close()
+
+
+class BaseStorage:
+    """
+    Object storage for uploaded CSVs, regenerated files and version snapshots.
+
+    Keys are '/'-separated paths such as ``uploads/materials_csv/versions/x.csv``.
+    """
+
+    def open_read(self, key: str) -> io.BufferedIOBase:
+        raise NotImplementedError
+
+    def open_write(self, key: str) -> StorageWriter:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def copy(self, source_key: str, destination_key: str):
+        with self.open_read(source_key) as source, self.open_write(destination_key) as destination:
+            shutil.copyfileobj(source, destination, CHUNK_SIZE)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        raise NotImplementedError
+
+    def open_read_many(self, keys: Iterable[str]) -> io.BufferedIOBase:
+        """Open several keys as one stream, in the given order"""
+        return io.BufferedReader(_ConcatenatedReader(self, keys), CHUNK_SIZE)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of a key, for backends that have one"""
+        return None
+
+    def presigned_url(self, key: str, expires_in: int = None, download_name: str = None) -> Optional[str]:
+        """Temporary direct download URL, for backends that support it"""
+        return None
+
+
+class LocalWriter(StorageWriter):
+    """Writes to a temporary file next to the target and renames it into place on commit"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self.file = open(self.temp_path, "wb")
+
+    def write(self, data) -> int:
+        return self.file.write(data)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class LocalStorage(BaseStorage):
+    """
+    Stores objects on the local filesystem under ``root`` (WORKING_DIR by default).
+
+    Absolute keys are used as-is so paths recorded before the storage layer existed keep working.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        if os.path.isabs(key):
+            return key
+        root = self.root if self.root is not None else os.getenv("WORKING_DIR", "")
+        return os.path.join(root, key)
+
+    def open_read(self, key: str) -> io.BufferedIOBase:
+        return open(self.path(key), "rb")
+
+    def open_write(self, key: str) -> StorageWriter:
+        return LocalWriter(self.path(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key: str):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        directory = self.path(prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(f"{prefix.rstrip('/')}/{name}" for name in os.listdir(directory) if not name.endswith(".tmp"))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return os.path.abspath(self.path(key))
+
+
+class S3Writer(StorageWriter):
+    """Streams data to S3 with a multipart upload, holding at most one part in memory"""
+
+    def __init__(self, storage: "S3Storage", key: str):
+        super().__init__()
+        self.storage = storage
+        self.key = key
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def write(self, data) -> int:
+        self.buffer.extend(data)
+        if len(self.buffer) >= self.storage.part_size:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        client = self.storage.client
+        if self.upload_id is None:
+            response = client.create_multipart_upload(Bucket=self.storage.bucket, Key=self.key)
+            self.upload_id = response["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = client.upload_part(
+            Bucket=self.storage.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer),
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer = bytearray()
+
+    def commit(self):
+        client = self.storage.client
+        if self.upload_id is None:
+            # Small object: a single PUT is enough
+            client.put_object(Bucket=self.storage.bucket, Key=self.key, Body=bytes(self.buffer))
+            return
+
+        if self.buffer:
+            self._upload_part()
+        client.complete_multipart_upload(
+            Bucket=self.storage.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.storage.client.abort_multipart_upload(
+                Bucket=self.storage.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        self.buffer = bytearray()
+
+
+class S3Storage(BaseStorage):
+    """Stores objects in an S3-compatible bucket (AWS S3, MinIO, ...)"""
+
+    # Multipart uploads require parts of at least 5 MiB (except the last one)
+    DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str = None,
+        region: str = None,
+        access_key_id: str = None,
+        secret_access_key: str = None,
+        presigned_url_expiration: int = 3600,
+        part_size: int = DEFAULT_PART_SIZE,
+    ):
+        import boto3
+
+        self.bucket = bucket
+        self.presigned_url_expiration = presigned_url_expiration
+        self.part_size = part_size
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+
+    def open_read(self, key: str) -> io.BufferedIOBase:
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        return io.BufferedReader(_RawStreamReader(body), CHUNK_SIZE)
+
+    def open_write(self, key: str) -> StorageWriter:
+        return S3Writer(self, key)
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def copy(self, source_key: str, destination_key: str):
+        self.client.copy({"Bucket": self.bucket, "Key": source_key}, self.bucket, destination_key)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        prefix = prefix.rstrip("/") + "/"
+        keys = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+        return sorted(keys)
+
+    def presigned_url(self, key: str, expires_in: int = None, download_name: str = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key}
+        if download_name:
+            params["ResponseContentDisposition"] = f'attachment; filename="{download_name}"'
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=expires_in or self.presigned_url_expiration
+        )
+
+
+class _TracedStream:
+    """Proxy of a stored object's stream whose span lasts until it is closed and records the bytes moved"""
+
+    def __init__(self, stream, span):
+        self._stream = stream
+        self._span = span
+        self._bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._stream)
+        self._bytes += len(line)
+        return line
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self._stream.__exit__(exc_type, exc, tb)
+        finally:
+            self._finish(exc)
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self._bytes += len(data)
+        return data
+
+    def read1(self, *args):
+        data = self._stream.read1(*args)
+        self._bytes += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self._bytes += len(data)
+        return data
+
+    def readinto(self, buffer):
+        length = self._stream.readinto(buffer)
+        self._bytes += length or 0
+        return length
+
+    def write(self, data):
+        length = self._stream.write(data)
+        self._bytes += length or 0
+        return length
+
+    def abort(self):
+        try:
+            self._stream.abort()
+        finally:
+            self._finish()
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._finish()
+
+    def _finish(self, error=None):
+        if self._span is not None:
+            self._span.set_attribute("storage.bytes", self._bytes)
+            self._span.end(error)
+            self._span = None
+
+
+class TracedStorage(BaseStorage):
+    """Wraps a backend so reads, writes and other calls are recorded as spans of the request trace"""
+
+    def __init__(self, backend: BaseStorage):
+        self.backend = backend
+        self.backend_name = type(backend).__name__
+
+    def _span(self, operation: str, key: str):
+        attributes = {"storage.backend": self.backend_name, "storage.key": key}
+        return span(f"storage.{operation}", "storage", SPAN_KIND_CLIENT, attributes)
+
+    def _stream(self, operation: str, key: str, opener):
+        attributes = {"storage.backend": self.backend_name, "storage.key": key}
+        stream_span = start_span(f"storage.{operation}", "storage", SPAN_KIND_CLIENT, attributes)
+        try:
+            stream = opener(key)
+        except Exception as e:
+            if stream_span is not None:
+                stream_span.end(e)
+            raise
+        return stream if stream_span is None else _TracedStream(stream, stream_span)
+
+    def open_read(self, key: str) -> io.BufferedIOBase:
+        return self._stream("read", key, self.backend.open_read)
+
+    def open_write(self, key: str) -> StorageWriter:
+        return self._stream("write", key, self.backend.open_write)
+
+    def exists(self, key: str) -> bool:
+        with self._span("exists", key):
+            return self.backend.exists(key)
+
+    def size(self, key: str) -> int:
+        with self._span("size", key):
+            return self.backend.size(key)
+
+    def delete(self, key: str):
+        with self._span("delete", key):
+            return self.backend.delete(key)
+
+    def copy(self, source_key: str, destination_key: str):
+        with self._span("copy", source_key) as copy_span:
+            if copy_span is not None:
+                copy_span.set_attribute("storage.destination_key", destination_key)
+            return self.backend.copy(source_key, destination_key)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        with self._span("list", prefix):
+            return self.backend.list_keys(prefix)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self.backend.local_path(key)
+
+    def presigned_url(self, key: str, expires_in: int = None, download_name: str = None) -> Optional[str]:
+        return self.backend.presigned_url(key, expires_in, download_name)
+
+
+def create_storage(config) -> BaseStorage:
+    """Build the storage backend selected by STORAGE_BACKEND ('local' or 's3')"""
+    backend = (config.get("STORAGE_BACKEND") or "local").lower()
+
+    if backend == "s3":
+        return S3Storage(
+            bucket=config["S3_BUCKET"],
+            endpoint_url=config.get("S3_ENDPOINT_URL"),
+            region=config.get("S3_REGION"),
+            access_key_id=config.get("S3_ACCESS_KEY_ID"),
+            secret_access_key=config.get("S3_SECRET_ACCESS_KEY"),
+            presigned_url_expiration=config.get("S3_PRESIGNED_URL_EXPIRATION", 3600),
+        )
+
+    if backend == "local":
+        return LocalStorage(config.get("STORAGE_LOCAL_ROOT"))
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_storage() -> BaseStorage:
+    """Storage backend of the current app, created on first use"""
+    storage = current_app.extensions.get("storage")
+    if storage is None:
+        storage = create_storage(current_app.config)
+        if current_app.config.get("TRACING_ENABLED"):
+            storage = TracedStorage(storage)
+        current_app.extensions["storage"] = storage
+    return storage
+
+
+def send_stored_file(key: str, download_name: str = None):
+    """
+    Response that downloads a stored object: served directly by local backends,
+    redirected to a presigned URL by remote ones so the web node never proxies the bytes.
+    """
+    storage = get_storage()
+    download_name = download_name or os.path.basename(key)
+
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        return send_file(local_path, as_attachment=True, download_name=download_name)
+
+    return redirect(storage.presigned_url(key, download_name=download_name))
@@ -2,6 +2,9 @@
 Unit tests for core module (BaseRepository and BaseService).
 """
 
+import os
+import shutil
+
 import pytest
 
 from app import db
@@ -347,3 +350,568 @@ def test_base_seeder_seed_integrity_error(test_client):
 
     with pytest.raises(Exception, match="Failed to insert data into `user` table"):
         seeder.seed([user2])
+
+
+@pytest.mark.unit
+def test_local_storage_write_read_and_list(tmp_path):
+    """Test LocalStorage round trip, atomic writes and key listing."""
+    from core.storage.storage import LocalStorage
+
+    storage = LocalStorage(str(tmp_path))
+
+    with storage.open_write("uploads/a/0001") as f:
+        f.write(b"hello ")
+    with storage.open_write("uploads/a/0002") as f:
+        f.write(b"world")
+
+    assert storage.exists("uploads/a/0001")
+    assert storage.size("uploads/a/0002") == 5
+    assert storage.list_keys("uploads/a") == ["uploads/a/0001", "uploads/a/0002"]
+    with storage.open_read_many(storage.list_keys("uploads/a")) as f:
+        assert f.read() == b"hello world"
+
+    # A failed write leaves nothing behind
+    with pytest.raises(RuntimeError):
+        with storage.open_write("uploads/a/0003") as f:
+            f.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert not storage.exists("uploads/a/0003")
+    assert storage.list_keys("uploads/a") == ["uploads/a/0001", "uploads/a/0002"]
+
+    storage.copy("uploads/a/0001", "uploads/b/copy")
+    with storage.open_read("uploads/b/copy") as f:
+        assert f.read() == b"hello "
+
+    storage.delete("uploads/a/0001")
+    assert not storage.exists("uploads/a/0001")
+    assert storage.local_path("uploads/b/copy") == str(tmp_path / "uploads" / "b" / "copy")
+
+
+@pytest.mark.unit
+def test_s3_storage_multipart_write_and_presigned_url():
+    """Test S3Storage against a mocked bucket, including multipart uploads."""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    from core.storage.storage import S3Storage
+
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="materials")
+        storage = S3Storage(
+            "materials",
+            region="us-east-1",
+            access_key_id="test",
+            secret_access_key="test",
+            part_size=5 * 1024 * 1024,  # smallest part size S3 accepts
+        )
+
+        # Larger than one part, so it goes through a multipart upload
+        data = bytes(range(256)) * (storage.part_size // 256 + 10)
+        with storage.open_write("uploads/big.csv") as f:
+            for offset in range(0, len(data), 1024 * 1024):
+                f.write(data[offset : offset + 1024 * 1024])
+
+        assert storage.exists("uploads/big.csv")
+        assert not storage.exists("uploads/missing.csv")
+        assert storage.size("uploads/big.csv") == len(data)
+        with storage.open_read("uploads/big.csv") as f:
+            assert f.read() == data
+
+        with storage.open_write("uploads/small.csv") as f:
+            f.write(b"a,b\n1,2\n")
+        storage.copy("uploads/small.csv", "uploads/versions/small_v1.csv")
+        assert storage.list_keys("uploads/versions") == ["uploads/versions/small_v1.csv"]
+
+        storage.delete("uploads/small.csv")
+        assert not storage.exists("uploads/small.csv")
+
+        url = storage.presigned_url("uploads/big.csv", download_name="big.csv")
+        assert "materials" in url and "uploads/big.csv" in url and "Signature" in url
+
+
+@pytest.fixture
+def replica_database_url(test_client):
+    """URL of a second local database acting as read replica; the test is skipped if it does not exist."""
+    import sqlalchemy as sa
+
+    primary_url = sa.make_url(test_client.application.config["SQLALCHEMY_DATABASE_URI"])
+    replica_url = primary_url.set(database=os.getenv("POSTGRES_REPLICA_TEST_DATABASE", "materialhub_test_replica"))
+
+    engine = sa.create_engine(replica_url)
+    try:
+        with engine.connect():
+            pass
+    except sa.exc.OperationalError:
+        pytest.skip(f"Replica test database '{replica_url.database}' is not available")
+    finally:
+        engine.dispose()
+
+    return replica_url.render_as_string(hide_password=False)
+
+
+@pytest.mark.unit
+def test_config_manager_adds_replica_bind(monkeypatch):
+    """Test that a configured replica URL becomes the 'replica' bind."""
+    from flask import Flask
+
+    from core.managers.config_manager import ConfigManager, TestingConfig
+
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_REPLICA_URI", "postgresql+psycopg2://replica/db")
+    flask_app = Flask(__name__)
+    ConfigManager(flask_app).load_config("testing")
+
+    assert flask_app.config["SQLALCHEMY_BINDS"] == {"replica": "postgresql+psycopg2://replica/db"}
+    assert flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_pre_ping"] is True
+
+
+@pytest.mark.unit
+def test_replica_reads_routing(test_client, replica_database_url):
+    """Test that replica_reads() sends plain SELECTs to the replica and everything else to the primary."""
+    import sqlalchemy as sa
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+    from core.database.database import RoutingSession, get_pool_statistics, replica_reads
+
+    metadata = sa.MetaData()
+    probe = sa.Table("routing_probe", metadata, sa.Column("name", sa.String(20)))
+
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = test_client.application.config["SQLALCHEMY_DATABASE_URI"]
+    flask_app.config["SQLALCHEMY_BINDS"] = {"replica": replica_database_url}
+    routed_db = SQLAlchemy(session_options={"class_": RoutingSession})
+    routed_db.init_app(flask_app)
+
+    with flask_app.app_context():
+        primary, replica = routed_db.engines[None], routed_db.engines["replica"]
+        for engine, name in ((primary, "primary"), (replica, "replica")):
+            metadata.drop_all(engine)
+            metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(probe.insert().values(name=name))
+
+        try:
+            count_rows = sa.select(sa.func.count()).select_from(probe)
+
+            assert routed_db.session.execute(sa.select(probe.c.name)).scalar() == "primary"
+            with replica_reads():
+                assert routed_db.session.execute(sa.select(probe.c.name)).scalar() == "replica"
+                # Locking reads and writes stay on the primary
+                assert routed_db.session.execute(sa.select(probe.c.name).with_for_update()).scalar() == "primary"
+                routed_db.session.execute(probe.insert().values(name="written"))
+            routed_db.session.commit()
+
+            with primary.connect() as conn:
+                assert conn.execute(count_rows).scalar() == 2
+            with replica.connect() as conn:
+                assert conn.execute(count_rows).scalar() == 1
+
+            assert set(get_pool_statistics()) == {"primary", "replica"}
+        finally:
+            routed_db.session.remove()
+            for engine in (primary, replica):
+                metadata.drop_all(engine)
+                engine.dispose()
+
+
+@pytest.mark.unit
+def test_module_manager_skips_disabled_modules():
+    """Test that modules listed in DISABLED_MODULES are treated like .moduleignore entries."""
+    from flask import Flask
+
+    from core.managers.module_manager import ModuleManager
+
+    flask_app = Flask(__name__)
+    flask_app.config["DISABLED_MODULES"] = ["team"]
+
+    loaded_modules, ignored_modules = ModuleManager(flask_app).get_modules()
+
+    assert "team" in ignored_modules
+    assert "team" not in loaded_modules
+    assert "public" in loaded_modules
+
+
+@pytest.mark.unit
+def test_profiling_manager_profiles_authorised_requests_only(tmp_path):
+    """Test that only requests carrying the profiling token are sampled and stored."""
+    import time
+
+    from flask import Flask
+
+    from core.managers.profiling_manager import ProfilingManager
+    from core.profiling.profiler import list_profiles, summarise_profile
+
+    app = Flask(__name__)
+    app.config.update(PROFILING_TOKEN="secret", PROFILING_INTERVAL=0.001, PROFILES_DIR=str(tmp_path))
+
+    def busy_view():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return "done"
+
+    app.add_url_rule("/busy", "busy", busy_view)
+    ProfilingManager(app).register_profiling()
+    client = app.test_client()
+
+    assert client.get("/busy").status_code == 200
+    assert client.get("/busy", headers={"X-Profile": "wrong"}).status_code == 200
+    assert list_profiles(str(tmp_path)) == []
+
+    assert client.get("/busy?_profile=secret&page=2").status_code == 200
+    profiles = list_profiles(str(tmp_path))
+    assert len(profiles) == 1
+    assert profiles[0]["path"] == "/busy?page=2"
+    assert profiles[0]["status"] == 200
+
+    summary = summarise_profile(profiles[0]["name"], str(tmp_path))
+    assert summary["samples"] > 0
+    assert any(frame.startswith("busy_view ") for frame, _ in summary["self"])
+
+
+@pytest.mark.unit
+def test_profiling_manager_disabled_without_token():
+    """Test that no request hooks are installed when no profiling token is configured."""
+    from flask import Flask
+
+    from core.managers.profiling_manager import ProfilingManager
+
+    app = Flask(__name__)
+    ProfilingManager(app).register_profiling()
+    assert not app.before_request_funcs and not app.teardown_request_funcs
+
+
+@pytest.mark.unit
+def test_memory_manager_flags_requests_over_budget():
+    """Test that memory tracking records per-endpoint peaks and flags requests over the budget."""
+    from flask import Flask
+
+    from core.managers.memory_manager import MemoryManager
+
+    app = Flask(__name__)
+    app.config.update(
+        MEMORY_TRACKING_ENABLED=True,
+        MEMORY_BUDGET_MB=1,
+        MEMORY_TRACKING_TOP=10,
+        MEMORY_TRACKING_FRAMES=10,
+        MEMORY_TRACKING_HISTORY=50,
+    )
+    retained = []
+
+    def small_view():
+        return "ok"
+
+    def large_view():
+        rows = [{"id": i, "name": f"material-{i}"} for i in range(20000)]
+        retained.append(rows)  # still held after the request, so it shows up in the allocation sites
+        return str(len(rows))
+
+    app.add_url_rule("/small", "small", small_view)
+    app.add_url_rule("/large", "large", large_view)
+    MemoryManager(app).register_memory_tracking()
+    client = app.test_client()
+
+    assert client.get("/small").status_code == 200
+    assert client.get("/large").status_code == 200
+
+    report = client.get("/debug/memory").json
+    endpoints = {stats["endpoint"]: stats for stats in report["endpoints"]}
+    assert endpoints["large"]["over_budget"] == 1
+    assert endpoints["large"]["max_peak_bytes"] > 1024 * 1024
+    assert endpoints["small"]["over_budget"] == 0
+
+    flagged = report["over_budget"][0]
+    assert flagged["path"] == "/large"
+    assert "test_unit.py" in flagged["top_sites"][0]["site"]
+
+
+@pytest.mark.unit
+def test_tracing_manager_records_nested_spans(tmp_path):
+    """Test that a traced request exports its service, SQL and storage spans as OTLP/JSON lines."""
+    import io
+
+    from click.testing import CliRunner
+    from flask import Flask
+    from sqlalchemy import create_engine, text
+
+    from core.managers.tracing_manager import TracingManager
+    from core.storage.storage import LocalStorage, TracedStorage
+    from core.tracing.tracing import read_traces, traced_class
+    from rosemary.commands.trace import trace_show
+
+    engine = create_engine("sqlite://")
+    storage = TracedStorage(LocalStorage(str(tmp_path)))
+
+    @traced_class("service")
+    class ReportService:
+        def build(self):
+            with engine.connect() as connection:
+                value = connection.execute(text("SELECT 42")).scalar()
+            with storage.open_write("reports/report.csv") as stored:
+                with io.TextIOWrapper(stored, encoding="utf-8", newline="", write_through=True) as text_stream:
+                    text_stream.write(f"value\n{value}\n")
+            with storage.open_read("reports/report.csv") as stored:
+                return stored.read().decode()
+
+    traces_file = tmp_path / "traces.jsonl"
+    app = Flask(__name__)
+    app.config.update(TRACING_ENABLED=True, TRACES_FILE=str(traces_file))
+    app.add_url_rule("/report", "report", lambda: ReportService().build())
+    TracingManager(app).register_tracing()
+
+    response = app.test_client().get("/report")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == "value\n42\n"
+
+    spans = read_traces(str(traces_file))[-1]
+    assert {span["traceId"] for span in spans} == {response.headers["X-Trace-Id"]}
+    by_name = {span["name"]: span for span in spans}
+    assert set(by_name) == {"GET /report", "ReportService.build", "db.SELECT", "storage.write", "storage.read"}
+
+    service = by_name["ReportService.build"]
+    assert service["parentSpanId"] == by_name["GET /report"]["spanId"]
+    for name in ("db.SELECT", "storage.write", "storage.read"):
+        assert by_name[name]["parentSpanId"] == service["spanId"]
+    write_bytes = {a["key"]: a["value"] for a in by_name["storage.write"]["attributes"]}["storage.bytes"]
+    assert write_bytes == {"intValue": "9"}
+
+    result = CliRunner().invoke(trace_show, ["--file", str(traces_file)])
+    assert result.exit_code == 0
+    assert "ReportService.build" in result.output
+
+
+@pytest.mark.unit
+def test_metrics_query_listeners_observe_failing_statements():
+    """Test that a failing statement is timed and leaves no start time on its pooled connection."""
+    from prometheus_client import REGISTRY
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    from core.managers.metrics_manager import MetricsManager
+
+    MetricsManager._install_query_listeners()
+    engine = create_engine("sqlite://")
+
+    def observed():
+        return REGISTRY.get_sample_value("materialshub_db_query_duration_seconds_count")
+
+    before = observed()
+    with engine.connect() as connection:
+        for _ in range(5):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.rollback()
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+        assert not connection.connection.info.get("metrics_query_start")
+
+    assert observed() == before + 6
+
+
+@pytest.mark.unit
+def test_materials_csv_generator_is_deterministic():
+    """Test that the synthetic CSV generator honours its parameters and seed."""
+    import csv
+    import io
+
+    from core.bench.generator import CSV_COLUMNS, MaterialsCsvGenerator
+
+    generator = MaterialsCsvGenerator(materials=5, properties=3, distribution="normal", seed=7)
+    data = generator.to_bytes(60)
+    assert data == MaterialsCsvGenerator(materials=5, properties=3, distribution="normal", seed=7).to_bytes(60)
+
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert list(rows[0]) == CSV_COLUMNS
+    assert len(rows) == 60
+    assert len({row["material_name"] for row in rows}) == 5
+    assert len({row["property_name"] for row in rows}) == 3
+
+    with pytest.raises(ValueError):
+        MaterialsCsvGenerator(distribution="bimodal")
+
+
+@pytest.mark.unit
+def test_benchmark_suite_runs_and_cleans_up(test_client):
+    """Test that every benchmark runs at a small scale and leaves no data behind."""
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import MaterialsDataset
+    from core.bench.generator import MaterialsCsvGenerator
+    from core.bench.suite import BENCHMARKS, BenchmarkSuite, compare_results
+    from core.storage.storage import get_storage
+
+    suite = BenchmarkSuite(MaterialsCsvGenerator(materials=10, properties=4), repeat=2)
+    results = suite.run([100])
+
+    assert set(results["results"]) == set(BENCHMARKS)
+    for by_scale in results["results"].values():
+        assert len(by_scale["100"]["runs"]) == 2
+        assert by_scale["100"]["median"] > 0
+
+    assert MaterialsDataset.query.count() == 0
+    assert User.query.filter(User.email.like("bench-%")).count() == 0
+    assert get_storage().list_keys(suite.prefix) == []
+
+    slower = {
+        "results": {"parse_csv_file": {"100": {"median": results["results"]["parse_csv_file"]["100"]["median"] / 2}}}
+    }
+    comparison = compare_results(results, slower, threshold=0.25)
+    assert comparison == [
+        {
+            "benchmark": "parse_csv_file",
+            "scale": "100",
+            "baseline": slower["results"]["parse_csv_file"]["100"]["median"],
+            "current": results["results"]["parse_csv_file"]["100"]["median"],
+            "ratio": 2.0,
+            "regression": True,
+        }
+    ]
+
+
+@pytest.mark.unit
+def test_bulk_seeder_loads_scaled_catalogue(test_client):
+    """Test that bulk seeding loads every table at the requested scale and leaves the sequences usable."""
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import DatasetVersion, MaterialRecord, MaterialsDataset
+    from core.configuration.configuration import uploads_folder_name
+    from core.seeders.BulkSeeder import BulkSeeder
+    from core.storage.storage import get_storage
+
+    users_before = User.query.count()
+    seeder = BulkSeeder(scale=0.02, seed=7, workers=2, records_per_dataset=30, templates=2)
+    counts = seeder.run()
+
+    assert counts == {"users": 2, "datasets": 20, "records": 600}
+    assert User.query.count() == users_before + 2
+    assert MaterialsDataset.query.count() == 20
+    assert MaterialRecord.query.count() == 600
+    assert DatasetVersion.query.count() == 40
+
+    dataset = MaterialsDataset.query.order_by(MaterialsDataset.id).first()
+    assert len(dataset.material_records) == 30
+    assert dataset.csv_checksum is not None
+    assert get_storage().exists(dataset.csv_file_path)
+
+    # Rows were loaded with explicit ids, so this insert fails unless the sequence was moved past them
+    user = User(email="after-bulk-seed@example.com", password="test1234")
+    db.session.add(user)
+    db.session.commit()
+    assert user.id == users_before + 3
+
+    # Same seed, same data
+    again = BulkSeeder(scale=0.02, seed=7, workers=2, records_per_dataset=30, templates=2)
+    assert list(again._meta_data_rows(1)) == list(seeder._meta_data_rows(1))
+    assert list(again._event_rows("view", 10, 1, 1)) == list(seeder._event_rows("view", 10, 1, 1))
+
+    storage = get_storage()
+    for key in storage.list_keys(f"{uploads_folder_name()}/seed/7"):
+        storage.delete(key)
+    local_directory = storage.local_path(f"{uploads_folder_name()}/seed")
+    if local_directory:
+        shutil.rmtree(local_directory, ignore_errors=True)
+
+
+@pytest.mark.unit
+def test_perf_gate_checks_slos_and_baseline(tmp_path):
+    """Test that the Locust gate reads SLOs and stats and flags breaches and regressions."""
+    from core.locust.gate import MIN_REQUESTS_FOR_COMPARISON, check_slos, compare_with_baseline, load_slos, read_stats
+
+    locustfile = tmp_path / "locustfile.py"
+    locustfile.write_text('import missing_module\nSLOS = {"/explore": {"p95": 100, "error_rate": 0.01}}\n')
+    slos = load_slos(str(locustfile))
+    assert slos == {"/explore": {"p95": 100, "error_rate": 0.01}}
+
+    stats_csv = tmp_path / "gate_stats.csv"
+    stats_csv.write_text(
+        "Type,Name,Request Count,Failure Count,Median Response Time,50%,95%,99%\n"
+        "GET,/explore,100,2,40,40,180,250\n"
+        ",Aggregated,100,2,40,40,180,250\n"
+    )
+    endpoints = read_stats(str(stats_csv))
+    assert endpoints["GET /explore"]["error_rate"] == 0.02
+
+    breaches = {(row["metric"], row["breach"]) for row in check_slos(endpoints, slos)}
+    assert breaches == {("p95", True), ("error_rate", True)}
+
+    current = {"endpoints": endpoints}
+    baseline = {"endpoints": {"GET /explore": dict(endpoints["GET /explore"], p95=90)}}
+    (row,) = [row for row in compare_with_baseline(current, baseline) if row["endpoint"] == "GET /explore"]
+    assert row["ratio"] == 2.0 and row["regression"]
+
+    baseline["endpoints"]["GET /explore"]["requests"] = MIN_REQUESTS_FOR_COMPARISON - 1
+    (row,) = [row for row in compare_with_baseline(current, baseline) if row["endpoint"] == "GET /explore"]
+    assert not row["regression"]
+
+
+@pytest.mark.unit
+def test_compiled_serializer_matches_serializer_and_encodes_json(test_client):
+    """Test that CompiledSerializer gives Serializer's output and encodes datetimes and enums."""
+    import json
+    from datetime import datetime
+
+    from app.modules.dataset.models import DataSource, MaterialRecord
+    from core.serialisers.compiled_serializer import CompiledSerializer
+    from core.serialisers.serializer import Serializer
+
+    class Card:
+        def __init__(self, created_at):
+            self.created_at = created_at
+            self.extra = lambda: "computed"
+
+        def get_label(self):
+            return f"card {self.created_at.year}"
+
+    fields = {"created": "created_at", "label": "get_label", "extra": "extra", "missing": "missing"}
+    card = Card(datetime(2024, 5, 1, 12, 30))
+    compiled = CompiledSerializer(fields)
+    assert compiled.serialize(card) == Serializer(fields).serialize(card)
+    assert compiled.serialize(card)["extra"] == "computed"
+
+    record = MaterialRecord(
+        id=7, material_name="Si", property_name="band_gap", property_value="1.1", data_source=DataSource.EXPERIMENTAL
+    )
+    record_fields = {key: key for key in ("id", "material_name", "property_value", "data_source")}
+    payload = json.loads(CompiledSerializer(record_fields).encode(record))
+    assert payload == {"id": 7, "material_name": "Si", "property_value": "1.1", "data_source": "experimental"}
+    assert json.loads(compiled.encode(card))["created"] == "2024-05-01T12:30:00"
+
+
+@pytest.mark.unit
+def test_compression_manager_negotiates_and_streams():
+    """Test that responses are compressed with the negotiated coding, over the size threshold and when streamed."""
+    import gzip
+    import json
+
+    import brotli
+    import zstandard
+    from flask import Flask, Response, jsonify
+
+    from core.managers.compression_manager import CompressionManager
+
+    app = Flask(__name__)
+    app.config.update(COMPRESSION_MIN_SIZE=512)
+    records = [{"id": i, "material_name": "Material-00001", "property_name": "density"} for i in range(500)]
+
+    app.add_url_rule("/records", "records", lambda: jsonify(records))
+    app.add_url_rule("/small", "small", lambda: jsonify({"ok": True}))
+    app.add_url_rule("/image", "image", lambda: Response(b"\x89PNG" * 1000, mimetype="image/png"))
+    app.add_url_rule("/stream", "stream", lambda: Response((f"row-{i}\n" for i in range(2000)), mimetype="text/csv"))
+    CompressionManager(app).register_compression()
+    client = app.test_client()
+    plain = client.get("/records")
+    assert "Content-Encoding" not in plain.headers and "Accept-Encoding" in plain.headers["Vary"]
+
+    decoders = {"br": brotli.decompress, "gzip": gzip.decompress}
+    decoders["zstd"] = lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    for accept, expected in (("gzip, br", "br"), ("gzip;q=1.0, zstd;q=0.5", "gzip"), ("zstd", "zstd")):
+        response = client.get("/records", headers={"Accept-Encoding": accept})
+        assert response.headers["Content-Encoding"] == expected
+        assert len(response.data) * 10 < len(plain.data)
+        assert json.loads(decoders[expected](response.data)) == records
+
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "br"}).headers
+    assert "Content-Encoding" not in client.get("/image", headers={"Accept-Encoding": "br"}).headers
+    assert "Content-Encoding" not in client.get("/records", headers={"Accept-Encoding": "br;q=0, deflate"}).headers
+
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["Content-Encoding"] == "gzip" and "Content-Length" not in streamed.headers
+    assert gzip.decompress(streamed.data).decode() == "".join(f"row-{i}\n" for i in range(2000))
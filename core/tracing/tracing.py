@@ -0,0 +1,257 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Spans recorded for one request; at most ``max_spans`` are kept"""
+
+    def __init__(self, trace_id: str = None, max_spans: int = 10000):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.max_spans = max_spans
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+    def add(self, span: "Span") -> bool:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return False
+        self.spans.append(span)
+        return True
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_span_id",
+        "name",
+        "kind",
+        "layer",
+        "attributes",
+        "start",
+        "end_time",
+        "status",
+    )
+
+    def __init__(self, trace: Trace, name: str, kind: int, layer: str, parent_span_id: str = None, attributes=None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.layer = layer
+        self.attributes = dict(attributes or {})
+        self.start = time.time_ns()
+        self.end_time = None
+        self.status = (STATUS_OK, None)
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, error: BaseException = None):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        if error is not None:
+            self.status = (STATUS_ERROR, f"{type(error).__name__}: {error}")
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time or time.time_ns()) - self.start) / 1e6
+
+    def to_otlp(self) -> dict:
+        attributes = dict(self.attributes, **{"materialshub.layer": self.layer})
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end_time or time.time_ns()),
+            "attributes": [_otlp_attribute(key, value) for key, value in attributes.items() if value is not None],
+            "status": {"code": self.status[0]},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status[1]:
+            span["status"]["message"] = self.status[1]
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace id, parent span id) of a W3C traceparent header, or (None, None)"""
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None, None
+    return parts[1], parts[2]
+
+
+def start_trace(name: str, traceparent: str = None, max_spans: int = 10000, attributes=None):
+    """Starts the root span of a request and makes it current; returns (span, token for end_trace)"""
+    trace_id, parent_span_id = parse_traceparent(traceparent)
+    trace = Trace(trace_id, max_spans=max_spans)
+    span = Span(trace, name, SPAN_KIND_SERVER, "http", parent_span_id, attributes)
+    trace.add(span)
+    return span, _current_span.set(span)
+
+
+def end_trace(span: Span, token, error: BaseException = None) -> Trace:
+    span.end(error)
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Ended from another context than the one that started it
+        _current_span.set(None)
+    return span.trace
+
+
+def start_span(name: str, layer: str, kind: int = SPAN_KIND_INTERNAL, attributes=None) -> Optional[Span]:
+    """Child of the current span that is not made current itself (for leaves such as SQL statements)"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = Span(parent.trace, name, kind, layer, parent.span_id, attributes)
+    return span if parent.trace.add(span) else None
+
+
+@contextmanager
+def span(name: str, layer: str, kind: int = SPAN_KIND_INTERNAL, attributes=None):
+    """Records the block as a child of the current span; does nothing outside a trace"""
+    child = start_span(name, layer, kind, attributes)
+    if child is None:
+        yield None
+        return
+
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.end(e)
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def traced(layer: str):
+    """Decorator recording each call of a method as a '<Class>.<method>' span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            owner = type(args[0]).__name__ if args else func.__module__
+            with span(f"{owner}.{func.__name__}", layer, attributes={"code.function": func.__qualname__}):
+                return func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls, layer: str):
+    """Wraps the public methods defined on ``cls`` with ``traced``"""
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(attribute) or getattr(attribute, "__traced__", False):
+            continue
+        setattr(cls, name, traced(layer)(attribute))
+    return cls
+
+
+def traced_class(layer: str):
+    """Class decorator form of ``trace_methods``"""
+    return lambda cls: trace_methods(cls, layer)
+
+
+class JsonLinesExporter:
+    """
+    Appends each finished trace to a file as one OTLP/JSON ``ExportTraceServiceRequest``
+    per line, the format read by the OpenTelemetry Collector's otlpjsonfile receiver.
+    """
+
+    def __init__(self, path: str, service_name: str = "materialshub"):
+        self.path = path
+        self.service_name = service_name
+        self.lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        scope = {"name": "materialshub.tracing"}
+        if trace.dropped:
+            scope["attributes"] = [_otlp_attribute("materialshub.dropped_spans", trace.dropped)]
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": scope, "spans": [span.to_otlp() for span in trace.spans]}],
+                }
+            ]
+        }
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+def read_traces(path: str) -> List[List[dict]]:
+    """Spans of every trace in a JSON lines file written by JsonLinesExporter, oldest first"""
+    traces = []
+    if not os.path.exists(path):
+        return traces
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            spans = []
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    spans.extend(scope_spans.get("spans", []))
+            if spans:
+                traces.append(spans)
+    return traces
@@ -54,6 +54,11 @@ else
     flask db upgrade
 fi
 
+# Gunicorn workers write their Prometheus samples here so /metrics aggregates all of them
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Start the application using Gunicorn, binding it to port 5000
 # Set the logging level to info and the timeout to 3600 seconds
 exec gunicorn --bind 0.0.0.0:5000 app:app --log-level info --timeout 3600
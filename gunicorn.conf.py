@@ -0,0 +1,10 @@
+# Gunicorn reads ./gunicorn.conf.py automatically; command-line flags still take precedence
+import os
+
+
+def child_exit(server, worker):
+    # Drop the Prometheus samples of a dead worker from the aggregated /metrics output
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,67 @@
+"""Add tag and dataset_tag tables
+
+Revision ID: 4aa95f56a171
+Revises: c3e71f5a2b94
+Create Date: 2026-10-19 04:29:36.921476
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4aa95f56a171'
+down_revision = 'c3e71f5a2b94'
+branch_labels = None
+depends_on = None
+
+
+def _parse_tags(tags):
+    # Same normalisation as app.modules.dataset.models.parse_tags at the time of this revision
+    names = (" ".join(tag.split()).lower() for tag in (tags or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade():
+    tag = op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    dataset_tag = op.create_table('dataset_tag',
+    sa.Column('ds_meta_data_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ds_meta_data_id'], ['ds_meta_data.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ds_meta_data_id', 'tag_id')
+    )
+    with op.batch_alter_table('dataset_tag', schema=None) as batch_op:
+        batch_op.create_index('ix_dataset_tag_tag_id_ds_meta_data_id', ['tag_id', 'ds_meta_data_id'], unique=False)
+
+    # Backfill from the comma-separated strings
+    connection = op.get_bind()
+    tags_by_meta_data = {
+        meta_data_id: _parse_tags(tags)
+        for meta_data_id, tags in connection.execute(sa.text("SELECT id, tags FROM ds_meta_data WHERE tags <> ''"))
+    }
+    names = sorted({name for names in tags_by_meta_data.values() for name in names})
+    if names:
+        op.bulk_insert(tag, [{'name': name} for name in names])
+        tag_ids = dict(connection.execute(sa.text("SELECT name, id FROM tag")).all())
+        op.bulk_insert(
+            dataset_tag,
+            [
+                {'ds_meta_data_id': meta_data_id, 'tag_id': tag_ids[name]}
+                for meta_data_id, names in tags_by_meta_data.items()
+                for name in names
+            ],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('dataset_tag', schema=None) as batch_op:
+        batch_op.drop_index('ix_dataset_tag_tag_id_ds_meta_data_id')
+
+    op.drop_table('dataset_tag')
+    op.drop_table('tag')
@@ -0,0 +1,59 @@
+"""Add material_record.composition and elements with a GIN index on elements
+
+Revision ID: 87e67536ee22
+Revises: b52d07c9e618
+Create Date: 2026-10-19 04:44:54.512105
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Plain Python, no application imports: the backfill parses formulas exactly like the app
+from app.modules.dataset.formulas import atomic_numbers, parse_formula
+
+
+# revision identifiers, used by Alembic.
+revision = '87e67536ee22'
+down_revision = 'b52d07c9e618'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('material_record', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('composition', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('elements', postgresql.ARRAY(sa.SmallInteger()), nullable=True))
+
+    # Parse every distinct formula once, then update all its records
+    connection = op.get_bind()
+    formulas = connection.execute(
+        sa.text("SELECT DISTINCT chemical_formula FROM material_record WHERE chemical_formula IS NOT NULL")
+    ).scalars()
+    updates = []
+    for formula in formulas:
+        composition = parse_formula(formula)
+        if composition:
+            updates.append(
+                {'formula': formula, 'composition': json.dumps(composition), 'elements': atomic_numbers(composition)}
+            )
+    if updates:
+        connection.execute(
+            sa.text(
+                "UPDATE material_record SET composition = CAST(:composition AS JSON), elements = :elements "
+                "WHERE chemical_formula = :formula"
+            ).bindparams(sa.bindparam('elements', type_=postgresql.ARRAY(sa.SmallInteger()))),
+            updates,
+        )
+
+    with op.batch_alter_table('material_record', schema=None) as batch_op:
+        batch_op.create_index('ix_material_record_elements', ['elements'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('material_record', schema=None) as batch_op:
+        batch_op.drop_index('ix_material_record_elements', postgresql_using='gin')
+        batch_op.drop_column('elements')
+        batch_op.drop_column('composition')
@@ -0,0 +1,57 @@
+"""Cascade dataset deletes in the database and add file_deletion queue
+
+Revision ID: 8aa1214f4d3c
+Revises: 5f2b8c3d9e41
+Create Date: 2026-10-19 04:10:13.244447
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8aa1214f4d3c'
+down_revision = '5f2b8c3d9e41'
+branch_labels = None
+depends_on = None
+
+
+# (table, foreign key column) of every child of materials_dataset
+DATASET_CHILDREN = [
+    ('dataset_version', 'materials_dataset_id'),
+    ('ds_download_record', 'dataset_id'),
+    ('ds_view_record', 'dataset_id'),
+    ('material_record', 'materials_dataset_id'),
+    ('upload_session', 'materials_dataset_id'),
+]
+
+
+def upgrade():
+    op.create_table('file_deletion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=512), nullable=False),
+    sa.Column('is_prefix', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Indexed foreign keys so ON DELETE CASCADE (and every per-dataset query) doesn't scan the child tables
+    for table, column in DATASET_CHILDREN:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table}_{column}'), [column], unique=False)
+            batch_op.drop_constraint(f'{table}_{column}_fkey', type_='foreignkey')
+            batch_op.create_foreign_key(
+                f'{table}_{column}_fkey', 'materials_dataset', [column], ['id'], ondelete='CASCADE'
+            )
+
+
+def downgrade():
+    for table, column in reversed(DATASET_CHILDREN):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'{table}_{column}_fkey', type_='foreignkey')
+            batch_op.create_foreign_key(f'{table}_{column}_fkey', 'materials_dataset', [column], ['id'])
+            batch_op.drop_index(batch_op.f(f'ix_{table}_{column}'))
+
+    op.drop_table('file_deletion')
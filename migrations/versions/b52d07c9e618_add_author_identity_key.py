@@ -0,0 +1,59 @@
+"""Add author.identity_key with an index on (identity_key, ds_meta_data_id)
+
+Revision ID: b52d07c9e618
+Revises: 4aa95f56a171
+Create Date: 2026-10-19 04:41:08.306115
+
+"""
+
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+import unidecode
+
+
+# revision identifiers, used by Alembic.
+revision = "b52d07c9e618"
+down_revision = "4aa95f56a171"
+branch_labels = None
+depends_on = None
+
+
+def _identity_key(name, orcid):
+    # Same key as app.modules.dataset.models.author_identity_key at the time of this revision
+    match = re.search(r"\d{4}-\d{4}-\d{4}-\d{3}[\dX]", (orcid or "").upper())
+    if match:
+        return f"orcid:{match.group()}"
+    words = re.sub(r"[^0-9a-z]+", " ", unidecode.unidecode(name or "").lower()).split()
+    key = "name:" + " ".join(sorted(words))
+    if len(key) > 130:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        key = key[: 130 - len(digest) - 1] + "#" + digest
+    return key
+
+
+def upgrade():
+    with op.batch_alter_table("author", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("identity_key", sa.String(length=130), nullable=True))
+
+    connection = op.get_bind()
+    authors = connection.execute(sa.text("SELECT id, name, orcid FROM author")).all()
+    if authors:
+        connection.execute(
+            sa.text("UPDATE author SET identity_key = :identity_key WHERE id = :id"),
+            [{"id": id, "identity_key": _identity_key(name, orcid)} for id, name, orcid in authors],
+        )
+
+    with op.batch_alter_table("author", schema=None) as batch_op:
+        batch_op.alter_column("identity_key", existing_type=sa.String(length=130), nullable=False)
+        batch_op.create_index(
+            "ix_author_identity_key_ds_meta_data_id", ["identity_key", "ds_meta_data_id"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("author", schema=None) as batch_op:
+        batch_op.drop_index("ix_author_identity_key_ds_meta_data_id")
+        batch_op.drop_column("identity_key")
@@ -0,0 +1,56 @@
+"""Add materials_dataset.row_version and unique dataset version numbers
+
+Revision ID: c3e71f5a2b94
+Revises: 8aa1214f4d3c
+Create Date: 2026-10-19 04:21:37.512804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e71f5a2b94'
+down_revision = '8aa1214f4d3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('materials_dataset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+
+    # Concurrent edits may already have created duplicate version numbers: renumber the versions
+    # of those datasets in creation order so the constraint can be added
+    op.execute(
+        """
+        UPDATE dataset_version
+        SET version_number = renumbered.version_number
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY materials_dataset_id ORDER BY version_number, id
+            ) AS version_number
+            FROM dataset_version
+            WHERE materials_dataset_id IN (
+                SELECT materials_dataset_id FROM dataset_version
+                GROUP BY materials_dataset_id, version_number HAVING COUNT(*) > 1
+            )
+        ) AS renumbered
+        WHERE dataset_version.id = renumbered.id
+        """
+    )
+
+    with op.batch_alter_table('dataset_version', schema=None) as batch_op:
+        batch_op.drop_index('ix_dataset_version_materials_dataset_id')
+        batch_op.create_unique_constraint(
+            'uq_dataset_version_dataset_number', ['materials_dataset_id', 'version_number']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('dataset_version', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_dataset_version_dataset_number', type_='unique')
+        batch_op.create_index('ix_dataset_version_materials_dataset_id', ['materials_dataset_id'], unique=False)
+
+    with op.batch_alter_table('materials_dataset', schema=None) as batch_op:
+        batch_op.drop_column('row_version')
@@ -0,0 +1,34 @@
+"""Add a partial index on material_record.chemical_formula covering composition
+
+Revision ID: d7a3f0b6c215
+Revises: 87e67536ee22
+Create Date: 2026-10-19 09:12:37.418052
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f0b6c215'
+down_revision = '87e67536ee22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the DISTINCT ON (chemical_formula) scan the composition index is built from as an
+    # index-only scan, already in order, instead of reading and sorting the whole table
+    with op.batch_alter_table('material_record', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_material_record_formula_composition',
+            ['chemical_formula'],
+            unique=False,
+            postgresql_include=['composition'],
+            postgresql_where=sa.text('elements IS NOT NULL'),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('material_record', schema=None) as batch_op:
+        batch_op.drop_index('ix_material_record_formula_composition')
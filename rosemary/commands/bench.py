@@ -0,0 +1,69 @@
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from core.bench.generator import DISTRIBUTIONS, MaterialsCsvGenerator
+from core.bench.suite import BENCHMARKS, BenchmarkSuite, compare_results
+
+
+def _parse_scales(value):
+    try:
+        scales = [int(scale) for scale in value.split(",") if scale.strip()]
+    except ValueError:
+        raise click.BadParameter("scales must be comma-separated row counts, e.g. 1000,10000")
+    if not scales or any(scale <= 0 for scale in scales):
+        raise click.BadParameter("scales must be positive row counts")
+    return scales
+
+
+@click.command("bench", help="Times the dataset hot paths on synthetic data and compares them with a baseline.")
+@click.option("--scales", default="1000,10000", help="Comma-separated CSV sizes (rows) to run every benchmark at.")
+@click.option("--repeat", default=3, help="Timed runs per benchmark and scale (the median is compared).")
+@click.option("--only", multiple=True, type=click.Choice(BENCHMARKS), help="Run only these benchmarks.")
+@click.option("--materials", default=100, help="Distinct materials in the generated CSVs.")
+@click.option("--properties", default=10, help="Distinct properties in the generated CSVs.")
+@click.option("--distribution", default="lognormal", type=click.Choice(DISTRIBUTIONS), help="Property values.")
+@click.option("--seed", default=0, help="Seed of the data generator.")
+@click.option("--output", default=None, type=click.Path(dir_okay=False), help="Write the results as JSON here.")
+@click.option("--baseline", default=None, type=click.Path(exists=True, dir_okay=False), help="Results to compare.")
+@click.option("--threshold", default=0.25, help="Slowdown over the baseline that counts as a regression (0.25 = 25%).")
+@with_appcontext
+def bench(scales, repeat, only, materials, properties, distribution, seed, output, baseline, threshold):
+    scales = _parse_scales(scales)
+    generator = MaterialsCsvGenerator(materials, properties, distribution, seed)
+    suite = BenchmarkSuite(generator, repeat=repeat, echo=click.echo)
+
+    click.echo(click.style(f"\n=== Benchmarks (scales: {scales}, repeat: {repeat}) ===\n", fg="cyan", bold=True))
+    results = suite.run(scales, only=list(only))
+
+    click.echo(click.style("\n  Median times:", fg="cyan"))
+    for name, by_scale in results["results"].items():
+        timings = "  ".join(f"{scale:>8} rows {stats['median'] * 1000:9.1f} ms" for scale, stats in by_scale.items())
+        click.echo(f"    {name:<34}{timings}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        click.echo(click.style(f"\n  Results written to {output}", fg="green"))
+
+    if not baseline:
+        click.echo("")
+        return
+
+    with open(baseline) as f:
+        comparison = compare_results(results, json.load(f), threshold)
+
+    click.echo(click.style(f"\n  Against {baseline} (regression above +{threshold:.0%}):", fg="cyan"))
+    for row in comparison:
+        line = (
+            f"    {row['benchmark']:<34}{row['scale']:>8} rows "
+            f"{row['baseline'] * 1000:9.1f} ms -> {row['current'] * 1000:9.1f} ms  ({row['ratio'] - 1:+.0%})"
+        )
+        click.echo(click.style(line, fg="red") if row["regression"] else line)
+
+    regressions = [row for row in comparison if row["regression"]]
+    if regressions:
+        click.echo(click.style(f"\n  ✗ {len(regressions)} regression(s)\n", fg="red", bold=True))
+        raise click.exceptions.Exit(1)
+    click.echo(click.style("\n  ✓ No regressions\n", fg="green", bold=True))
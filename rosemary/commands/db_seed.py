@@ -6,6 +6,7 @@ import click
 from flask.cli import with_appcontext
 
 from core.seeders.BaseSeeder import BaseSeeder
+from core.seeders.BulkSeeder import BulkSeeder
 from rosemary.commands.db_reset import db_reset
 
 
@@ -42,9 +43,13 @@ def get_module_seeders(module_path, specific_module=None):
 @click.command("db:seed", help="Populates the database with the seeders defined in each module.")
 @click.option("--reset", is_flag=True, help="Reset the database before seeding.")
 @click.option("-y", "--yes", is_flag=True, help="Confirm the operation without prompting.")
+@click.option("--scale", type=float, default=None, help="Bulk-seed a synthetic catalogue instead (1 = 1,000 datasets).")
+@click.option("--seed", default=0, help="Seed of the bulk-seeded data (the same seed yields the same rows).")
+@click.option("--workers", default=4, help="Tables loaded in parallel when bulk seeding.")
+@click.option("--records-per-dataset", default=1000, help="Material records per bulk-seeded dataset.")
 @click.argument("module", required=False)
 @with_appcontext
-def db_seed(reset, yes, module):
+def db_seed(reset, yes, scale, seed, workers, records_per_dataset, module):
 
     if reset:
         if yes or click.confirm(
@@ -58,6 +63,20 @@ def db_seed(reset, yes, module):
             click.echo(click.style("Database reset cancelled.", fg="yellow"))
             return
 
+    if scale is not None:
+        if scale <= 0:
+            raise click.BadParameter("scale must be positive", param_hint="--scale")
+        seeder = BulkSeeder(scale, seed=seed, workers=workers, records_per_dataset=records_per_dataset, echo=click.echo)
+        counts = seeder.run()
+        click.echo(
+            click.style(
+                f"Bulk-seeded {counts['users']:,} users, {counts['datasets']:,} datasets and "
+                f"{counts['records']:,} material records.",
+                fg="green",
+            )
+        )
+        return
+
     blueprints_module_path = os.path.join(os.getenv("WORKING_DIR", ""), "app/modules")
     seeders = get_module_seeders(blueprints_module_path, specific_module=module)
     success = True  # Flag to control the successful flow of the operation
@@ -6,6 +6,7 @@ from flask.cli import with_appcontext
 from sqlalchemy import inspect, text
 
 from app import create_app, db
+from core.database.database import REPLICA_BIND_KEY
 
 
 @click.command("db:status", help="Displays database connection status and migration information.")
@@ -124,6 +125,31 @@ def db_status():
         except Exception:
             pass
 
-        # 7. Show last check timestamp
+        # 7. Connection pool and read replica
+        try:
+            options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+            click.echo(
+                click.style("  Pool:      ", fg="white")
+                + click.style(
+                    f"size={options.get('pool_size')} overflow={options.get('max_overflow')} "
+                    f"recycle={options.get('pool_recycle')}s",
+                    fg="cyan",
+                )
+            )
+
+            if REPLICA_BIND_KEY in db.engines:
+                replica = db.engines[REPLICA_BIND_KEY]
+                with replica.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                click.echo(
+                    click.style("  Replica:   ", fg="white")
+                    + click.style(f"✓ Connected to '{replica.url.database}'", fg="green")
+                )
+            else:
+                click.echo(click.style("  Replica:   ", fg="white") + click.style("Not configured", fg="white"))
+        except Exception as e:
+            click.echo(click.style("  Replica:   ", fg="white") + click.style(f"✗ Failed - {e}", fg="red"))
+
+        # 8. Show last check timestamp
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         click.echo(click.style(f"\n  Last checked: {now}\n", fg="white", dim=True))
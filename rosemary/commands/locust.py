@@ -1,16 +1,185 @@
+import json
 import os
 import signal
+import socket
 import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
 
 import click
 import psutil
 
 import docker
+from core.locust.gate import (
+    PROFILES,
+    build_results,
+    check_slos,
+    compare_with_baseline,
+    find_locustfiles,
+    load_slos,
+    read_stats,
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_app(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException("The app exited before accepting requests, see logs/perf/gunicorn.log.")
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return
+        except urllib.error.HTTPError:
+            return  # Any answer means the app is up
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise click.ClickException(f"The app did not answer on {url} within {timeout}s.")
+
+
+def run_perf_gate(
+    locustfile_path, slo_files, profile, scale, seed, workers, baseline, save_baseline, threshold, module
+):
+    """
+    Seeds the configured database, serves the app with gunicorn on a free local port, runs a
+    headless Locust profile against it and fails when an SLO is breached or an endpoint got
+    slower than the baseline.
+    """
+    output_dir = os.path.join(os.getenv("WORKING_DIR", ""), "logs", "perf")
+    os.makedirs(output_dir, exist_ok=True)
+    baseline = baseline or os.path.join(output_dir, f"locust_{profile}_baseline.json")
+
+    slos = {}
+    for path in slo_files:
+        slos.update(load_slos(path))
+
+    if scale:
+        click.echo(click.style(f"Seeding the database (scale {scale}, seed {seed})...", fg="yellow"))
+        rosemary = [sys.executable, "-m", "rosemary"]
+        subprocess.run(rosemary + ["db:seed", "--reset", "-y"], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(rosemary + ["db:seed", "--scale", str(scale), "--seed", str(seed)], check=True)
+
+    port = _free_port()
+    host = f"http://127.0.0.1:{port}"
+    load = PROFILES[profile]
+    click.echo(
+        click.style(f"\n=== Performance gate: {profile} profile {load} against {host} ===\n", fg="cyan", bold=True)
+    )
+
+    with open(os.path.join(output_dir, "gunicorn.log"), "w") as app_log, tempfile.TemporaryDirectory() as tmp:
+        app_process = subprocess.Popen(
+            ["gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "app:app"],
+            stdout=app_log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            _wait_for_app(host + "/", app_process)
+            locust_command = [
+                "locust",
+                "-f",
+                locustfile_path,
+                "--headless",
+                "--users",
+                str(load["users"]),
+                "--spawn-rate",
+                str(load["spawn_rate"]),
+                "--run-time",
+                load["run_time"],
+                "--host",
+                host,
+                "--csv",
+                os.path.join(tmp, "gate"),
+                "--only-summary",
+            ]
+            click.echo(f"Locust command: {' '.join(locust_command)}")
+            # Locust exits non-zero on any failed request; error rates are judged by the SLOs instead
+            subprocess.run(locust_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            stats_path = os.path.join(tmp, "gate_stats.csv")
+            if not os.path.exists(stats_path):
+                raise click.ClickException("Locust did not write any statistics.")
+            endpoints = read_stats(stats_path)
+        finally:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+
+    results = build_results(endpoints, profile, module=module, scale=scale)
+    output = os.path.join(output_dir, f"locust_{profile}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    click.echo(click.style("  Latency (ms) and error rate per endpoint:", fg="cyan"))
+    for key, stats in endpoints.items():
+        click.echo(
+            f"    {key:<44}{stats['requests']:>7} req  p50 {stats['p50'] or 0:7.0f}  p95 {stats['p95'] or 0:7.0f}  "
+            f"p99 {stats['p99'] or 0:7.0f}  errors {stats['error_rate']:6.1%}"
+        )
+
+    failures = 0
+    click.echo(click.style("\n  SLOs:", fg="cyan"))
+    for row in check_slos(endpoints, slos):
+        if row["actual"] is None:
+            click.echo(
+                click.style(f"    {row['endpoint']:<44}{row['metric']:<11}not requested in this run", fg="yellow")
+            )
+            continue
+        fmt = "{:.1%}" if row["metric"] == "error_rate" else "{:.0f} ms"
+        line = (
+            f"    {row['endpoint']:<44}{row['metric']:<11}"
+            f"{fmt.format(row['actual']):>10} (objective {fmt.format(row['objective'])})"
+        )
+        click.echo(click.style(line + "  ✗ BREACH", fg="red", bold=True) if row["breach"] else line)
+        failures += row["breach"]
+
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            comparison = compare_with_baseline(results, json.load(f), threshold)
+        click.echo(click.style(f"\n  p95 against {baseline} (regression above +{threshold:.0%}):", fg="cyan"))
+        for row in comparison:
+            line = (
+                f"    {row['endpoint']:<44}{row['baseline']:7.0f} ms -> {row['current']:7.0f} ms  "
+                f"({row['ratio'] - 1:+.0%})"
+            )
+            click.echo(click.style(line + "  ✗ REGRESSION", fg="red", bold=True) if row["regression"] else line)
+            failures += row["regression"]
+    else:
+        click.echo(click.style(f"\n  No baseline at {baseline}; run with --save-baseline to create one.", fg="yellow"))
+
+    if save_baseline:
+        with open(baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        click.echo(click.style(f"\n  Baseline saved to {baseline}", fg="green"))
+
+    click.echo(f"\n  Results written to {output}")
+    if failures:
+        click.echo(
+            click.style(
+                f"\n  ✗ Performance gate failed: {failures} SLO breach(es) or regression(s)\n", fg="red", bold=True
+            )
+        )
+        raise click.exceptions.Exit(1)
+    click.echo(click.style("\n  ✓ Performance gate passed\n", fg="green", bold=True))
 
 
 @click.command("locust", help="Launches Locust for load testing based on the environment.")
 @click.argument("module", required=False)
-def locust(module):
+@click.option("--gate", is_flag=True, help="Run a headless load profile against a local app and check the SLOs.")
+@click.option("--profile", default="smoke", type=click.Choice(list(PROFILES)), help="Load profile of the gate.")
+@click.option("--scale", default=0.1, help="Bulk-seed scale for the gate (resets the database); 0 skips seeding.")
+@click.option("--seed", default=0, help="Seed of the bulk-seeded data.")
+@click.option("--workers", default=2, help="Gunicorn workers serving the app during the gate.")
+@click.option("--baseline", default=None, type=click.Path(dir_okay=False), help="Results of a previous gate run.")
+@click.option("--save-baseline", is_flag=True, help="Store this run as the baseline of its profile.")
+@click.option("--threshold", default=0.25, help="p95 slowdown over the baseline that counts as a regression.")
+@click.option("-y", "--yes", is_flag=True, help="Do not ask before resetting the database for the gate.")
+def locust(module, gate, profile, scale, seed, workers, baseline, save_baseline, threshold, yes):
 
     # Absolute paths
     working_dir = os.getenv("WORKING_DIR", "")
@@ -123,6 +292,18 @@ def locust(module):
     if module:
         validate_module(module)
 
+    if gate:
+        if scale and not yes:
+            click.confirm(click.style("The gate resets and re-seeds the database, continue?", fg="red"), abort=True)
+        locustfile_path = os.path.join(core_dir, "bootstraps/locustfile_bootstrap.py")
+        if module:
+            locustfile_path = os.path.join(modules_dir, module, "tests", "locustfile.py")
+        slo_files = find_locustfiles(modules_dir, module)
+        run_perf_gate(
+            locustfile_path, slo_files, profile, scale, seed, workers, baseline, save_baseline, threshold, module
+        )
+        return
+
     if working_dir == "/app/":
         client = docker.from_env()
 
@@ -1,14 +1,14 @@
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 
 from core.managers.module_manager import ModuleManager
 
 
-@click.command("module:list", help="Lists all modules and those ignored by .moduleignore.")
+@click.command("module:list", help="Lists all modules and those ignored by .moduleignore or DISABLED_MODULES.")
 @with_appcontext
 def module_list():
-    app = click.get_current_context().obj
-    manager = ModuleManager(app)
+    manager = ModuleManager(current_app)
 
     loaded_modules, ignored_modules = manager.get_modules()
 
@@ -0,0 +1,69 @@
+import os
+
+import click
+
+from core.profiling.profiler import PROFILE_EXTENSION, default_profiles_dir, list_profiles, summarise_profile
+
+
+def _profiles_dir(directory):
+    return directory or os.getenv("PROFILES_DIR") or default_profiles_dir()
+
+
+@click.command("profile:list", help="Lists the request profiles stored in 'logs/profiles/'.")
+@click.option(
+    "--dir", "directory", default=None, help="Profiles directory (defaults to PROFILES_DIR or logs/profiles)."
+)
+def profile_list(directory):
+    profiles = list_profiles(_profiles_dir(directory))
+    if not profiles:
+        click.echo(click.style("No request profiles stored.", fg="yellow"))
+        click.echo("Send a request with the 'X-Profile: <PROFILING_TOKEN>' header to record one.")
+        return
+
+    click.echo(click.style(f"\n=== Request profiles ({len(profiles)}) ===\n", fg="cyan", bold=True))
+    for profile in profiles:
+        duration = profile.get("duration")
+        duration = f"{duration * 1000:8.1f} ms" if duration is not None else "       ? ms"
+        click.echo(
+            f"  {profile['name']:<60} {profile.get('method', '?'):<6} {str(profile.get('status', '?')):<4}"
+            f" {duration}  {profile.get('path', '')}"
+        )
+    click.echo("")
+
+
+@click.command("profile:show", help="Summarises a request profile: hottest functions by self and total time.")
+@click.argument("name")
+@click.option("--top", default=15, help="Number of functions to show.")
+@click.option(
+    "--dir", "directory", default=None, help="Profiles directory (defaults to PROFILES_DIR or logs/profiles)."
+)
+def profile_show(name, top, directory):
+    profiles_dir = _profiles_dir(directory)
+    name = os.path.basename(name)
+    if name.endswith(PROFILE_EXTENSION):
+        name = name[: -len(PROFILE_EXTENSION)]
+
+    if not os.path.exists(os.path.join(profiles_dir, name + PROFILE_EXTENSION)):
+        click.echo(click.style(f"Profile '{name}' not found in {profiles_dir}.", fg="red"))
+        raise click.exceptions.Exit(1)
+
+    metadata = next((p for p in list_profiles(profiles_dir) if p["name"] == name), {})
+    summary = summarise_profile(name, profiles_dir, top=top)
+    samples = summary["samples"] or 1
+
+    click.echo(
+        click.style(f"\n=== {metadata.get('method', '')} {metadata.get('path', name)} ===\n", fg="cyan", bold=True)
+    )
+    if metadata.get("duration") is not None:
+        click.echo(f"  duration: {metadata['duration'] * 1000:.1f} ms, status: {metadata.get('status')}")
+    click.echo(f"  samples:  {summary['samples']} (every {metadata.get('interval', 0) * 1000:.1f} ms)")
+
+    for title, rows in (("Self time", summary["self"]), ("Total time", summary["total"])):
+        click.echo(click.style(f"\n  {title} (top {top}):", fg="cyan"))
+        for frame, count in rows:
+            click.echo(f"    {count / samples * 100:5.1f}%  {frame}")
+
+    click.echo(
+        f"\n  Flamegraph: flamegraph.pl {os.path.join(profiles_dir, name + PROFILE_EXTENSION)} > {name}.svg"
+        " (or open the file in speedscope.app)\n"
+    )
@@ -0,0 +1,81 @@
+import json
+import subprocess
+import sys
+
+import click
+
+# Runs in a fresh interpreter so the numbers are those of a cold worker start
+PROFILE_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app(sys.argv[1])
+created = time.perf_counter()
+
+print(json.dumps({
+    "import_seconds": imported - start,
+    "create_app_seconds": created - imported,
+    "modules": application.module_load_times,
+}))
+"""
+
+
+def parse_importtime(output, max_level=1):
+    """
+    Cumulative microseconds of the imports in `python -X importtime` output, down to
+    ``max_level`` (0 = imported by the profiled code itself, 1 = imported by those, ...)
+    """
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Each nesting level indents the name by two more spaces
+        name = name[1:]
+        level = (len(name) - len(name.lstrip(" "))) // 2
+        if level <= max_level:
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+@click.command("startup:profile", help="Measures application start-up time and the imports behind it.")
+@click.option("--env", default="development", help="Configuration to start the app with.")
+@click.option("--top", default=15, help="Number of slowest imports to show.")
+@click.option("--budget", default=None, type=int, help="Fail if the start-up takes longer than this (ms).")
+def startup_profile(env, top, budget):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT, env],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        click.echo(click.style("The application failed to start:", fg="red"))
+        click.echo(result.stderr[-2000:])
+        raise click.exceptions.Exit(1)
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    total_ms = (report["import_seconds"] + report["create_app_seconds"]) * 1000
+
+    click.echo(click.style(f"\n=== Start-up profile ({env}) ===\n", fg="cyan", bold=True))
+    click.echo(f"  import app:    {report['import_seconds'] * 1000:8.1f} ms")
+    click.echo(f"  create_app():  {report['create_app_seconds'] * 1000:8.1f} ms")
+    click.echo(click.style(f"  total:         {total_ms:8.1f} ms", bold=True))
+
+    click.echo(click.style("\n  Modules (import + registration):", fg="cyan"))
+    for module_name, seconds in sorted(report["modules"].items(), key=lambda item: item[1], reverse=True):
+        click.echo(f"    {module_name:<20}{seconds * 1000:8.1f} ms")
+
+    # A dependency shared by several modules is charged to the first one that imports it
+    click.echo(click.style(f"\n  Slowest imports (top {top}):", fg="cyan"))
+    imports = parse_importtime(result.stderr)
+    imports.pop("app", None)
+    for name, microseconds in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:top]:
+        click.echo(f"    {name:<40}{microseconds / 1000:8.1f} ms")
+
+    if budget is not None:
+        if total_ms > budget:
+            click.echo(click.style(f"\n  ✗ Over budget: {total_ms:.1f} ms > {budget} ms\n", fg="red", bold=True))
+            raise click.exceptions.Exit(1)
+        click.echo(click.style(f"\n  ✓ Within budget: {total_ms:.1f} ms <= {budget} ms\n", fg="green", bold=True))
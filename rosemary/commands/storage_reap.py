@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "storage:reap",
+    help="Removes stored files of deleted datasets and the chunks of abandoned upload sessions.",
+)
+@click.option(
+    "--max-age-hours",
+    default=None,
+    type=float,
+    help="Drop upload sessions not completed after this many hours (default: UPLOAD_SESSION_MAX_AGE_HOURS).",
+)
+@click.option("--batch-size", default=500, help="Files removed per transaction.")
+@with_appcontext
+def storage_reap(max_age_hours, batch_size):
+    from app.modules.dataset.services import FileReaperService
+
+    file_reaper = FileReaperService()
+
+    if max_age_hours is None:
+        max_age_hours = current_app.config.get("UPLOAD_SESSION_MAX_AGE_HOURS", 24)
+    stale = file_reaper.schedule_stale_upload_sessions(timedelta(hours=max_age_hours))
+    if stale:
+        click.echo(click.style(f"Dropped {stale} upload session(s) older than {max_age_hours:g}h.", fg="yellow"))
+
+    totals = {"deleted": 0, "kept": 0, "failed": 0}
+    while True:
+        result = file_reaper.reap(limit=batch_size)
+        for name, count in result.items():
+            totals[name] += count
+        if not result["deleted"] and not result["kept"]:
+            break
+
+    click.echo(
+        click.style(
+            f"Removed {totals['deleted']} file(s); kept {totals['kept']} still in use by other datasets.",
+            fg="green",
+        )
+    )
+    if totals["failed"]:
+        click.echo(click.style(f"{totals['failed']} deletion(s) failed and will be retried.", fg="red"))
+        raise click.exceptions.Exit(1)
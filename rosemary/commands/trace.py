@@ -0,0 +1,71 @@
+import os
+from collections import defaultdict
+
+import click
+
+from core.tracing.tracing import read_traces
+
+
+def _attribute(span, key):
+    for attribute in span.get("attributes", []):
+        if attribute["key"] == key:
+            return next(iter(attribute["value"].values()))
+    return None
+
+
+def _duration_ms(span):
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+@click.command("trace:show", help="Shows the span tree and latency breakdown of a recorded request trace.")
+@click.argument("trace_id", required=False)
+@click.option("--file", "path", default=None, help="Traces file (defaults to TRACES_FILE or logs/traces/traces.jsonl).")
+@click.option("--min-ms", default=0.0, help="Hide spans shorter than this (ms).")
+def trace_show(trace_id, path, min_ms):
+    path = path or os.getenv("TRACES_FILE") or os.path.join(os.getcwd(), "logs", "traces", "traces.jsonl")
+    traces = read_traces(path)
+    if trace_id:
+        traces = [spans for spans in traces if spans[0]["traceId"].startswith(trace_id)]
+    if not traces:
+        click.echo(click.style(f"No matching traces in {path}.", fg="yellow"))
+        raise click.exceptions.Exit(1)
+
+    spans = traces[-1]
+    children = defaultdict(list)
+    span_ids = {span["spanId"] for span in spans}
+    roots = []
+    for span in sorted(spans, key=lambda s: int(s["startTimeUnixNano"])):
+        parent = span.get("parentSpanId")
+        if parent in span_ids:
+            children[parent].append(span)
+        else:
+            roots.append(span)
+
+    trace_start = min(int(span["startTimeUnixNano"]) for span in spans)
+    click.echo(click.style(f"\n=== Trace {spans[0]['traceId']} ({len(spans)} spans) ===\n", fg="cyan", bold=True))
+
+    # Self time per layer: each span's duration minus that of its children. Storage streams stay open
+    # while their caller works (e.g. parsing a CSV as it is written), so layers can add up to over 100%
+    self_time = defaultdict(float)
+
+    def show(span, depth):
+        duration = _duration_ms(span)
+        layer = _attribute(span, "materialshub.layer") or "other"
+        self_time[layer] += max(duration - sum(_duration_ms(child) for child in children[span["spanId"]]), 0)
+
+        if duration >= min_ms:
+            offset = (int(span["startTimeUnixNano"]) - trace_start) / 1e6
+            error = span.get("status", {}).get("code") == 2
+            line = f"  {offset:9.2f} ms {duration:9.2f} ms  {'  ' * depth}{span['name']}"
+            click.echo(click.style(line, fg="red") if error else line)
+        for child in children[span["spanId"]]:
+            show(child, depth + 1)
+
+    for root in roots:
+        show(root, 0)
+
+    total = sum(_duration_ms(root) for root in roots) or 1
+    click.echo(click.style("\n  Time by layer (self time):", fg="cyan"))
+    for layer, milliseconds in sorted(self_time.items(), key=lambda item: item[1], reverse=True):
+        click.echo(f"    {layer:<12}{milliseconds:9.2f} ms  {milliseconds / total * 100:5.1f}%")
+    click.echo("")